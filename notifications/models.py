@@ -10,6 +10,7 @@ class Notification(models.Model):
         ("winner_submission_required", "نیاز به ارسال نتیجه"),
         ("winner_submission_status_change", "تغییر وضعیت ارسال نتیجه"),
         ("verification_status_change", "تغییر وضعیت احراز هویت"),
+        ("deposit_status", "وضعیت واریز"),
     )
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="notifications"
@@ -0,0 +1,136 @@
+"""
+Unique visitor counters kept in Redis HyperLogLogs.
+
+ActiveVisitorMiddleware adds every visitor of a successful GET to the day's
+HyperLogLog and, for tournament and post pages, to that page's HyperLogLog
+for the day. Visitors are ``u:<user id>`` when signed in and a keyed hash of
+the client address nginx forwards and the user agent otherwise, so no raw
+address is stored. Each key stays at most 12 KB however many visitors it
+sees; counts are approximate (about 0.8% standard error). Weekly and
+monthly figures are PFCOUNTs over the union of day keys, merged with
+PFMERGE into a short-lived window key.
+"""
+import hashlib
+import hmac
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+KEY_PREFIX = "activity"
+# Day keys are kept long enough for a monthly window ending on any of the
+# last few months.
+DAY_KEY_TTL = timedelta(days=120)
+WINDOW_KEY_TTL = timedelta(minutes=5)
+ACTIVE_USER_WINDOWS = {"dau": 1, "wau": 7, "mau": 30}
+
+
+def redis_connection():
+    """The raw Redis client behind the default cache, or None without Redis."""
+    try:
+        return get_redis_connection("default")
+    except NotImplementedError:
+        return None
+
+
+def client_ip(request):
+    """
+    The visitor's address as seen by nginx, which sets X-Real-IP and appends
+    the peer to X-Forwarded-For. Behind it REMOTE_ADDR is nginx itself. Only
+    the last X-Forwarded-For hop is trusted; earlier ones come from the
+    client.
+    """
+    real_ip = request.META.get("HTTP_X_REAL_IP", "").strip()
+    if real_ip:
+        return real_ip
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    if forwarded.strip():
+        return forwarded.split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def visitor_id(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"u:{user.pk}"
+    fingerprint = f"{client_ip(request)}|{request.META.get('HTTP_USER_AGENT', '')}"
+    digest = hmac.new(settings.SECRET_KEY.encode(), fingerprint.encode(), hashlib.sha256)
+    return f"a:{digest.hexdigest()[:32]}"
+
+
+def day_key(day):
+    return f"{KEY_PREFIX}:day:{day.isoformat()}"
+
+
+def resource_key(resource, resource_id, day):
+    return f"{KEY_PREFIX}:{resource}:{resource_id}:{day.isoformat()}"
+
+
+def record_visit(request, resource=None, resource_id=None):
+    """Adds the request's visitor to today's counters. Returns False without Redis."""
+    redis = redis_connection()
+    if redis is None:
+        return False
+    today = timezone.localdate()
+    visitor = visitor_id(request)
+    keys = [day_key(today)]
+    if resource and resource_id is not None:
+        keys.append(resource_key(resource, resource_id, today))
+
+    pipeline = redis.pipeline(transaction=False)
+    for key in keys:
+        pipeline.pfadd(key, visitor)
+        pipeline.expire(key, DAY_KEY_TTL)
+    pipeline.execute()
+    return True
+
+
+def _days(end_day, days):
+    return [end_day - timedelta(days=offset) for offset in range(days)]
+
+
+def unique_count(redis, keys, window_key):
+    """
+    Approximate number of distinct visitors across ``keys``. Several keys are
+    merged into ``window_key`` once and reused until it expires.
+    """
+    if len(keys) == 1:
+        return redis.pfcount(keys[0])
+    if not redis.exists(window_key):
+        pipeline = redis.pipeline()
+        pipeline.pfmerge(window_key, *keys)
+        pipeline.expire(window_key, WINDOW_KEY_TTL)
+        pipeline.execute()
+    return redis.pfcount(window_key)
+
+
+def active_users(end_day=None):
+    """DAU, WAU and MAU for the windows ending on ``end_day`` (default today)."""
+    redis = redis_connection()
+    if redis is None:
+        return None
+    end_day = end_day or timezone.localdate()
+    counts = {
+        name: unique_count(
+            redis,
+            [day_key(day) for day in _days(end_day, days)],
+            f"{KEY_PREFIX}:window:{name}:{end_day.isoformat()}",
+        )
+        for name, days in ACTIVE_USER_WINDOWS.items()
+    }
+    counts["dau_mau_ratio"] = round(counts["dau"] / counts["mau"], 4) if counts["mau"] else 0.0
+    return counts
+
+
+def unique_viewers(resource, resource_id, days, end_day=None):
+    """Distinct visitors of one tournament or post over the last ``days`` days."""
+    redis = redis_connection()
+    if redis is None:
+        return None
+    end_day = end_day or timezone.localdate()
+    return unique_count(
+        redis,
+        [resource_key(resource, resource_id, day) for day in _days(end_day, days)],
+        f"{KEY_PREFIX}:window:{resource}:{resource_id}:{days}:{end_day.isoformat()}",
+    )
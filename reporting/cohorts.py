@@ -0,0 +1,163 @@
+"""
+Weekly signup cohorts and their retention.
+
+A user belongs to the cohort of the week they signed up in, and counts as
+retained in week N if they joined a tournament N weeks later, either as a
+Participant (dated by when they joined) or through an entry fee, hot or
+archived. The database truncates both dates to weeks and drops
+duplicates, and the (user_id, signup_week, activity_week) tuples are read
+in chunks and folded into the matrix with NumPy, so memory holds one chunk
+and the matrix however many tournament joins there are.
+"""
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from tournaments.models import Participant
+from users.models import User
+from wallet.models import Transaction, TransactionArchive, Wallet
+
+COHORT_CHUNK_SIZE = 5000
+
+
+def week_start(day):
+    """The Monday of ``day``'s week, as TruncWeek counts weeks."""
+    return day - timedelta(days=day.weekday())
+
+
+def _week_index(values, first_week):
+    """Weeks between ``first_week`` and each of the truncated ``values``."""
+    days = np.array([timezone.localdate(value) for value in values], dtype='datetime64[D]')
+    return (days - np.datetime64(first_week, 'D')).astype(np.int64) // 7
+
+
+def activity_weeks(start_date, end_date):
+    """
+    Distinct (user_id, signup_week, activity_week) tuples for users who signed
+    up between ``start_date`` and ``end_date`` and joined a tournament in that
+    window.
+    """
+    participations = (
+        Participant.objects.filter(
+            user__date_joined__range=[start_date, end_date],
+            created_at__range=[start_date, end_date],
+        )
+        .annotate(
+            signup_week=TruncWeek('user__date_joined'),
+            activity_week=TruncWeek('created_at'),
+        )
+        .values_list('user_id', 'signup_week', 'activity_week')
+    )
+    entry_fees = (
+        Transaction.objects.filter(
+            transaction_type='entry_fee',
+            wallet__user__date_joined__range=[start_date, end_date],
+            timestamp__range=[start_date, end_date],
+        )
+        .annotate(
+            signup_week=TruncWeek('wallet__user__date_joined'),
+            activity_week=TruncWeek('timestamp'),
+        )
+        .values_list('wallet__user_id', 'signup_week', 'activity_week')
+    )
+    # Entry fees moved to the archive carry a bare wallet id.
+    wallet = Wallet.objects.filter(id=OuterRef('wallet_id'))
+    archived_entry_fees = (
+        TransactionArchive.objects.filter(
+            transaction_type='entry_fee',
+            wallet_id__in=Wallet.objects.filter(user__date_joined__range=[start_date, end_date]).values('id'),
+            timestamp__range=[start_date, end_date],
+        )
+        .annotate(
+            user_id=Subquery(wallet.values('user_id')[:1]),
+            signup_week=TruncWeek(Subquery(wallet.values('user__date_joined')[:1])),
+            activity_week=TruncWeek('timestamp'),
+        )
+        .values_list('user_id', 'signup_week', 'activity_week')
+    )
+    # UNION without ALL removes the duplicates on the database side.
+    return participations.union(entry_fees, archived_entry_fees)
+
+
+def retention_matrix(start_date, end_date, chunk_size=COHORT_CHUNK_SIZE):
+    """
+    Returns ``(weeks, sizes, active)``: the cohort weeks, the number of
+    signups in each, and a (cohort x weeks since signup) array of users
+    active in that week. Cells a cohort has not reached yet stay zero.
+    """
+    first_week = week_start(timezone.localdate(start_date))
+    last_week = week_start(timezone.localdate(end_date))
+    count = (last_week - first_week).days // 7 + 1
+    weeks = [first_week + timedelta(weeks=i) for i in range(count)]
+
+    sizes = np.zeros(count, dtype=np.int64)
+    signups = (
+        User.objects.filter(date_joined__range=[start_date, end_date])
+        .annotate(week=TruncWeek('date_joined'))
+        .values_list('week')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for week, total in signups:
+        sizes[_week_index([week], first_week)[0]] += total
+
+    # The union is distinct, so each (user, cohort, offset) arrives once.
+    active = np.zeros(count * count, dtype=np.int64)
+    rows = activity_weeks(start_date, end_date).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        _, signup_weeks, activity = zip(*chunk)
+        cohort = _week_index(signup_weeks, first_week)
+        offset = _week_index(activity, first_week) - cohort
+        cells = (cohort * count + offset)[offset >= 0]
+        active += np.bincount(cells, minlength=count * count)
+    return weeks, sizes, active.reshape(count, count)
+
+
+def generate_retention_report(filters=None):
+    """
+    Weekly signup cohorts of the window (default: the last 12 weeks) with
+    the share of each cohort that joined a tournament N weeks after signing
+    up.
+    """
+    if filters is None:
+        filters = {}
+
+    end_date = filters.get('end_date', timezone.now())
+    start_date = filters.get('start_date', end_date - timedelta(weeks=12))
+    weeks, sizes, active = retention_matrix(start_date, end_date)
+
+    count = len(weeks)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retention = np.where(sizes[:, None] > 0, active * 100.0 / sizes[:, None], 0.0)
+    # Cohort i can only be observed for count - i weeks.
+    observed = np.arange(count)[None, :] < (count - np.arange(count))[:, None]
+
+    return {
+        "summary": {
+            "cohorts": count,
+            "users": int(sizes.sum()),
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+        },
+        "cohorts": [
+            {"week": week.isoformat(), "size": int(size)} for week, size in zip(weeks, sizes)
+        ],
+        "matrix": [
+            [round(float(value), 2) if seen else None for value, seen in zip(row, seen_row)]
+            for row, seen_row in zip(retention, observed)
+        ],
+        "retention": [
+            {
+                "cohort_week": weeks[i].isoformat(),
+                "week_number": n,
+                "active_users": int(active[i, n]),
+                "retention": round(float(retention[i, n]), 2),
+            }
+            for i in range(count)
+            for n in range(count - i)
+        ],
+    }
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reporting.models import DailyMetric, RollupWatermark
+from reporting.services import rollup_daily_metrics
+
+
+class Command(BaseCommand):
+    help = 'Adds the rows written since the last run to the daily metric rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true', help='Drop the rollups and watermarks and roll up all history again.'
+        )
+        parser.add_argument('--batch-size', type=int, default=100_000, help='Source rows per transaction.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                DailyMetric.objects.all().delete()
+                RollupWatermark.objects.all().delete()
+        processed = rollup_daily_metrics(batch_size=options['batch_size'])
+        summary = ', '.join(f'{count} {source}' for source, count in processed.items())
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {summary}.'))
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from reporting.services import rollup_tournament_revenue
+from wallet.models import Transaction, TransactionArchive
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily per-tournament revenue rollups for a range of days.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Closed days to rebuild, ending yesterday.')
+        parser.add_argument('--start', type=date.fromisoformat, help='First day (YYYY-MM-DD); overrides --days.')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day (YYYY-MM-DD), defaults to yesterday.')
+        parser.add_argument(
+            '--all', action='store_true', help='Start at the first transaction; the backfill after upgrading.'
+        )
+
+    def handle(self, *args, **options):
+        end = options['end'] or timezone.localdate() - timedelta(days=1)
+        start = options['start'] or end - timedelta(days=options['days'] - 1)
+        if options['all']:
+            first = [
+                model.objects.aggregate(first=Min('timestamp'))['first']
+                for model in (Transaction, TransactionArchive)
+            ]
+            first = [timestamp for timestamp in first if timestamp is not None]
+            if not first:
+                self.stdout.write('No transactions to roll up.')
+                return
+            start = timezone.localdate(min(first))
+        if start > end:
+            raise CommandError('The start day must not be after the end day.')
+
+        rows = 0
+        day = start
+        # One month per transaction keeps each rebuild's delete and insert small.
+        while day <= end:
+            chunk_end = min(day + timedelta(days=30), end)
+            rows += rollup_tournament_revenue(day, chunk_end)
+            day = chunk_end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {rows} revenue rows from {start} to {end}.'))
@@ -0,0 +1,47 @@
+import logging
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .activity import record_visit
+
+logger = logging.getLogger(__name__)
+
+
+class ActiveVisitorMiddleware:
+    """
+    Records the visitor of each successful GET. It runs after the view, when
+    DRF has authenticated the user and resolved the tournament or post, and
+    never fails the request when Redis is unavailable.
+    """
+
+    IGNORED_PREFIXES = ("/admin/", "/static/", "/media/", "/api/schema/")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method == "GET"
+            and 200 <= response.status_code < 300
+            and not request.path.startswith(self.IGNORED_PREFIXES)
+        ):
+            resource, resource_id = self.resource(request, response)
+            try:
+                record_visit(request, resource, resource_id)
+            except RedisError as exc:
+                logger.warning(f"Could not record visit: {exc}")
+        return response
+
+    @staticmethod
+    def resource(request, response):
+        """The tracked page a detail view served, as (resource, id)."""
+        match = getattr(request, "resolver_match", None)
+        resource = match and settings.ACTIVITY_TRACKED_VIEWS.get(match.view_name)
+        if not resource:
+            return None, None
+        data = getattr(response, "data", None)
+        if isinstance(data, dict) and data.get("id") is not None:
+            return resource, data["id"]
+        return resource, match.kwargs.get("slug") or match.kwargs.get("pk")
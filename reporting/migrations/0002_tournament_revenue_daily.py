@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reporting", "0001_initial"),
+        ("tournaments", "0008_entry_fee_refund"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TournamentRevenueDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "entry_fees",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "prizes",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "refunds",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("entries", models.PositiveIntegerField(default=0)),
+                (
+                    "game",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="daily_revenue",
+                        to="tournaments.game",
+                    ),
+                ),
+                (
+                    "tournament",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="daily_revenue",
+                        to="tournaments.tournament",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Tournament Revenue",
+                "verbose_name_plural": "Daily Tournament Revenue",
+                "ordering": ["-day"],
+                "indexes": [
+                    models.Index(
+                        fields=["day", "tournament"], name="reporting_t_day_dd10ab_idx"
+                    )
+                ],
+            },
+        ),
+    ]
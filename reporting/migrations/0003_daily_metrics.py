@@ -0,0 +1,85 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reporting", "0002_tournament_revenue_daily"),
+        ("tournaments", "0008_entry_fee_refund"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=30, unique=True)),
+                ("last_id", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyMetric",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "metric",
+                    models.CharField(
+                        choices=[
+                            ("entry_fees", "Entry fees"),
+                            ("prizes", "Prizes"),
+                            ("withdrawals", "Withdrawals"),
+                            ("participations", "Participations"),
+                            ("referrals", "Referrals"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "value",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "game",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="daily_metrics",
+                        to="tournaments.game",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Metric",
+                "verbose_name_plural": "Daily Metrics",
+                "ordering": ["-day"],
+                "indexes": [
+                    models.Index(
+                        fields=["metric", "day"], name="reporting_d_metric_3463f1_idx"
+                    )
+                ],
+            },
+        ),
+    ]
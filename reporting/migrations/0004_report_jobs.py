@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reporting", "0003_daily_metrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="completed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="filters_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="report",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("running", "Running"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=10,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="report",
+            name="data",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="report",
+            index=models.Index(
+                fields=["report_type", "filters_hash", "status"],
+                name="reporting_r_report__51442c_idx",
+            ),
+        ),
+    ]
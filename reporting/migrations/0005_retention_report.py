@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reporting", "0004_report_jobs"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="report",
+            name="report_type",
+            field=models.CharField(
+                choices=[
+                    ("revenue_report", "Revenue Report"),
+                    ("players_report", "Players Report"),
+                    ("tournament_report", "Tournament Report"),
+                    ("finance_report", "Finance Report"),
+                    ("marketing_roi_report", "Marketing ROI Report"),
+                    ("retention_report", "Retention Report"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -2,20 +2,33 @@ from django.db import models
 
 class Report(models.Model):
     """
-    Stores the results of generated reports to act as a cache.
+    Stores the results of generated reports to act as a cache. Each row is
+    one generation job for a report type and set of filters (identified by
+    ``filters_hash``); ``data`` is filled in by generate_report_task.
     """
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
     REPORT_TYPE_CHOICES = [
         ("revenue_report", "Revenue Report"),
         ("players_report", "Players Report"),
         ("tournament_report", "Tournament Report"),
         ("finance_report", "Finance Report"),
         ("marketing_roi_report", "Marketing ROI Report"),
+        ("retention_report", "Retention Report"),
     ]
 
     report_type = models.CharField(max_length=50, choices=REPORT_TYPE_CHOICES)
     generated_at = models.DateTimeField(auto_now_add=True)
-    data = models.JSONField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    data = models.JSONField(null=True, blank=True)
     filters = models.JSONField(default=dict)
+    filters_hash = models.CharField(max_length=64, db_index=True, blank=True)
+    error = models.TextField(blank=True)
 
     class Meta:
         verbose_name = "Generated Report"
@@ -23,7 +36,98 @@ class Report(models.Model):
         ordering = ["-generated_at"]
         indexes = [
             models.Index(fields=['report_type']),
+            models.Index(fields=['report_type', 'filters_hash', 'status']),
         ]
 
     def __str__(self):
         return f"{self.get_report_type_display()} generated at {self.generated_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class TournamentRevenueDaily(models.Model):
+    """
+    Entry fees, prizes and refunds per tournament per day, rolled up from
+    wallet transactions so revenue reports read this table instead of the
+    transaction log. Rows without a tournament hold the day's unattributed
+    transactions.
+    """
+    day = models.DateField()
+    tournament = models.ForeignKey(
+        "tournaments.Tournament",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="daily_revenue",
+    )
+    game = models.ForeignKey(
+        "tournaments.Game",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="daily_revenue",
+    )
+    entry_fees = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    prizes = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    refunds = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    entries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Daily Tournament Revenue"
+        verbose_name_plural = "Daily Tournament Revenue"
+        ordering = ["-day"]
+        indexes = [
+            models.Index(fields=["day", "tournament"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.tournament_id}: {self.entry_fees}"
+
+
+class DailyMetric(models.Model):
+    """
+    One additive metric per day and game (game is empty for metrics that have
+    none, such as withdrawals and referrals). ``value`` holds money totals and
+    ``count`` the number of source rows. Filled incrementally from the rows
+    past each RollupWatermark by rollup_daily_metrics.
+    """
+    METRIC_CHOICES = [
+        ("entry_fees", "Entry fees"),
+        ("prizes", "Prizes"),
+        ("withdrawals", "Withdrawals"),
+        ("participations", "Participations"),
+        ("referrals", "Referrals"),
+    ]
+
+    day = models.DateField()
+    game = models.ForeignKey(
+        "tournaments.Game",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="daily_metrics",
+    )
+    metric = models.CharField(max_length=30, choices=METRIC_CHOICES)
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Daily Metric"
+        verbose_name_plural = "Daily Metrics"
+        ordering = ["-day"]
+        indexes = [
+            models.Index(fields=["metric", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.metric} ({self.game_id}): {self.value} / {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Highest source row id already added to DailyMetric, per source table.
+    """
+    source = models.CharField(max_length=30, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.last_id}"
@@ -1,7 +1,190 @@
 import csv
-from io import StringIO
+import re
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 from rest_framework.renderers import BaseRenderer
 
+from wallet.statements import Echo
+
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+# Per report type: an optional summary block of (label, key) pairs read from
+# data["summary"], then tables of (title, data key, [(header, key), ...]).
+REPORT_CSV_SCHEMAS = {
+    "revenue_report": {
+        "summary": (
+            "Revenue Report Summary",
+            [
+                ("Total Revenue", "total_revenue"),
+                ("Platform Share", "platform_share"),
+                ("Players Share", "players_share"),
+                ("Start Date", "start_date"),
+                ("End Date", "end_date"),
+            ],
+        ),
+        "tables": [
+            (
+                "Revenue by Tournament",
+                "by_tournament",
+                [("Tournament Name", "tournament_name"), ("Total Revenue", "total_revenue")],
+            ),
+            ("Revenue by Game", "by_game", [("Game Name", "game_name"), ("Total Revenue", "total_revenue")]),
+            ("Daily Revenue", "timeline", [("Date", "date"), ("Revenue", "revenue")]),
+        ],
+    },
+    "players_report": {
+        "summary": (
+            "Players Report Summary",
+            [
+                ("Total Users", "total_users"),
+                ("Active Players", "active_players"),
+                ("Avg Participation", "avg_participation_per_player"),
+                ("Start Date", "start_date"),
+                ("End Date", "end_date"),
+            ],
+        ),
+        "tables": [
+            (
+                "Player Distribution by Game",
+                "distribution_by_game",
+                [("Game Name", "game_name"), ("Player Count", "player_count"), ("Percentage", "percentage")],
+            ),
+        ],
+    },
+    "tournament_report": {
+        "summary": None,
+        "tables": [
+            (
+                "All Tournaments",
+                "all_tournaments",
+                [
+                    ("Tournament Name", "name"),
+                    ("Game", "game"),
+                    ("Start Date", "start_date"),
+                    ("Participants", "participant_count"),
+                    ("Capacity", "capacity"),
+                    ("Fill Rate", "fill_rate"),
+                    ("Revenue", "revenue"),
+                ],
+            ),
+            (
+                "Most Popular Tournaments",
+                "most_popular",
+                [("Tournament Name", "name"), ("Participants", "participant_count")],
+            ),
+            (
+                "Most Profitable Tournaments",
+                "most_profitable",
+                [("Tournament Name", "name"), ("Revenue", "revenue")],
+            ),
+        ],
+    },
+    "finance_report": {
+        "summary": (
+            "Financial Report Summary",
+            [
+                ("Total Revenue", "total_revenue"),
+                ("Total Prize Paid", "total_prize_paid"),
+                ("Net Profit", "net_profit"),
+                ("Start Date", "start_date"),
+                ("End Date", "end_date"),
+            ],
+        ),
+        "tables": [
+            (
+                "Monthly Cash Flow",
+                "cash_flow",
+                [("Month", "month"), ("Income", "income"), ("Expenses", "expenses"), ("Net Flow", "net_flow")],
+            ),
+        ],
+    },
+    "marketing_roi_report": {
+        "summary": (
+            "Marketing Report Summary",
+            [
+                ("Total Referred Users", "total_referred_users"),
+                ("Revenue from Referred Users", "revenue_from_referred_users"),
+                ("Start Date", "start_date"),
+                ("End Date", "end_date"),
+            ],
+        ),
+        "tables": [
+            ("Top Referrers", "by_referrer", [("Referrer", "referrer__username"), ("New Users", "new_users")]),
+        ],
+    },
+    "retention_report": {
+        "summary": (
+            "Retention Report Summary",
+            [
+                ("Cohorts", "cohorts"),
+                ("Users", "users"),
+                ("Start Date", "start_date"),
+                ("End Date", "end_date"),
+            ],
+        ),
+        "tables": [
+            ("Cohorts", "cohorts", [("Week", "week"), ("Size", "size")]),
+            (
+                "Retention",
+                "retention",
+                [
+                    ("Cohort Week", "cohort_week"),
+                    ("Week Number", "week_number"),
+                    ("Active Users", "active_users"),
+                    ("Retention", "retention"),
+                ],
+            ),
+        ],
+    },
+}
+
+
+def csv_report_lines(data, report_type):
+    """
+    Yields a report as CSV lines following its schema in REPORT_CSV_SCHEMAS,
+    one line at a time, so a long tournament listing is never held as text.
+    """
+    writer = csv.writer(Echo())
+    schema = REPORT_CSV_SCHEMAS.get(report_type)
+    if schema is None:
+        yield writer.writerow(['Error'])
+        yield writer.writerow(['Unsupported data structure for CSV export.'])
+        return
+
+    if schema["summary"]:
+        title, fields = schema["summary"]
+        summary = data.get('summary', {})
+        yield writer.writerow([title])
+        for label, key in fields:
+            yield writer.writerow([label, summary.get(key)])
+        yield writer.writerow([])
+
+    for title, key, columns in schema["tables"]:
+        yield writer.writerow([title])
+        yield writer.writerow([header for header, _ in columns])
+        for item in data.get(key, []):
+            yield writer.writerow([item.get(column) for _, column in columns])
+        yield writer.writerow([])
+
+
+def streaming_csv_response(request, data, report_type, filename):
+    """
+    Streams a report as CSV, gzipped on the fly when the client accepts it.
+    """
+    lines = (line.encode('utf-8') for line in csv_report_lines(data, report_type))
+    response = StreamingHttpResponse(content_type='text/csv; charset=utf-8')
+    if ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response.streaming_content = compress_sequence(lines)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response.streaming_content = lines
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 class CSVRenderer(BaseRenderer):
     media_type = 'text/csv'
     format = 'csv'
@@ -9,67 +192,12 @@ class CSVRenderer(BaseRenderer):
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
         """
-        Renders report data into CSV format.
-        This is a simplified implementation that handles a specific report structure.
+        Renders report data into CSV format, using the schema of the view's
+        ``report_type``. Ready reports are streamed by the views with
+        streaming_csv_response; this covers any other response.
         """
         if not data:
             return ''
 
-        string_buffer = StringIO()
-        writer = csv.writer(string_buffer)
-
-        # Heuristic to determine which report we're rendering
-        if 'summary' in data and 'total_revenue' in data['summary']:
-            self.render_revenue_report(writer, data)
-        elif 'summary' in data and 'active_players' in data['summary']:
-            self.render_players_report(writer, data)
-        # Add other report types here
-        else:
-            # Fallback for unknown structure
-            writer.writerow(['Error'])
-            writer.writerow(['Unsupported data structure for CSV export.'])
-
-        return string_buffer.getvalue()
-
-    def render_revenue_report(self, writer, data):
-        # Summary
-        writer.writerow(['Revenue Report Summary'])
-        summary = data.get('summary', {})
-        writer.writerow(['Total Revenue', summary.get('total_revenue')])
-        writer.writerow(['Platform Share', summary.get('platform_share')])
-        writer.writerow(['Players Share', summary.get('players_share')])
-        writer.writerow([]) # Spacer
-
-        # By Tournament
-        writer.writerow(['Revenue by Tournament'])
-        writer.writerow(['Tournament Name', 'Total Revenue'])
-        for item in data.get('by_tournament', []):
-            writer.writerow([item.get('tournament_name'), item.get('total_revenue')])
-        writer.writerow([])
-
-        # By Game
-        writer.writerow(['Revenue by Game'])
-        writer.writerow(['Game Name', 'Total Revenue'])
-        for item in data.get('by_game', []):
-            writer.writerow([item.get('game_name'), item.get('total_revenue')])
-        writer.writerow([])
-
-    def render_players_report(self, writer, data):
-        # Summary
-        writer.writerow(['Players Report Summary'])
-        summary = data.get('summary', {})
-        writer.writerow(['Total Users', summary.get('total_users')])
-        writer.writerow(['Active Players', summary.get('active_players')])
-        writer.writerow(['Avg Participation', summary.get('avg_participation_per_player')])
-        writer.writerow([])
-
-        # Distribution by Game
-        writer.writerow(['Player Distribution by Game'])
-        writer.writerow(['Game Name', 'Player Count', 'Percentage'])
-        for item in data.get('distribution_by_game', []):
-            writer.writerow([
-                item.get('game_name'),
-                item.get('player_count'),
-                item.get('percentage')
-            ])
-        writer.writerow([])
+        view = (renderer_context or {}).get('view')
+        return ''.join(csv_report_lines(data, getattr(view, 'report_type', None)))
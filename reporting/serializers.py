@@ -1,6 +1,60 @@
 from rest_framework import serializers
 
 
+class ReportFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the report endpoints; dates are inclusive."""
+
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        start_date = attrs.get("start_date")
+        end_date = attrs.get("end_date")
+        if start_date and end_date and start_date > end_date:
+            raise serializers.ValidationError("start_date must be on or before end_date.")
+        return attrs
+
+
+class TournamentReportFilterSerializer(ReportFilterSerializer):
+    game_id = serializers.IntegerField(required=False, min_value=1)
+    page = serializers.IntegerField(required=False, min_value=1)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=500)
+
+
+class ReportJobSerializer(serializers.Serializer):
+    job_id = serializers.IntegerField(source="id")
+    report_type = serializers.CharField()
+    status = serializers.CharField()
+    filters = serializers.JSONField()
+    error = serializers.CharField()
+    generated_at = serializers.DateTimeField()
+
+
+class ActiveUsersQuerySerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+
+
+class ActiveUsersSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    dau = serializers.IntegerField()
+    wau = serializers.IntegerField()
+    mau = serializers.IntegerField()
+    dau_mau_ratio = serializers.FloatField()
+
+
+class UniqueViewersQuerySerializer(serializers.Serializer):
+    resource = serializers.ChoiceField(choices=["tournament", "post"])
+    id = serializers.CharField(max_length=255)
+    days = serializers.IntegerField(required=False, default=30, min_value=1, max_value=90)
+
+
+class UniqueViewersSerializer(serializers.Serializer):
+    resource = serializers.CharField()
+    id = serializers.CharField()
+    days = serializers.IntegerField()
+    unique_viewers = serializers.IntegerField()
+
+
 class StatisticsSerializer(serializers.Serializer):
     total_prizes_paid = serializers.DecimalField(max_digits=15, decimal_places=2)
     active_users_count = serializers.IntegerField()
@@ -20,11 +74,12 @@ class RevenueReportSerializer(serializers.Serializer):
         total_revenue = serializers.DecimalField(max_digits=15, decimal_places=2)
 
     class ByTournamentSerializer(serializers.Serializer):
+        tournament_id = serializers.IntegerField()
         tournament_name = serializers.CharField()
         total_revenue = serializers.DecimalField(max_digits=15, decimal_places=2)
 
     class TimelineSerializer(serializers.Serializer):
-        date = serializers.DateTimeField()
+        date = serializers.DateField()
         revenue = serializers.DecimalField(max_digits=15, decimal_places=2)
 
     summary = SummarySerializer()
@@ -68,7 +123,14 @@ class TournamentReportSerializer(serializers.Serializer):
         name = serializers.CharField()
         revenue = serializers.DecimalField(max_digits=15, decimal_places=2)
 
+    class PaginationSerializer(serializers.Serializer):
+        page = serializers.IntegerField()
+        page_size = serializers.IntegerField()
+        total = serializers.IntegerField()
+        pages = serializers.IntegerField()
+
     all_tournaments = AllTournamentsSerializer(many=True)
+    pagination = PaginationSerializer()
     most_popular = MostPopularSerializer(many=True)
     most_profitable = MostProfitableSerializer(many=True)
 
@@ -106,3 +168,26 @@ class MarketingReportSerializer(serializers.Serializer):
 
     summary = SummarySerializer()
     by_referrer = ByReferrerSerializer(many=True)
+
+
+class RetentionReportSerializer(serializers.Serializer):
+    class SummarySerializer(serializers.Serializer):
+        cohorts = serializers.IntegerField()
+        users = serializers.IntegerField()
+        start_date = serializers.DateTimeField()
+        end_date = serializers.DateTimeField()
+
+    class CohortSerializer(serializers.Serializer):
+        week = serializers.DateField()
+        size = serializers.IntegerField()
+
+    class RetentionSerializer(serializers.Serializer):
+        cohort_week = serializers.DateField()
+        week_number = serializers.IntegerField()
+        active_users = serializers.IntegerField()
+        retention = serializers.FloatField()
+
+    summary = SummarySerializer()
+    cohorts = CohortSerializer(many=True)
+    matrix = serializers.ListField(child=serializers.ListField(child=serializers.FloatField(allow_null=True)))
+    retention = RetentionSerializer(many=True)
@@ -1,14 +1,28 @@
-from django.db.models import Sum, F, Count, ExpressionWrapper, FloatField, Q
-from django.db.models.functions import TruncDay, TruncMonth
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Sum, F, Count, DecimalField, ExpressionWrapper, FloatField, Max, Min, OuterRef, Q, Subquery,
+)
+from django.db.models.functions import Coalesce, TruncDate
 from django.utils import timezone
-from datetime import timedelta
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-import re
+from rest_framework.utils.encoders import JSONEncoder
 
-from wallet.models import Transaction
+from wallet.models import Transaction, TransactionArchive, Wallet
 from tournaments.models import Tournament, Game, Participant
 from users.models import User, Referral
 
+from .cohorts import generate_retention_report
+from .models import DailyMetric, Report, RollupWatermark, TournamentRevenueDaily
+
+logger = logging.getLogger(__name__)
+
 
 BOT_USERNAME = "AtomGameBot"
 BOT_EMAIL = "atomgamebot@example.com"
@@ -45,6 +59,293 @@ def ensure_bot_user():
     return bot_user
 
 
+def _revenue_rows(transactions):
+    """
+    Groups transactions into per-day, per-tournament revenue rows shaped like
+    TournamentRevenueDaily. Refunds are credits attributed to a tournament.
+    """
+    return (
+        transactions.filter(
+            Q(transaction_type__in=['entry_fee', 'prize']) | Q(tournament_id__isnull=False)
+        )
+        .annotate(day=TruncDate('timestamp'))
+        .values('day', 'tournament_id', 'game_id')
+        .annotate(
+            entry_fees=Coalesce(Sum('amount', filter=Q(transaction_type='entry_fee')), Decimal('0')),
+            prizes=Coalesce(Sum('amount', filter=Q(transaction_type='prize')), Decimal('0')),
+            refunds=Coalesce(
+                Sum(
+                    'amount',
+                    filter=Q(transaction_type__in=['deposit', 'token_earned'], tournament_id__isnull=False),
+                ),
+                Decimal('0'),
+            ),
+            entries=Count('id', filter=Q(transaction_type='entry_fee')),
+        )
+        .order_by()
+    )
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _archived_revenue_rows(transactions):
+    """
+    ``_revenue_rows`` over TransactionArchive rows, whose tournament and game
+    ids carry no foreign key: ids of since-deleted rows become None, as
+    SET_NULL would have made them in the hot table.
+    """
+    rows = list(_revenue_rows(transactions))
+    tournaments = set(
+        Tournament.objects.filter(id__in={row['tournament_id'] for row in rows}).values_list('id', flat=True)
+    )
+    games = set(Game.objects.filter(id__in={row['game_id'] for row in rows}).values_list('id', flat=True))
+    for row in rows:
+        if row['tournament_id'] not in tournaments:
+            row['tournament_id'] = None
+        if row['game_id'] not in games:
+            row['game_id'] = None
+    return rows
+
+
+def rollup_tournament_revenue(start_day, end_day):
+    """
+    Rebuilds the TournamentRevenueDaily rows of every day from ``start_day``
+    to ``end_day`` inclusive. Re-running a range replaces its rows, so it is
+    safe after a backfill or for days that are still receiving transactions.
+    Transactions moved to TransactionArchive are read from there, so
+    archiving never changes a rebuilt day.
+    """
+    window = {
+        'timestamp__gte': _day_start(start_day),
+        'timestamp__lt': _day_start(end_day + timedelta(days=1)),
+    }
+    totals = {}
+    for row in [
+        *_revenue_rows(Transaction.objects.filter(**window)),
+        *_archived_revenue_rows(TransactionArchive.objects.filter(**window)),
+    ]:
+        key = (row['day'], row['tournament_id'], row['game_id'])
+        if key not in totals:
+            totals[key] = row
+            continue
+        for field in ('entry_fees', 'prizes', 'refunds', 'entries'):
+            totals[key][field] += row[field]
+
+    with transaction.atomic():
+        TournamentRevenueDaily.objects.filter(day__gte=start_day, day__lte=end_day).delete()
+        TournamentRevenueDaily.objects.bulk_create(
+            [TournamentRevenueDaily(**row) for row in totals.values()], batch_size=1000
+        )
+    return len(totals)
+
+
+def _rollup_split(start_date):
+    """
+    Splits a revenue window at the first day the rollup has not reached and
+    returns ``(first_live_day, live_start)``. Days before ``first_live_day``
+    are read from TournamentRevenueDaily and everything from ``live_start``
+    on is aggregated live, so closed days the nightly rollup has not run for
+    yet (yesterday before 00:15) still count. Without any rollups the whole
+    window is live; ``rollup_revenue --all`` backfills them.
+    """
+    last = TournamentRevenueDaily.objects.aggregate(last=Max('day'))['last']
+    if last is None:
+        return date.min, start_date
+    first_live_day = min(last + timedelta(days=1), timezone.localdate())
+    return first_live_day, max(start_date, _day_start(first_live_day))
+
+
+def revenue_rows(start_date, end_date):
+    """
+    Revenue rows for the window: rolled-up days come from the rollup table
+    and the days after the latest rollup, today included, are aggregated
+    live.
+    """
+    first_live_day, live_start = _rollup_split(start_date)
+    rows = list(
+        TournamentRevenueDaily.objects.filter(
+            day__gte=timezone.localdate(start_date),
+            day__lte=timezone.localdate(end_date),
+            day__lt=first_live_day,
+        ).values('day', 'tournament_id', 'game_id', 'entry_fees', 'prizes', 'refunds', 'entries')
+    )
+    if end_date >= live_start:
+        rows += list(
+            _revenue_rows(Transaction.objects.filter(timestamp__gte=live_start, timestamp__lte=end_date))
+        )
+    return rows
+
+
+# Rows younger than this are left for the next run, so transactions still in
+# flight when a run reads its batch cannot commit below the watermark.
+METRIC_ROLLUP_LAG = timedelta(minutes=5)
+METRIC_ROLLUP_BATCH = 100_000
+TRANSACTION_METRICS = {
+    'entry_fee': 'entry_fees',
+    'prize': 'prizes',
+    'withdrawal': 'withdrawals',
+}
+
+
+def _transaction_metric_rows(transactions):
+    grouped = (
+        transactions.filter(transaction_type__in=list(TRANSACTION_METRICS))
+        .annotate(day=TruncDate('timestamp'))
+        .values('day', 'game_id', 'transaction_type')
+        .annotate(value=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    for row in grouped:
+        yield {
+            'day': row['day'],
+            'game_id': row['game_id'],
+            'metric': TRANSACTION_METRICS[row['transaction_type']],
+            'value': row['value'],
+            'count': row['count'],
+        }
+
+
+def _participant_metric_rows(participants):
+    # Participations are dated by when the player joined; a tournament's
+    # start date can still be edited after its participants are rolled up.
+    grouped = (
+        participants.annotate(day=TruncDate('created_at'), game=F('tournament__game_id'))
+        .values('day', 'game')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for row in grouped:
+        yield {
+            'day': row['day'],
+            'game_id': row['game'],
+            'metric': 'participations',
+            'value': Decimal('0'),
+            'count': row['count'],
+        }
+
+
+def _referral_metric_rows(referrals):
+    grouped = (
+        referrals.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for row in grouped:
+        yield {
+            'day': row['day'],
+            'game_id': None,
+            'metric': 'referrals',
+            'value': Decimal('0'),
+            'count': row['count'],
+        }
+
+
+# source -> (model, field that dates a row, field the lag applies to, row
+# grouper, metrics produced).
+METRIC_SOURCES = {
+    'transactions': (
+        Transaction, 'timestamp', 'timestamp', _transaction_metric_rows, set(TRANSACTION_METRICS.values())
+    ),
+    'participants': (Participant, 'created_at', 'created_at', _participant_metric_rows, {'participations'}),
+    'referrals': (Referral, 'created_at', 'created_at', _referral_metric_rows, {'referrals'}),
+}
+
+
+def _add_to_daily_metrics(rows):
+    increments = defaultdict(lambda: [Decimal('0'), 0])
+    for row in rows:
+        key = (row['day'], row['game_id'], row['metric'])
+        increments[key][0] += row['value']
+        increments[key][1] += row['count']
+    if not increments:
+        return
+
+    existing = {
+        (metric.day, metric.game_id, metric.metric): metric
+        for metric in DailyMetric.objects.filter(
+            day__in={day for day, _, _ in increments},
+            metric__in={name for _, _, name in increments},
+        )
+    }
+    to_update, to_create = [], []
+    for (day, game_id, name), (value, count) in increments.items():
+        metric = existing.get((day, game_id, name))
+        if metric is None:
+            to_create.append(DailyMetric(day=day, game_id=game_id, metric=name, value=value, count=count))
+        else:
+            metric.value += value
+            metric.count += count
+            to_update.append(metric)
+    DailyMetric.objects.bulk_update(to_update, ['value', 'count'], batch_size=1000)
+    DailyMetric.objects.bulk_create(to_create, batch_size=1000)
+
+
+def rollup_daily_metrics(batch_size=METRIC_ROLLUP_BATCH):
+    """
+    Adds the source rows written since each source's watermark to DailyMetric
+    and moves the watermarks forward, one id window per transaction. A
+    window stops before the first row younger than the lag. Only ids are
+    tracked, so rows must not change once they are rolled up; the counted
+    transaction types are all written as final. Returns the number of
+    source rows added per source.
+    """
+    for source in METRIC_SOURCES:
+        RollupWatermark.objects.get_or_create(source=source)
+
+    cutoff = timezone.now() - METRIC_ROLLUP_LAG
+    processed = {}
+    for source, (model, _, lag_field, grouper, _) in METRIC_SOURCES.items():
+        processed[source] = 0
+        while True:
+            with transaction.atomic():
+                watermark = RollupWatermark.objects.select_for_update().get(source=source)
+                newer = model.objects.filter(id__gt=watermark.last_id)
+                if lag_field:
+                    first_young = newer.filter(**{f'{lag_field}__gte': cutoff}).aggregate(first=Min('id'))['first']
+                    if first_young is not None:
+                        newer = newer.filter(id__lt=first_young)
+                upper = list(newer.order_by('id').values_list('id', flat=True)[batch_size - 1:batch_size])
+                upper = upper[0] if upper else newer.aggregate(upper=Max('id'))['upper']
+                if upper is None:
+                    break
+                rows = list(grouper(newer.filter(id__lte=upper)))
+                _add_to_daily_metrics(rows)
+                processed[source] += sum(row['count'] for row in rows)
+                watermark.last_id = upper
+                watermark.save(update_fields=['last_id', 'updated_at'])
+    return processed
+
+
+def metric_rows(metrics, start_date, end_date):
+    """
+    Metric rows for every local day from ``start_date`` to ``end_date``: the
+    rolled-up days plus the source rows past the watermarks, aggregated live
+    in the same shape. The live part is only what the last rollup has not
+    reached, so it stays small.
+    """
+    first_day, last_day = timezone.localdate(start_date), timezone.localdate(end_date)
+    rows = list(
+        DailyMetric.objects.filter(metric__in=metrics, day__gte=first_day, day__lte=last_day)
+        .values('day', 'game_id', 'metric', 'value', 'count')
+    )
+    watermarks = dict(RollupWatermark.objects.values_list('source', 'last_id'))
+    for source, (model, day_field, _, grouper, produced) in METRIC_SOURCES.items():
+        if not produced & set(metrics):
+            continue
+        tail = model.objects.filter(
+            id__gt=watermarks.get(source, 0),
+            **{
+                f'{day_field}__gte': _day_start(first_day),
+                f'{day_field}__lt': _day_start(last_day + timedelta(days=1)),
+            },
+        )
+        rows += [row for row in grouper(tail) if row['metric'] in metrics]
+    return rows
+
+
 def generate_revenue_report(filters=None):
     """
     Generates a comprehensive revenue report based on provided filters.
@@ -52,43 +353,41 @@ def generate_revenue_report(filters=None):
     if filters is None:
         filters = {}
 
-    revenue_transactions = Transaction.objects.filter(transaction_type='entry_fee')
     end_date = filters.get('end_date', timezone.now())
     start_date = filters.get('start_date', end_date - timedelta(days=30))
-    revenue_transactions = revenue_transactions.filter(timestamp__range=[start_date, end_date])
+    rows = revenue_rows(start_date, end_date)
 
-    total_revenue = revenue_transactions.aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    total_revenue = sum((row['entry_fees'] for row in rows), Decimal('0'))
     platform_share = total_revenue * Decimal('0.30')
     players_share = total_revenue * Decimal('0.70')
 
-    revenue_by_tournament_raw = revenue_transactions.values('description').annotate(total=Sum('amount')).order_by('-total')
-    revenue_by_tournament = []
-    tournament_revenue_map = {}
-    for item in revenue_by_tournament_raw:
-        match = re.search(r'Entry fee for tournament: (.+)', item['description'])
-        if match:
-            tournament_name = match.group(1)
-            revenue_by_tournament.append({
-                "tournament_name": tournament_name,
-                "total_revenue": item['total'],
-            })
-            tournament_revenue_map[tournament_name] = item['total']
-
-    tournaments = Tournament.objects.filter(name__in=tournament_revenue_map.keys()).select_related('game')
-    revenue_by_game_map = {}
-    for t in tournaments:
-        game_name = t.game.name
-        revenue = tournament_revenue_map.get(t.name, Decimal('0'))
-        revenue_by_game_map[game_name] = revenue_by_game_map.get(game_name, Decimal('0')) + revenue
-
-    revenue_by_game = [{"game_name": name, "total_revenue": total} for name, total in revenue_by_game_map.items()]
-
-    timeline_data = (
-        revenue_transactions.annotate(day=TruncDay('timestamp'))
-        .values('day')
-        .annotate(total=Sum('amount'))
-        .order_by('day')
+    by_tournament_map = defaultdict(Decimal)
+    by_game_map = defaultdict(Decimal)
+    timeline_map = defaultdict(Decimal)
+    for row in rows:
+        timeline_map[row['day']] += row['entry_fees']
+        if row['tournament_id'] and row['entry_fees']:
+            by_tournament_map[row['tournament_id']] += row['entry_fees']
+        if row['game_id'] and row['entry_fees']:
+            by_game_map[row['game_id']] += row['entry_fees']
+
+    tournament_names = dict(
+        Tournament.objects.filter(id__in=by_tournament_map).values_list('id', 'name')
     )
+    game_names = dict(Game.objects.filter(id__in=by_game_map).values_list('id', 'name'))
+
+    revenue_by_tournament = [
+        {
+            "tournament_id": tournament_id,
+            "tournament_name": tournament_names.get(tournament_id),
+            "total_revenue": total,
+        }
+        for tournament_id, total in sorted(by_tournament_map.items(), key=lambda item: -item[1])
+    ]
+    revenue_by_game = [
+        {"game_name": game_names.get(game_id), "total_revenue": total}
+        for game_id, total in by_game_map.items()
+    ]
 
     return {
         "summary": {
@@ -100,7 +399,10 @@ def generate_revenue_report(filters=None):
         },
         "by_game": revenue_by_game,
         "by_tournament": revenue_by_tournament,
-        "timeline": [{"date": item['day'].isoformat(), "revenue": item['total']} for item in timeline_data],
+        "timeline": [
+            {"date": day.isoformat(), "revenue": total}
+            for day, total in sorted(timeline_map.items())
+        ],
     }
 
 
@@ -117,14 +419,15 @@ def generate_players_report(filters=None):
     start_date = filters.get('start_date', end_date - timedelta(days=30))
 
     total_users = User.objects.count()
-    active_player_ids = Participant.objects.filter(
-        tournament__start_date__range=[start_date, end_date]
-    ).values_list('user_id', flat=True).distinct()
-    active_players_count = len(active_player_ids)
-
-    total_participations = Participant.objects.filter(
-        tournament__start_date__range=[start_date, end_date]
-    ).count()
+    # Distinct players do not add up across days, so they are counted from
+    # the participations themselves, dated like the participations rollup.
+    active_players_count = Participant.objects.filter(
+        created_at__range=[start_date, end_date]
+    ).values('user_id').distinct().count()
+
+    total_participations = sum(
+        row['count'] for row in metric_rows(['participations'], start_date, end_date)
+    )
     avg_participation = total_participations / active_players_count if active_players_count > 0 else 0
 
     participants_by_game = (
@@ -156,7 +459,7 @@ def generate_players_report(filters=None):
 
 def generate_financial_report(filters=None):
     """
-    Generates a detailed financial report.
+    Generates a detailed financial report from the daily metric rollups.
     """
     if filters is None:
         filters = {}
@@ -164,24 +467,17 @@ def generate_financial_report(filters=None):
     end_date = filters.get('end_date', timezone.now())
     start_date = filters.get('start_date', end_date - timedelta(days=365)) # Default to one year
 
-    transactions = Transaction.objects.filter(timestamp__range=[start_date, end_date])
-
-    total_prize_paid = transactions.filter(transaction_type='prize').aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    total_revenue = transactions.filter(transaction_type='entry_fee').aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    totals = defaultdict(Decimal)
+    months = defaultdict(lambda: {'income': Decimal('0'), 'expenses': Decimal('0')})
+    for row in metric_rows(['entry_fees', 'prizes', 'withdrawals'], start_date, end_date):
+        totals[row['metric']] += row['value']
+        side = 'income' if row['metric'] == 'entry_fees' else 'expenses'
+        months[row['day'].replace(day=1)][side] += row['value']
 
+    total_revenue = totals['entry_fees']
+    total_prize_paid = totals['prizes']
     net_profit = total_revenue * Decimal('0.30')
 
-    cash_flow = (
-        transactions.annotate(month=TruncMonth('timestamp'))
-        .values('month')
-        .annotate(
-            income=Sum('amount', filter=Q(transaction_type='entry_fee')),
-            expenses=Sum('amount', filter=Q(transaction_type__in=['prize', 'withdrawal']))
-        )
-        .order_by('month')
-    )
-
     return {
         "summary": {
             "total_revenue": total_revenue,
@@ -192,12 +488,12 @@ def generate_financial_report(filters=None):
         },
         "cash_flow": [
             {
-                "month": item['month'].strftime('%Y-%m'),
-                "income": item['income'] or Decimal('0'),
-                "expenses": item['expenses'] or Decimal('0'),
-                "net_flow": (item['income'] or Decimal('0')) - (item['expenses'] or Decimal('0')),
+                "month": month.strftime('%Y-%m'),
+                "income": flow['income'],
+                "expenses": flow['expenses'],
+                "net_flow": flow['income'] - flow['expenses'],
             }
-            for item in cash_flow
+            for month, flow in sorted(months.items())
         ]
     }
 
@@ -212,26 +508,34 @@ def generate_marketing_report(filters=None):
     end_date = filters.get('end_date', timezone.now())
     start_date = filters.get('start_date', end_date - timedelta(days=90))
 
+    referrals = Referral.objects.filter(created_at__range=[start_date, end_date])
     referrals_by_user = (
-        Referral.objects
-        .filter(created_at__range=[start_date, end_date])
+        referrals
         .values('referrer__username')
         .annotate(new_users=Count('referred'))
         .order_by('-new_users')
     )
 
-    referred_user_ids = Referral.objects.filter(
-        created_at__range=[start_date, end_date]
-    ).values_list('referred_id', flat=True)
-
-    revenue_from_referred = Transaction.objects.filter(
-        wallet__user_id__in=referred_user_ids,
-        transaction_type='entry_fee'
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    # Entry fees archived by archive_transactions still count.
+    referred_ids = referrals.values('referred_id')
+    entry_fees = [
+        Transaction.objects.filter(wallet__user_id__in=referred_ids),
+        TransactionArchive.objects.filter(
+            wallet_id__in=Wallet.objects.filter(user_id__in=referred_ids).values('id')
+        ),
+    ]
+    revenue_from_referred = sum(
+        (
+            transactions.filter(transaction_type='entry_fee').aggregate(total=Sum('amount'))['total']
+            or Decimal('0')
+            for transactions in entry_fees
+        ),
+        Decimal('0'),
+    )
 
     return {
         "summary": {
-            "total_referred_users": len(referred_user_ids),
+            "total_referred_users": sum(row['count'] for row in metric_rows(['referrals'], start_date, end_date)),
             "revenue_from_referred_users": revenue_from_referred,
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat(),
@@ -240,67 +544,268 @@ def generate_marketing_report(filters=None):
     }
 
 
+TOURNAMENT_REPORT_PAGE_SIZE = 50
+TOURNAMENT_REPORT_TOP_N = 10
+
+
+def _tournament_revenue(start_date, end_date):
+    """
+    Entry fees per tournament in the window as a subquery expression:
+    rolled-up days from the rollup table plus the live transactions after
+    them, as in revenue_rows.
+    """
+    first_live_day, live_start = _rollup_split(start_date)
+    rolled = (
+        TournamentRevenueDaily.objects.filter(
+            tournament=OuterRef('pk'),
+            day__gte=timezone.localdate(start_date),
+            day__lte=timezone.localdate(end_date),
+            day__lt=first_live_day,
+        )
+        .values('tournament')
+        .annotate(total=Sum('entry_fees'))
+        .values('total')
+    )
+    revenue = Coalesce(Subquery(rolled), Decimal('0'), output_field=DecimalField())
+    if end_date >= live_start:
+        live = (
+            Transaction.objects.filter(
+                tournament=OuterRef('pk'),
+                transaction_type='entry_fee',
+                timestamp__gte=live_start,
+                timestamp__lte=end_date,
+            )
+            .values('tournament')
+            .annotate(total=Sum('amount'))
+            .values('total')
+        )
+        revenue = ExpressionWrapper(
+            revenue + Coalesce(Subquery(live), Decimal('0'), output_field=DecimalField()),
+            output_field=DecimalField(),
+        )
+    return revenue
+
+
 def generate_tournament_report(filters=None):
     """
-    Generates a comprehensive tournament report.
+    Generates a comprehensive tournament report. Participant counts and
+    revenue are correlated subqueries, and the top lists and the requested
+    page of ``all_tournaments`` are each one ORDER BY ... LIMIT query, so the
+    query count does not grow with the number of tournaments.
     """
     if filters is None:
         filters = {}
 
-    tournaments = Tournament.objects.all().annotate(
-        participant_count=Count('participants', distinct=True)
-    ).order_by('-start_date')
-
+    end_date = filters.get('end_date', timezone.now())
+    start_date = filters.get('start_date', end_date - timedelta(days=30))
+    page_size = filters.get('page_size', TOURNAMENT_REPORT_PAGE_SIZE)
+    page = filters.get('page', 1)
+
+    participant_count = (
+        Participant.objects.filter(tournament=OuterRef('pk'))
+        .values('tournament')
+        .annotate(total=Count('user', distinct=True))
+        .values('total')
+    )
+    tournaments = Tournament.objects.annotate(
+        participant_count=Coalesce(Subquery(participant_count), 0),
+        revenue=_tournament_revenue(start_date, end_date),
+    )
     if 'game_id' in filters:
         tournaments = tournaments.filter(game_id=filters['game_id'])
 
-    most_popular_tournaments = sorted(
-        list(tournaments),
-        key=lambda t: t.participant_count,
-        reverse=True
-    )[:10]
-
-    revenue_data = generate_revenue_report(filters)
-    profitable_map = {t['tournament_name']: t['total_revenue'] for t in revenue_data['by_tournament']}
-
-    for t in tournaments:
-        t.revenue = profitable_map.get(t.name, Decimal('0'))
-
-    most_profitable_tournaments = sorted(
-        list(tournaments),
-        key=lambda t: t.revenue,
-        reverse=True
-    )[:10]
-
-    for t in tournaments:
-        if t.max_participants > 0:
-            t.fill_rate = (t.participant_count / t.max_participants) * 100
-        else:
-            t.fill_rate = 0
+    total = tournaments.count()
+    offset = (page - 1) * page_size
+    all_tournaments = tournaments.order_by('-start_date', '-id').values(
+        'name', 'game__name', 'start_date', 'participant_count', 'max_participants', 'revenue'
+    )[offset:offset + page_size]
+    most_popular = tournaments.order_by('-participant_count', '-start_date', '-id').values(
+        'name', 'participant_count'
+    )[:TOURNAMENT_REPORT_TOP_N]
+    most_profitable = tournaments.order_by('-revenue', '-start_date', '-id').values(
+        'name', 'revenue'
+    )[:TOURNAMENT_REPORT_TOP_N]
 
     return {
         "all_tournaments": [
             {
-                "name": t.name,
-                "game": t.game.name,
-                "start_date": t.start_date,
-                "participant_count": t.participant_count,
-                "capacity": t.max_participants,
-                "fill_rate": t.fill_rate,
-                "revenue": t.revenue,
+                "name": t['name'],
+                "game": t['game__name'],
+                "start_date": t['start_date'],
+                "participant_count": t['participant_count'],
+                "capacity": t['max_participants'],
+                "fill_rate": (
+                    (t['participant_count'] / t['max_participants']) * 100 if t['max_participants'] > 0 else 0
+                ),
+                "revenue": t['revenue'],
             }
-            for t in tournaments
-        ],
-        "most_popular": [
-            {
-                "name": t.name,
-                "participant_count": t.participant_count,
-            } for t in most_popular_tournaments
+            for t in all_tournaments
         ],
-        "most_profitable": [
-            {
-                "name": t.name,
-                "revenue": t.revenue,
-            } for t in most_profitable_tournaments
-        ]
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "pages": max(1, -(-total // page_size)),
+        },
+        "most_popular": list(most_popular),
+        "most_profitable": list(most_profitable),
+    }
+
+
+REPORT_GENERATORS = {
+    "revenue_report": generate_revenue_report,
+    "players_report": generate_players_report,
+    "tournament_report": generate_tournament_report,
+    "finance_report": generate_financial_report,
+    "marketing_roi_report": generate_marketing_report,
+    "retention_report": generate_retention_report,
+}
+
+
+def normalize_report_filters(filters):
+    """
+    Drops empty filters and turns dates into ISO strings, so equal filters
+    always store and hash the same way.
+    """
+    return {
+        key: value.isoformat() if isinstance(value, date) else value
+        for key, value in sorted(filters.items())
+        if value not in (None, "")
     }
+
+
+def report_filters_hash(report_type, filters):
+    payload = json.dumps([report_type, filters], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _generator_filters(filters):
+    """Stored filters as the generate_* functions expect them; end_date is inclusive."""
+    parsed = dict(filters)
+    if "start_date" in parsed:
+        day = date.fromisoformat(parsed["start_date"])
+        parsed["start_date"] = timezone.make_aware(datetime.combine(day, time.min))
+    if "end_date" in parsed:
+        day = date.fromisoformat(parsed["end_date"])
+        parsed["end_date"] = timezone.make_aware(datetime.combine(day, time.max))
+    return parsed
+
+
+def _enqueue_report(report_type, filters, filters_hash, now):
+    """
+    Returns the job already generating these filters, or creates one and
+    queues it. Jobs older than the task time limit are treated as lost.
+    """
+    from .tasks import generate_report_task
+
+    in_flight = (
+        Report.objects.filter(
+            report_type=report_type,
+            filters_hash=filters_hash,
+            status__in=[Report.Status.PENDING, Report.Status.RUNNING],
+            generated_at__gte=now - timedelta(seconds=settings.CELERY_TASK_TIME_LIMIT),
+        )
+        .order_by("-generated_at")
+        .first()
+    )
+    if in_flight:
+        return in_flight
+
+    job = Report.objects.create(report_type=report_type, filters=filters, filters_hash=filters_hash)
+    # Requests run in autocommit, so the row is visible to the worker by now.
+    generate_report_task.delay(job.id)
+    job.refresh_from_db()
+    return job
+
+
+def request_report(report_type, filters):
+    """
+    Returns ``(report, stale)`` for a report request. A ready row younger than
+    REPORT_CACHE_TTL_MINUTES is served as is. An older one, up to
+    REPORT_CACHE_MAX_STALE_HOURS, is served as stale while a refresh is
+    queued. Otherwise the returned row is the queued job to poll, which is
+    already ready when tasks run eagerly.
+    """
+    filters = normalize_report_filters(filters)
+    filters_hash = report_filters_hash(report_type, filters)
+    now = timezone.now()
+
+    cached = (
+        Report.objects.filter(
+            report_type=report_type,
+            filters_hash=filters_hash,
+            status=Report.Status.READY,
+            completed_at__gte=now - timedelta(hours=settings.REPORT_CACHE_MAX_STALE_HOURS),
+        )
+        .order_by("-completed_at")
+        .first()
+    )
+    if cached and cached.completed_at >= now - timedelta(minutes=settings.REPORT_CACHE_TTL_MINUTES):
+        return cached, False
+
+    job = _enqueue_report(report_type, filters, filters_hash, now)
+    if cached and job.status != Report.Status.READY:
+        return cached, True
+    return job, False
+
+
+def latest_report(report_type, filters=None):
+    """The most recent ready snapshot of a report, however old, or None."""
+    filters = normalize_report_filters(filters or {})
+    return (
+        Report.objects.filter(
+            report_type=report_type,
+            filters_hash=report_filters_hash(report_type, filters),
+            status=Report.Status.READY,
+        )
+        .order_by("-completed_at")
+        .first()
+    )
+
+
+def refresh_reports(report_types, filters=None):
+    """Queues a regeneration of each report type and returns the jobs."""
+    filters = normalize_report_filters(filters or {})
+    now = timezone.now()
+    return [
+        _enqueue_report(report_type, filters, report_filters_hash(report_type, filters), now)
+        for report_type in report_types
+    ]
+
+
+def run_report(report_id):
+    """
+    Generates a queued report and stores its data. Older results for the
+    same filters are deleted once the new one is ready. Returns the final
+    status, or None if the job was already picked up.
+    """
+    claimed = Report.objects.filter(id=report_id, status=Report.Status.PENDING).update(
+        status=Report.Status.RUNNING
+    )
+    if not claimed:
+        return None
+    report = Report.objects.get(id=report_id)
+
+    try:
+        data = REPORT_GENERATORS[report.report_type](_generator_filters(report.filters))
+    except Exception as exc:
+        logger.exception(f"Generating report {report.id} ({report.report_type}) failed")
+        report.status = Report.Status.FAILED
+        report.error = str(exc)
+        report.completed_at = timezone.now()
+        report.save(update_fields=["status", "error", "completed_at"])
+        return report.status
+
+    # Stored the way the API renders it: decimals as numbers, dates as ISO strings.
+    report.data = json.loads(json.dumps(data, cls=JSONEncoder))
+    report.status = Report.Status.READY
+    report.completed_at = timezone.now()
+    report.save(update_fields=["data", "status", "completed_at"])
+
+    Report.objects.filter(
+        report_type=report.report_type,
+        filters_hash=report.filters_hash,
+        status__in=[Report.Status.READY, Report.Status.FAILED],
+        completed_at__lt=report.completed_at,
+    ).delete()
+    return report.status
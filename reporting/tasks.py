@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .services import (
+    REPORT_GENERATORS,
+    refresh_reports,
+    rollup_daily_metrics,
+    rollup_tournament_revenue,
+    run_report,
+)
+
+
+@shared_task
+def rollup_tournament_revenue_task(days=2):
+    """
+    Celery beat task that rebuilds the revenue rollups of the last ``days``
+    closed days, which also picks up transactions that committed late.
+    """
+    yesterday = timezone.localdate() - timedelta(days=1)
+    return rollup_tournament_revenue(yesterday - timedelta(days=days - 1), yesterday)
+
+
+@shared_task
+def rollup_daily_metrics_task():
+    """
+    Celery beat task that adds the transactions, participations and referrals
+    written since the last run to the daily metric rollups.
+    """
+    return rollup_daily_metrics()
+
+
+@shared_task
+def generate_report_task(report_id):
+    """
+    Generates a report requested through the reporting API and stores the
+    result on its Report row.
+    """
+    return run_report(report_id)
+
+
+@shared_task
+def refresh_dashboard_reports_task():
+    """
+    Celery beat task that regenerates the unfiltered report snapshots the
+    admin dashboard reads.
+    """
+    return len(refresh_reports(REPORT_GENERATORS))
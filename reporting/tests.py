@@ -1,7 +1,11 @@
 from django.test import TestCase
 from django.utils import timezone
 from decimal import Decimal
+import csv
 import datetime
+import fakeredis
+import gzip
+import io
 
 from users.models import User, Referral
 from tournaments.models import Game, Tournament, Participant
@@ -12,8 +16,19 @@ from .services import (
     generate_financial_report,
     generate_tournament_report,
     generate_marketing_report,
+    rollup_daily_metrics,
+    refresh_reports,
+    rollup_tournament_revenue,
+    run_report,
 )
+from .cohorts import generate_retention_report, retention_matrix
+from .views import dashboard_callback
+from .models import DailyMetric, Report, RollupWatermark, TournamentRevenueDaily
 from rest_framework.test import APIClient
+from tournament_project.celery import app as celery_app
+from django.core.management import call_command
+from io import StringIO
+from unittest import mock
 
 class ReportingServiceTests(TestCase):
     @classmethod
@@ -81,6 +96,37 @@ class ReportingServiceTests(TestCase):
         self.assertEqual(t1_data['participant_count'], 2)
         self.assertEqual(t1_data['fill_rate'], 20.0)
 
+    def test_tournament_report_queries_do_not_grow_with_tournaments(self):
+        with self.assertNumQueries(5):
+            generate_tournament_report()
+
+        for i in range(15):
+            Tournament.objects.create(
+                name=f"Extra Tournament {i}",
+                game=self.game,
+                start_date=timezone.now() - datetime.timedelta(days=i + 3),
+                end_date=timezone.now() + datetime.timedelta(days=1),
+            )
+        with self.assertNumQueries(5):
+            report = generate_tournament_report({'page': 2, 'page_size': 5})
+
+        self.assertEqual(report['pagination'], {'page': 2, 'page_size': 5, 'total': 17, 'pages': 4})
+        self.assertEqual(len(report['all_tournaments']), 5)
+        self.assertEqual(len(report['most_popular']), 10)
+        self.assertEqual(report['most_popular'][0]['participant_count'], 2)
+
+    def test_tournament_report_revenue_matches_revenue_report(self):
+        Transaction.objects.create(
+            wallet=self.wallet2, amount=Decimal('20000'), transaction_type='entry_fee', tournament=self.tournament2
+        )
+        revenue = generate_revenue_report()
+        report = generate_tournament_report()
+        expected = {row['tournament_name']: row['total_revenue'] for row in revenue['by_tournament']}
+        self.assertTrue(expected)
+        for row in report['most_profitable']:
+            self.assertEqual(row['revenue'], expected.get(row['name'], Decimal('0')))
+        self.assertEqual(report['most_profitable'][0], {'name': 'Test Tournament 2', 'revenue': Decimal('20000')})
+
     def test_generate_marketing_report(self):
         report = generate_marketing_report()
         self.assertEqual(report['summary']['total_referred_users'], 1)
@@ -95,6 +141,11 @@ class ReportingAPITests(TestCase):
         self.admin_user = User.objects.create_superuser(username="api_admin", password="password", email="api_admin@test.com", phone_number="+989000000002")
         self.normal_user = User.objects.create_user(username="user", password="password", phone_number="+989123456789")
         self.client = APIClient()
+        self.old_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+
+    def tearDown(self):
+        celery_app.conf.task_always_eager = self.old_eager
 
     def test_statistics_endpoint_is_public(self):
         """Test the statistics endpoint is public and returns correct data."""
@@ -155,6 +206,527 @@ class ReportingAPITests(TestCase):
         response = self.client.get('/api/reporting/revenue/?format=csv')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
-        content = response.content.decode('utf-8')
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
         self.assertIn('Revenue Report Summary', content)
         self.assertIn('Total Revenue', content)
+
+    def test_csv_export_covers_every_report(self):
+        game = Game.objects.create(name="CSV Game")
+        for i in range(3):
+            Tournament.objects.create(
+                name=f"CSV Tournament {i}",
+                game=game,
+                start_date=timezone.now() - datetime.timedelta(days=1),
+                end_date=timezone.now() + datetime.timedelta(days=1),
+                max_participants=10,
+            )
+        self.client.force_authenticate(user=self.admin_user)
+
+        expected = {
+            'players': 'Players Report Summary',
+            'tournaments': 'All Tournaments',
+            'financial': 'Monthly Cash Flow',
+            'marketing': 'Top Referrers',
+            'retention': 'Retention Report Summary',
+        }
+        for path, title in expected.items():
+            response = self.client.get(f'/api/reporting/{path}/?format=csv')
+            content = b''.join(response.streaming_content).decode('utf-8')
+            self.assertIn(title, content)
+            self.assertNotIn('Unsupported', content)
+
+        response = self.client.get('/api/reporting/tournaments/?format=csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(rows[1][0], 'Tournament Name')
+        self.assertEqual(sum(1 for row in rows if row and row[0].startswith('CSV Tournament')), 9)
+
+    def test_csv_export_is_gzipped_when_accepted(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get('/api/reporting/revenue/?format=csv', HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        content = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertTrue(content.startswith('Revenue Report Summary'))
+
+
+class ReportCacheTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username="cache_admin", password="password", email="cache_admin@test.com", phone_number="+989000000003"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        self.old_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+
+    def tearDown(self):
+        celery_app.conf.task_always_eager = self.old_eager
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get('/api/reporting/revenue/')
+        second = self.client.get('/api/reporting/revenue/')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second['X-Report-Id'], first['X-Report-Id'])
+        self.assertEqual(second['X-Report-Stale'], 'false')
+        self.assertEqual(Report.objects.filter(report_type='revenue_report').count(), 1)
+
+    def test_filters_are_parsed_and_cached_separately(self):
+        response = self.client.get('/api/reporting/financial/?start_date=2026-01-01&end_date=2026-01-31')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['summary']['start_date'].startswith('2026-01-01T00:00:00'))
+        self.assertTrue(response.json()['summary']['end_date'].startswith('2026-01-31T23:59:59'))
+
+        self.client.get('/api/reporting/financial/?start_date=2026-02-01&end_date=2026-02-28')
+        report = Report.objects.get(id=response['X-Report-Id'])
+        self.assertEqual(report.filters, {'end_date': '2026-01-31', 'start_date': '2026-01-01'})
+        self.assertEqual(Report.objects.filter(report_type='finance_report').count(), 2)
+
+        response = self.client.get('/api/reporting/financial/?start_date=2026-02-01&end_date=2026-01-01')
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch('reporting.tasks.generate_report_task.delay')
+    def test_missing_report_is_queued_and_polled(self, delay):
+        response = self.client.get('/api/reporting/tournaments/?game_id=7&format=csv')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        job_id = response.json()['job_id']
+        delay.assert_called_once_with(job_id)
+        self.assertTrue(response['Location'].endswith(f'/api/reporting/jobs/{job_id}/'))
+
+        # A second request while the job is queued does not queue another.
+        self.client.get('/api/reporting/tournaments/?game_id=7')
+        self.assertEqual(delay.call_count, 1)
+
+        self.assertEqual(run_report(job_id), Report.Status.READY)
+        response = self.client.get(f'/api/reporting/jobs/{job_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['all_tournaments'], [])
+
+    def test_failed_job_is_an_error(self):
+        failing = mock.Mock(side_effect=ValueError('boom'))
+        with mock.patch.dict('reporting.services.REPORT_GENERATORS', {'revenue_report': failing}):
+            response = self.client.get('/api/reporting/revenue/?format=csv')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['status'], Report.Status.FAILED)
+        response = self.client.get(f"/api/reporting/jobs/{response.json()['job_id']}/")
+        self.assertEqual(response.status_code, 500)
+
+    def test_stale_report_is_served_while_refreshing(self):
+        self.client.get('/api/reporting/players/')
+        stale = Report.objects.get(report_type='players_report')
+        Report.objects.filter(id=stale.id).update(completed_at=timezone.now() - datetime.timedelta(hours=1))
+
+        with mock.patch('reporting.tasks.generate_report_task.delay') as delay:
+            response = self.client.get('/api/reporting/players/')
+        self.assertEqual(response['X-Report-Id'], str(stale.id))
+        self.assertEqual(response['X-Report-Stale'], 'true')
+        refresh = Report.objects.get(report_type='players_report', status=Report.Status.PENDING)
+        delay.assert_called_once_with(refresh.id)
+
+        run_report(refresh.id)
+        self.assertFalse(Report.objects.filter(id=stale.id).exists())
+        response = self.client.get('/api/reporting/players/')
+        self.assertEqual(response['X-Report-Id'], str(refresh.id))
+        self.assertEqual(response['X-Report-Stale'], 'false')
+
+
+class DashboardSnapshotTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username="dashboard_admin", password="password", email="dashboard_admin@test.com", phone_number="+989000000004"
+        )
+        self.old_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+
+    def tearDown(self):
+        celery_app.conf.task_always_eager = self.old_eager
+
+    @mock.patch('reporting.tasks.generate_report_task.delay')
+    def test_missing_snapshots_are_queued_not_generated(self, delay):
+        context = dashboard_callback(None, {})
+
+        self.assertEqual(context['revenue_report'], {})
+        self.assertIsNone(context['report_updated_at']['tournament_report'])
+        self.assertEqual(delay.call_count, 5)
+        self.assertEqual(Report.objects.filter(status=Report.Status.PENDING).count(), 5)
+
+        dashboard_callback(None, {})
+        self.assertEqual(delay.call_count, 5)
+
+    def test_dashboard_reads_latest_snapshots(self):
+        refresh_reports(['revenue_report', 'players_report', 'tournament_report', 'finance_report', 'marketing_roi_report'])
+
+        with self.assertNumQueries(5):
+            context = dashboard_callback(None, {})
+        revenue = Report.objects.get(report_type='revenue_report')
+        self.assertEqual(context['revenue_report'], revenue.data)
+        self.assertEqual(context['report_updated_at']['revenue_report'], revenue.completed_at)
+        self.assertIn('cash_flow', context['financial_report'])
+
+        self.client.force_login(self.admin_user)
+        response = self.client.get('/admin/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'revenue-data')
+
+    @mock.patch('reporting.tasks.generate_report_task.delay')
+    def test_manual_refresh_is_queued(self, delay):
+        self.client.force_login(self.admin_user)
+        self.assertEqual(self.client.get('/admin/dashboard/refresh/').status_code, 405)
+
+        response = self.client.post('/admin/dashboard/refresh/')
+        self.assertRedirects(response, '/admin/', fetch_redirect_response=False)
+        self.assertEqual(delay.call_count, 5)
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        self.game = Game.objects.create(name="Rollup Game")
+        self.user = User.objects.create_user(username="payer", password="password", phone_number="+989120001111")
+        self.wallet = Wallet.objects.get(user=self.user)
+        # Two tournaments with the same name used to be merged by the report.
+        self.first, self.second = [
+            Tournament.objects.create(
+                name="Weekly Cup",
+                game=self.game,
+                start_date=timezone.now() - datetime.timedelta(days=5),
+                end_date=timezone.now() - datetime.timedelta(days=4),
+                is_free=False,
+                entry_fee=1000,
+            )
+            for _ in range(2)
+        ]
+
+    def _entry_fee(self, tournament, amount, days_ago=0, linked=True):
+        tx = Transaction.objects.create(
+            wallet=self.wallet,
+            amount=Decimal(amount),
+            transaction_type='entry_fee',
+            description=f"Entry fee for tournament: {tournament.name}",
+            tournament=tournament if linked else None,
+            game=self.game if linked else None,
+        )
+        if days_ago:
+            Transaction.objects.filter(id=tx.id).update(timestamp=timezone.now() - datetime.timedelta(days=days_ago))
+        return tx
+
+    def test_report_separates_tournaments_with_the_same_name(self):
+        self._entry_fee(self.first, '1000')
+        self._entry_fee(self.second, '3000')
+
+        report = generate_revenue_report()
+
+        by_id = {row['tournament_id']: row['total_revenue'] for row in report['by_tournament']}
+        self.assertEqual(by_id, {self.first.id: Decimal('1000'), self.second.id: Decimal('3000')})
+        self.assertEqual(report['by_game'], [{"game_name": "Rollup Game", "total_revenue": Decimal('4000')}])
+
+    def test_closed_days_are_read_from_the_rollup(self):
+        self._entry_fee(self.first, '1000', days_ago=3)
+        day = timezone.localdate() - datetime.timedelta(days=3)
+
+        # Nothing is rolled up yet, so the whole window is aggregated live.
+        self.assertEqual(generate_revenue_report()['summary']['total_revenue'], Decimal('1000'))
+        rollup_tournament_revenue(day, day)
+        rollup_tournament_revenue(day, day)  # Rebuilding a day replaces its rows.
+
+        row = TournamentRevenueDaily.objects.get()
+        self.assertEqual((row.day, row.tournament, row.entry_fees, row.entries), (day, self.first, Decimal('1000'), 1))
+        TournamentRevenueDaily.objects.update(entry_fees=Decimal('1200'))
+        self.assertEqual(generate_revenue_report()['summary']['total_revenue'], Decimal('1200'))
+
+    def test_days_after_the_latest_rollup_are_aggregated_live(self):
+        self._entry_fee(self.first, '1000', days_ago=3)
+        rollup_tournament_revenue(
+            timezone.localdate() - datetime.timedelta(days=3), timezone.localdate() - datetime.timedelta(days=2)
+        )
+        # Yesterday is closed but the nightly rollup has not run for it yet.
+        self._entry_fee(self.first, '400', days_ago=1)
+        self._entry_fee(self.second, '300')
+
+        self.assertEqual(generate_revenue_report()['summary']['total_revenue'], Decimal('1700'))
+        revenue = [row['revenue'] for row in generate_tournament_report()['all_tournaments']]
+        self.assertEqual(sorted(revenue), [Decimal('300'), Decimal('1400')])
+
+    def test_rollup_revenue_all_backfills_from_the_first_transaction(self):
+        self._entry_fee(self.first, '1000', days_ago=40)
+        self._entry_fee(self.second, '500', days_ago=2)
+
+        out = StringIO()
+        call_command('rollup_revenue', '--all', stdout=out)
+
+        self.assertEqual(
+            sorted(TournamentRevenueDaily.objects.values_list('entry_fees', flat=True)),
+            [Decimal('500'), Decimal('1000')],
+        )
+        self.assertIn('Rolled up 2 revenue rows', out.getvalue())
+
+    def test_archiving_does_not_change_a_rebuilt_day(self):
+        friend = User.objects.create_user(username="referred", password="password", phone_number="+989120001112")
+        Referral.objects.create(referrer=self.user, referred=friend)
+        self._entry_fee(self.first, '1000', days_ago=800)
+        Transaction.objects.create(
+            wallet=Wallet.objects.get(user=friend), amount=Decimal('250'), transaction_type='entry_fee'
+        )
+        Transaction.objects.update(status='success')
+        Transaction.objects.filter(wallet__user=friend).update(
+            timestamp=timezone.now() - datetime.timedelta(days=800)
+        )
+        day = timezone.localdate() - datetime.timedelta(days=800)
+        rollup_tournament_revenue(day, day)
+        before = list(TournamentRevenueDaily.objects.values_list('tournament', 'entry_fees', 'entries').order_by('id'))
+
+        call_command('archive_transactions', stdout=StringIO())
+        self.assertFalse(Transaction.objects.exists())
+        rollup_tournament_revenue(day, day)
+
+        after = list(TournamentRevenueDaily.objects.values_list('tournament', 'entry_fees', 'entries').order_by('id'))
+        self.assertEqual(after, before)
+        self.assertEqual(
+            sorted(before, key=str), sorted([(self.first.id, Decimal('1000'), 1), (None, Decimal('250'), 1)], key=str)
+        )
+        self.assertEqual(generate_marketing_report()['summary']['revenue_from_referred_users'], Decimal('250'))
+
+    def test_backfill_links_transactions_by_participation(self):
+        Participant.objects.create(user=self.user, tournament=self.second)
+        tx = self._entry_fee(self.second, '1000', linked=False)
+        other = Transaction.objects.create(wallet=self.wallet, amount=1, transaction_type='entry_fee', description="Entry fee for tournament: Gone")
+
+        out = StringIO()
+        call_command('backfill_transaction_tournaments', stdout=out)
+
+        tx.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((tx.tournament, tx.game), (self.second, self.game))
+        self.assertIsNone(other.tournament)
+        self.assertIn('Linked 1 transactions', out.getvalue())
+
+
+class DailyMetricRollupTests(TestCase):
+    def setUp(self):
+        self.game = Game.objects.create(name="Metric Game")
+        self.user = User.objects.create_user(username="metric", password="password", phone_number="+989120002222")
+        self.friend = User.objects.create_user(username="friend", password="password", phone_number="+989120002223")
+        self.wallet = Wallet.objects.get(user=self.user)
+        self.tournament = Tournament.objects.create(
+            name="Metric Cup",
+            game=self.game,
+            start_date=timezone.now() - datetime.timedelta(days=3),
+            end_date=timezone.now() - datetime.timedelta(days=2),
+            is_free=False,
+            entry_fee=1000,
+        )
+        Participant.objects.create(user=self.user, tournament=self.tournament)
+        Participant.objects.update(created_at=timezone.now() - datetime.timedelta(days=4))
+        Referral.objects.create(referrer=self.user, referred=self.friend)
+
+    def _tx(self, transaction_type, amount, days_ago=0):
+        tx = Transaction.objects.create(
+            wallet=self.wallet, amount=Decimal(amount), transaction_type=transaction_type, game=self.game
+        )
+        if days_ago:
+            Transaction.objects.filter(id=tx.id).update(timestamp=timezone.now() - datetime.timedelta(days=days_ago))
+        return tx
+
+    def test_rollup_is_incremental_and_reports_include_the_tail(self):
+        self._tx('entry_fee', '1000', days_ago=3)
+        self._tx('prize', '400', days_ago=3)
+        young = self._tx('entry_fee', '500')
+        # Written after the young row, so it must wait for it.
+        late = self._tx('withdrawal', '100', days_ago=1)
+
+        before = generate_financial_report()
+        processed = rollup_daily_metrics()
+
+        self.assertEqual(processed, {'transactions': 2, 'participants': 1, 'referrals': 0})
+        self.assertEqual(RollupWatermark.objects.get(source='transactions').last_id, young.id - 1)
+        entry_fees = DailyMetric.objects.get(metric='entry_fees')
+        self.assertEqual(
+            (entry_fees.day, entry_fees.game, entry_fees.value, entry_fees.count),
+            (timezone.localdate() - datetime.timedelta(days=3), self.game, Decimal('1000'), 1),
+        )
+        self.assertEqual(rollup_daily_metrics()['transactions'], 0)
+
+        after = generate_financial_report()
+        self.assertEqual(after['cash_flow'], before['cash_flow'])
+        self.assertEqual(after['summary']['total_revenue'], Decimal('1500'))
+        self.assertEqual(sum(month['expenses'] for month in after['cash_flow']), Decimal('500'))
+        self.assertEqual(generate_marketing_report()['summary']['total_referred_users'], 1)
+
+        Transaction.objects.filter(id__in=[young.id, late.id]).update(
+            timestamp=timezone.now() - datetime.timedelta(hours=1)
+        )
+        self.assertEqual(rollup_daily_metrics()['transactions'], 2)
+        self.assertEqual(generate_financial_report()['summary']['total_revenue'], Decimal('1500'))
+
+    def test_participations_wait_for_the_lag_and_keep_their_join_day(self):
+        other = Tournament.objects.create(
+            name="Late Cup",
+            game=self.game,
+            start_date=timezone.now() + datetime.timedelta(days=7),
+            end_date=timezone.now() + datetime.timedelta(days=8),
+        )
+        young = Participant.objects.create(user=self.friend, tournament=other)
+
+        self.assertEqual(rollup_daily_metrics()['participants'], 1)
+        self.assertEqual(RollupWatermark.objects.get(source='participants').last_id, young.id - 1)
+
+        # Moving a tournament does not move participations already rolled up.
+        Tournament.objects.filter(id=self.tournament.id).update(start_date=timezone.now())
+        Participant.objects.filter(id=young.id).update(created_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(rollup_daily_metrics()['participants'], 1)
+        self.assertEqual(
+            sorted(DailyMetric.objects.filter(metric='participations').values_list('day', 'count')),
+            [
+                (timezone.localdate() - datetime.timedelta(days=4), 1),
+                (timezone.localdate(timezone.now() - datetime.timedelta(hours=1)), 1),
+            ],
+        )
+
+    def test_rebuild_command_recomputes_everything(self):
+        self._tx('entry_fee', '1000', days_ago=3)
+        rollup_daily_metrics()
+        DailyMetric.objects.filter(metric='entry_fees').update(value=Decimal('1'))
+
+        out = StringIO()
+        call_command('rollup_daily_metrics', '--rebuild', stdout=out)
+
+        self.assertEqual(DailyMetric.objects.get(metric='entry_fees').value, Decimal('1000'))
+        self.assertEqual(generate_players_report()['summary']['avg_participation_per_player'], 1)
+        self.assertIn('1 transactions', out.getvalue())
+
+
+class CohortRetentionTests(TestCase):
+    def setUp(self):
+        self.start = timezone.make_aware(datetime.datetime(2026, 6, 1))
+        self.end = timezone.make_aware(datetime.datetime(2026, 6, 28, 23, 59))
+        self.game = Game.objects.create(name="Cohort Game")
+        self.u1 = self._user('cohort1', 2, '+989120000101')
+        self.u2 = self._user('cohort2', 3, '+989120000102')
+        self.u3 = self._user('cohort3', 9, '+989120000103')
+
+        self._join(self.u1, 10)
+        self._entry_fee(self.u1, 11)  # Same week as the join, so counted once.
+        self._entry_fee(self.u2, 17)
+        self._join(self.u3, 10)
+        self._join(self.u3, 24)
+
+    def _at(self, day):
+        return timezone.make_aware(datetime.datetime(2026, 6, day, 12))
+
+    def _user(self, username, day, phone_number):
+        user = User.objects.create_user(username=username, phone_number=phone_number)
+        User.objects.filter(pk=user.pk).update(date_joined=self._at(day))
+        return user
+
+    def _join(self, user, day):
+        # Players join a week before the tournament starts; the join counts.
+        tournament = Tournament.objects.create(
+            name=f"Cohort {user.username} {day}",
+            game=self.game,
+            start_date=self._at(day) + datetime.timedelta(days=7),
+            end_date=self._at(day) + datetime.timedelta(days=7, hours=2),
+        )
+        participant = Participant.objects.create(user=user, tournament=tournament)
+        Participant.objects.filter(pk=participant.pk).update(created_at=self._at(day))
+
+    def _entry_fee(self, user, day):
+        tx = Transaction.objects.create(wallet=user.wallet, amount=Decimal('1000'), transaction_type='entry_fee')
+        Transaction.objects.filter(pk=tx.pk).update(timestamp=self._at(day))
+
+    def test_retention_matrix_is_built_in_chunks(self):
+        weeks, sizes, active = retention_matrix(self.start, self.end, chunk_size=2)
+
+        self.assertEqual(weeks[0], datetime.date(2026, 6, 1))
+        self.assertEqual(sizes.tolist(), [2, 1, 0, 0])
+        self.assertEqual(active.tolist(), [[0, 1, 1, 0], [1, 0, 1, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+
+    def test_retention_report(self):
+        report = generate_retention_report({'start_date': self.start, 'end_date': self.end})
+
+        self.assertEqual(report['summary']['users'], 3)
+        self.assertEqual(report['matrix'][0], [0.0, 50.0, 50.0, 0.0])
+        self.assertEqual(report['matrix'][1], [100.0, 0.0, 100.0, None])
+        self.assertEqual(report['matrix'][3], [0.0, None, None, None])
+        self.assertIn(
+            {'cohort_week': '2026-06-08', 'week_number': 2, 'active_users': 1, 'retention': 100.0},
+            report['retention'],
+        )
+        self.assertEqual(len(report['retention']), 10)
+
+
+class VisitorCounterTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch('reporting.activity.get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.admin_user = User.objects.create_superuser(
+            username="visits_admin", password="password", email="visits_admin@test.com", phone_number="+989000000005"
+        )
+        self.user = User.objects.create_user(username="visitor", password="password", phone_number="+989120000201")
+        self.tournament = Tournament.objects.create(
+            name="Visited Tournament",
+            slug="visited-tournament",
+            game=Game.objects.create(name="Visited Game"),
+            start_date=timezone.now() + datetime.timedelta(days=1),
+            end_date=timezone.now() + datetime.timedelta(days=2),
+        )
+        self.client = APIClient()
+
+    def test_visits_are_counted_once_per_visitor(self):
+        url = f'/api/tournaments/tournaments/{self.tournament.slug}/'
+        self.client.get(url, REMOTE_ADDR='10.0.0.1', HTTP_USER_AGENT='Browser')
+        self.client.get(url, REMOTE_ADDR='10.0.0.1', HTTP_USER_AGENT='Browser')
+        self.client.get(url, REMOTE_ADDR='10.0.0.2', HTTP_USER_AGENT='Browser')
+        self.client.force_authenticate(user=self.user)
+        self.client.get(url)
+        self.client.get('/api/reporting/statistics/')
+
+        today = timezone.localdate()
+        self.assertEqual(self.redis.pfcount(f'activity:tournament:{self.tournament.id}:{today}'), 3)
+        self.assertEqual(self.redis.pfcount(f'activity:day:{today}'), 3)
+        self.assertFalse(any(b'10.0.0.1' in key for key in self.redis.keys('*')))
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(
+            '/api/reporting/unique-viewers/', {'resource': 'tournament', 'id': self.tournament.id, 'days': 7}
+        )
+        self.assertEqual(response.json()['unique_viewers'], 3)
+
+    def test_anonymous_visitors_behind_nginx_are_told_apart(self):
+        url = f'/api/tournaments/tournaments/{self.tournament.slug}/'
+        proxy = {'REMOTE_ADDR': '172.18.0.5', 'HTTP_USER_AGENT': 'Browser'}
+        self.client.get(url, HTTP_X_REAL_IP='10.0.0.1', **proxy)
+        self.client.get(url, HTTP_X_REAL_IP='10.0.0.2', **proxy)
+        # A spoofed first hop does not change who the visitor is.
+        self.client.get(url, HTTP_X_FORWARDED_FOR='1.2.3.4, 10.0.0.1', **proxy)
+
+        self.assertEqual(self.redis.pfcount(f'activity:day:{timezone.localdate()}'), 2)
+
+    def test_active_users_merge_day_counters(self):
+        today = timezone.localdate()
+        self.redis.pfadd(f'activity:day:{today}', 'u:1', 'u:2')
+        self.redis.pfadd(f'activity:day:{today - datetime.timedelta(days=3)}', 'u:2', 'u:3')
+        self.redis.pfadd(f'activity:day:{today - datetime.timedelta(days=20)}', 'u:4')
+        self.redis.pfadd(f'activity:day:{today - datetime.timedelta(days=40)}', 'u:5')
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get('/api/reporting/active-users/', {'date': today.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['dau'], data['wau'], data['mau']), (2, 3, 4))
+        self.assertEqual(data['dau_mau_ratio'], 0.5)
+        self.assertGreater(self.redis.ttl(f'activity:window:mau:{today}'), 0)
+
+    def test_counters_are_skipped_without_redis(self):
+        with mock.patch('reporting.activity.get_redis_connection', side_effect=NotImplementedError):
+            self.assertEqual(self.client.get('/api/reporting/statistics/').status_code, 200)
+            self.client.force_authenticate(user=self.admin_user)
+            self.assertEqual(self.client.get('/api/reporting/active-users/').status_code, 503)
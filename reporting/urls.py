@@ -6,7 +6,11 @@ from .views import (
     TournamentReportViewSet,
     FinancialReportViewSet,
     MarketingReportViewSet,
+    RetentionReportViewSet,
     StatisticsAPIView,
+    ReportJobAPIView,
+    ActiveUsersAPIView,
+    UniqueViewersAPIView,
 )
 
 router = DefaultRouter()
@@ -15,8 +19,12 @@ router.register(r'players', PlayersReportViewSet, basename='players-report')
 router.register(r'tournaments', TournamentReportViewSet, basename='tournament-report')
 router.register(r'financial', FinancialReportViewSet, basename='financial-report')
 router.register(r'marketing', MarketingReportViewSet, basename='marketing-report')
+router.register(r'retention', RetentionReportViewSet, basename='retention-report')
 
 urlpatterns = [
     path('statistics/', StatisticsAPIView.as_view(), name='statistics'),
+    path('jobs/<int:pk>/', ReportJobAPIView.as_view(), name='report-job'),
+    path('active-users/', ActiveUsersAPIView.as_view(), name='active-users'),
+    path('unique-viewers/', UniqueViewersAPIView.as_view(), name='unique-viewers'),
     path('', include(router.urls)),
 ]
@@ -1,6 +1,13 @@
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Sum
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import require_POST
 from drf_spectacular.utils import extend_schema
+from rest_framework import status
 from rest_framework.permissions import IsAdminUser, AllowAny
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
@@ -10,114 +17,204 @@ from rest_framework.viewsets import ViewSet
 from tournaments.models import Tournament
 from users.models import User
 from wallet.models import Transaction
-from .renderers import CSVRenderer
+from .models import Report
+from .renderers import CSVRenderer, streaming_csv_response
+from .activity import active_users, unique_viewers
 from .serializers import (
+    ActiveUsersQuerySerializer,
+    ActiveUsersSerializer,
+    UniqueViewersQuerySerializer,
+    UniqueViewersSerializer,
+    ReportFilterSerializer,
+    ReportJobSerializer,
+    TournamentReportFilterSerializer,
     StatisticsSerializer,
     RevenueReportSerializer,
     PlayersReportSerializer,
     TournamentReportSerializer,
     FinancialReportSerializer,
     MarketingReportSerializer,
+    RetentionReportSerializer,
 )
 from .services import (
-    generate_revenue_report,
-    generate_players_report,
-    generate_tournament_report,
-    generate_financial_report,
-    generate_marketing_report,
     ensure_bot_user,
+    latest_report,
+    refresh_reports,
+    request_report,
 )
 
 
-@extend_schema(responses=RevenueReportSerializer)
-class RevenueReportViewSet(ViewSet):
+def _report_response(request, report, stale=False):
     """
-    API endpoint for the Revenue Report.
+    The report data once ready. Otherwise the job status as JSON: 202 with a
+    Location to poll while it is queued, 500 with the error if it failed.
+    """
+    if report.status == Report.Status.READY:
+        if isinstance(request.accepted_renderer, CSVRenderer):
+            filename = f"{report.report_type}-{report.completed_at:%Y%m%d%H%M}.csv"
+            response = streaming_csv_response(request, report.data, report.report_type, filename)
+        else:
+            response = Response(report.data)
+        response["X-Report-Id"] = str(report.id)
+        response["X-Report-Generated-At"] = report.completed_at.isoformat()
+        response["X-Report-Stale"] = "true" if stale else "false"
+        return response
+
+    # A job status has no CSV form, so it is always rendered as JSON.
+    request.accepted_renderer = JSONRenderer()
+    request.accepted_media_type = JSONRenderer.media_type
+    if report.status == Report.Status.FAILED:
+        return Response(ReportJobSerializer(report).data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    response = Response(ReportJobSerializer(report).data, status=status.HTTP_202_ACCEPTED)
+    response["Location"] = request.build_absolute_uri(reverse("report-job", args=[report.id]))
+    return response
+
+
+class CachedReportMixin:
+    """
+    Serves ``report_type`` from the Report cache for the filters in the query
+    string, queueing its generation when there is no usable cached copy.
     """
 
     permission_classes = [IsAdminUser]
     renderer_classes = [JSONRenderer, CSVRenderer]
+    report_type = None
+    filter_serializer_class = ReportFilterSerializer
 
     def list(self, request):
-        # In a real app, you would parse filters from request.query_params
-        report_data = generate_revenue_report()
-        return Response(report_data)
+        serializer = self.filter_serializer_class(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        report, stale = request_report(self.report_type, serializer.validated_data)
+        return _report_response(request, report, stale)
 
 
-@extend_schema(responses=PlayersReportSerializer)
-class PlayersReportViewSet(ViewSet):
+@extend_schema(
+    parameters=[ReportFilterSerializer],
+    responses={200: RevenueReportSerializer, 202: ReportJobSerializer},
+)
+class RevenueReportViewSet(CachedReportMixin, ViewSet):
     """
-    API endpoint for the Players Report.
+    API endpoint for the Revenue Report.
     """
 
-    permission_classes = [IsAdminUser]
-    renderer_classes = [JSONRenderer, CSVRenderer]
+    report_type = "revenue_report"
 
-    def list(self, request):
-        report_data = generate_players_report()
-        return Response(report_data)
 
+@extend_schema(
+    parameters=[ReportFilterSerializer],
+    responses={200: PlayersReportSerializer, 202: ReportJobSerializer},
+)
+class PlayersReportViewSet(CachedReportMixin, ViewSet):
+    """
+    API endpoint for the Players Report.
+    """
+
+    report_type = "players_report"
 
-@extend_schema(responses=TournamentReportSerializer)
-class TournamentReportViewSet(ViewSet):
+
+@extend_schema(
+    parameters=[TournamentReportFilterSerializer],
+    responses={200: TournamentReportSerializer, 202: ReportJobSerializer},
+)
+class TournamentReportViewSet(CachedReportMixin, ViewSet):
     """
     API endpoint for the Tournament Report.
     """
 
-    permission_classes = [IsAdminUser]
-    renderer_classes = [JSONRenderer, CSVRenderer]
+    report_type = "tournament_report"
+    filter_serializer_class = TournamentReportFilterSerializer
 
-    def list(self, request):
-        report_data = generate_tournament_report()
-        return Response(report_data)
 
-
-@extend_schema(responses=FinancialReportSerializer)
-class FinancialReportViewSet(ViewSet):
+@extend_schema(
+    parameters=[ReportFilterSerializer],
+    responses={200: FinancialReportSerializer, 202: ReportJobSerializer},
+)
+class FinancialReportViewSet(CachedReportMixin, ViewSet):
     """
     API endpoint for the Financial Report.
     """
 
-    permission_classes = [IsAdminUser]
-    renderer_classes = [JSONRenderer, CSVRenderer]
-
-    def list(self, request):
-        report_data = generate_financial_report()
-        return Response(report_data)
+    report_type = "finance_report"
 
 
-@extend_schema(responses=MarketingReportSerializer)
-class MarketingReportViewSet(ViewSet):
+@extend_schema(
+    parameters=[ReportFilterSerializer],
+    responses={200: MarketingReportSerializer, 202: ReportJobSerializer},
+)
+class MarketingReportViewSet(CachedReportMixin, ViewSet):
     """
     API endpoint for the Marketing Report.
     """
 
+    report_type = "marketing_roi_report"
+
+
+@extend_schema(
+    parameters=[ReportFilterSerializer],
+    responses={200: RetentionReportSerializer, 202: ReportJobSerializer},
+)
+class RetentionReportViewSet(CachedReportMixin, ViewSet):
+    """
+    API endpoint for weekly signup cohort retention.
+    """
+
+    report_type = "retention_report"
+
+
+@extend_schema(responses={200: ReportJobSerializer, 202: ReportJobSerializer})
+class ReportJobAPIView(APIView):
+    """
+    Polls a queued report: its data once ready, otherwise the job status.
+    """
+
     permission_classes = [IsAdminUser]
     renderer_classes = [JSONRenderer, CSVRenderer]
 
-    def list(self, request):
-        report_data = generate_marketing_report()
-        return Response(report_data)
+    def get(self, request, pk):
+        report = get_object_or_404(Report, pk=pk)
+        return _report_response(request, report)
+
+
+DASHBOARD_REPORTS = {
+    "revenue_report": "revenue_report",
+    "players_report": "players_report",
+    "tournament_report": "tournament_report",
+    "finance_report": "financial_report",
+    "marketing_roi_report": "marketing_report",
+}
 
 
 def dashboard_callback(request, context):
     """
     This function is called by the Unfold admin theme to populate the
-    dashboard with custom data.
-    """
-    context.update(
-        {
-            "revenue_report": generate_revenue_report(),
-            "players_report": generate_players_report(),
-            "tournament_report": generate_tournament_report(),
-            "financial_report": generate_financial_report(),
-            "marketing_report": generate_marketing_report(),
-        }
-    )
+    dashboard with custom data. It only reads the latest report snapshots,
+    which refresh_dashboard_reports_task keeps current; a report that has
+    never been generated is queued and shows up on a later load.
+    """
+    updated_at = {}
+    missing = []
+    for report_type, key in DASHBOARD_REPORTS.items():
+        report = latest_report(report_type)
+        context[key] = report.data if report else {}
+        updated_at[key] = report.completed_at if report else None
+        if report is None:
+            missing.append(report_type)
+    if missing:
+        refresh_reports(missing)
 
+    context["report_updated_at"] = updated_at
     return context
 
 
+@staff_member_required
+@require_POST
+def refresh_dashboard_view(request):
+    """Queues a refresh of every dashboard report from the admin index."""
+    refresh_reports(DASHBOARD_REPORTS)
+    messages.success(request, _("Dashboard reports are being refreshed."))
+    return redirect("admin:index")
+
+
 @extend_schema(responses=StatisticsSerializer)
 class StatisticsAPIView(APIView):
     """
@@ -148,3 +245,46 @@ class StatisticsAPIView(APIView):
 
         serializer = StatisticsSerializer(data)
         return Response(serializer.data)
+
+
+ACTIVITY_UNAVAILABLE = {"detail": "Visitor counters need the Redis cache, which is not configured."}
+
+
+@extend_schema(parameters=[ActiveUsersQuerySerializer], responses=ActiveUsersSerializer)
+class ActiveUsersAPIView(APIView):
+    """
+    Daily, weekly and monthly active visitors from the HyperLogLog counters,
+    for the windows ending on ``date`` (default today).
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        query = ActiveUsersQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        day = query.validated_data.get("date") or timezone.localdate()
+
+        counts = active_users(day)
+        if counts is None:
+            return Response(ACTIVITY_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(ActiveUsersSerializer({"date": day, **counts}).data)
+
+
+@extend_schema(parameters=[UniqueViewersQuerySerializer], responses=UniqueViewersSerializer)
+class UniqueViewersAPIView(APIView):
+    """
+    Distinct visitors of a tournament or blog post over the last ``days``
+    days. ``id`` is the object's id.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        query = UniqueViewersQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        count = unique_viewers(params["resource"], params["id"], params["days"])
+        if count is None:
+            return Response(ACTIVITY_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(UniqueViewersSerializer({**params, "unique_viewers": count}).data)
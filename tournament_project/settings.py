@@ -17,6 +17,7 @@ from datetime import timedelta
 from pathlib import Path
 
 import dj_database_url
+from celery.schedules import crontab
 from dotenv import load_dotenv
 from kombu import Exchange, Queue
 
@@ -124,6 +125,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "axes.middleware.AxesMiddleware",
+    "reporting.middleware.ActiveVisitorMiddleware",
 ]
 
 ROOT_URLCONF = "tournament_project.urls"
@@ -468,11 +470,42 @@ if DEBUG:
 CORS_ALLOW_ALL_ORIGINS = os.environ.get("CORS_ALLOW_ALL_ORIGINS", "False").lower() in ("true", "1", "t")
 ZIBAL_PAYMENT_SUCCESS_URL = "https://atom-game.ir/payment/success.html"
 ZIBAL_PAYMENT_FAILED_URL = "https://atom-game.ir/payment/failed.html"
+ZIBAL_PAYMENT_PENDING_URL = "https://atom-game.ir/payment/pending.html"
+ZIBAL_API_BASE_URL = os.environ.get("ZIBAL_API_BASE_URL", "https://api.zibal.ir/v1")
+ZIBAL_GATEWAY_BASE_URL = os.environ.get(
+    "ZIBAL_GATEWAY_BASE_URL", "https://gateway.zibal.ir/v1"
+)
+ZIBAL_CONNECT_TIMEOUT = float(os.environ.get("ZIBAL_CONNECT_TIMEOUT", "3.05"))
+ZIBAL_READ_TIMEOUT = float(os.environ.get("ZIBAL_READ_TIMEOUT", "10"))
+ZIBAL_MAX_RETRIES = int(os.environ.get("ZIBAL_MAX_RETRIES", "2"))
+ZIBAL_BREAKER_FAILURE_THRESHOLD = int(
+    os.environ.get("ZIBAL_BREAKER_FAILURE_THRESHOLD", "5")
+)
+ZIBAL_BREAKER_RESET_TIMEOUT = float(os.environ.get("ZIBAL_BREAKER_RESET_TIMEOUT", "30"))
+DEPOSIT_RECONCILE_AFTER_MINUTES = int(os.environ.get("DEPOSIT_RECONCILE_AFTER_MINUTES", "30"))
+DEPOSIT_RECONCILE_CONCURRENCY = int(os.environ.get("DEPOSIT_RECONCILE_CONCURRENCY", "4"))
+DEPOSIT_RECONCILE_RATE_PER_SECOND = float(
+    os.environ.get("DEPOSIT_RECONCILE_RATE_PER_SECOND", "10")
+)
+
+# How long a stored Idempotency-Key response can be replayed.
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
 
 MINIMUM_WITHDRAWAL_AMOUNT = int(
     os.environ.get("MINIMUM_WITHDRAWAL_AMOUNT", "1000000")
 )
 
+# Cached reports younger than this are served as is; older ones are served
+# while a refresh runs, up to REPORT_CACHE_MAX_STALE_HOURS.
+REPORT_CACHE_TTL_MINUTES = int(os.environ.get("REPORT_CACHE_TTL_MINUTES", "15"))
+REPORT_CACHE_MAX_STALE_HOURS = int(os.environ.get("REPORT_CACHE_MAX_STALE_HOURS", "24"))
+
+# Detail views whose unique visitors are counted per object, by view name.
+ACTIVITY_TRACKED_VIEWS = {
+    "tournament-detail": "tournament",
+    "blog:post-detail": "post",
+}
+
 AXES_FAILURE_LIMIT = 5
 AXES_COOLOFF_TIME = 1
 AXES_RESET_ON_SUCCESS = True
@@ -498,7 +531,15 @@ CELERY_TASK_ROUTES = {
     "tournaments.tasks.run_seed_data_task": {
         "queue": "low_priority",
         "routing_key": "low_priority",
-    }
+    },
+    "reporting.tasks.generate_report_task": {
+        "queue": "low_priority",
+        "routing_key": "low_priority",
+    },
+    "wallet.tasks.verify_deposit_task": {
+        "queue": "high_priority",
+        "routing_key": "high_priority",
+    },
 }
 CELERY_TASK_ACKS_LATE = True
 CELERY_TASK_ACKS_ON_FAILURE_OR_TIMEOUT = True
@@ -520,6 +561,30 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'blog.tasks.publish_scheduled_posts',
         'schedule': timedelta(minutes=1),
     },
+    'reconcile-stale-deposits': {
+        'task': 'wallet.tasks.reconcile_stale_deposits_task',
+        'schedule': timedelta(minutes=10),
+    },
+    'take-ledger-snapshots': {
+        'task': 'wallet.tasks.take_ledger_snapshots_task',
+        'schedule': timedelta(hours=1),
+    },
+    'purge-idempotency-keys': {
+        'task': 'wallet.tasks.purge_idempotency_keys_task',
+        'schedule': timedelta(hours=6),
+    },
+    'rollup-tournament-revenue': {
+        'task': 'reporting.tasks.rollup_tournament_revenue_task',
+        'schedule': crontab(hour=0, minute=15),
+    },
+    'rollup-daily-metrics': {
+        'task': 'reporting.tasks.rollup_daily_metrics_task',
+        'schedule': timedelta(minutes=10),
+    },
+    'refresh-dashboard-reports': {
+        'task': 'reporting.tasks.refresh_dashboard_reports_task',
+        'schedule': timedelta(minutes=REPORT_CACHE_TTL_MINUTES),
+    },
 }
 
 if "test" in sys.argv or "pytest" in sys.modules:
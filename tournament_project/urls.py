@@ -22,6 +22,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
+from reporting.views import refresh_dashboard_view
 from tournaments.views import private_media_view
 from tournament_project.ckeditor_views import ckeditor5_upload
 from blog.ckeditor_views import ckeditor_upload_view
@@ -54,6 +55,11 @@ urlpatterns = [
         name="ck_editor_5_upload_file",
     ),
     path("ckeditor5/", include("django_ckeditor_5.urls")),
+    path(
+        "admin/dashboard/refresh/",
+        refresh_dashboard_view,
+        name="admin_dashboard_refresh",
+    ),
     path("admin/", admin.site.urls),
 
     # --- Third-party integrations ---
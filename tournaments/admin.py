@@ -14,11 +14,15 @@ from jalali_date.admin import ModelAdminJalaliMixin
 
 # Local Imports
 from .models import (
+    EntryFeeRefund,
     Game,
     GameImage,
     GameManager,
+    Lobby,
     Match,
     Participant,
+    PlayerRating,
+    PrizePayout,
     Rank,
     Report,
     Scoring,
@@ -112,11 +116,44 @@ class GameManagerAdmin(ModelAdmin):
 
 @admin.register(Scoring)
 class ScoringAdmin(ModelAdmin):
-    list_display = ("tournament", "user", "score")
+    list_display = ("tournament", "user", "score", "placement", "kills")
     autocomplete_fields = ("tournament", "user")
     search_fields = ("tournament__name", "user__username")
 
 
+@admin.register(PlayerRating)
+class PlayerRatingAdmin(ModelAdmin):
+    list_display = ("user", "game", "rating", "matches_played", "updated_at")
+    list_filter = ("game",)
+    autocomplete_fields = ("user", "game")
+    search_fields = ("user__username",)
+    ordering = ("game", "-rating")
+
+
+@admin.register(Lobby)
+class LobbyAdmin(ModelAdmin):
+    list_display = ("tournament", "stage", "number", "room_id", "is_finished")
+    list_filter = ("is_finished", "stage")
+    autocomplete_fields = ("tournament",)
+    search_fields = ("tournament__name",)
+
+
+@admin.register(PrizePayout)
+class PrizePayoutAdmin(ModelAdmin):
+    list_display = ("tournament", "total", "winners", "created_at")
+    search_fields = ("tournament__name", "idempotency_key")
+    readonly_fields = ("tournament", "idempotency_key", "total", "winners", "created_at")
+
+
+@admin.register(EntryFeeRefund)
+class EntryFeeRefundAdmin(ModelAdmin):
+    list_display = ("tournament", "user", "amount", "status", "updated_at")
+    list_filter = ("status",)
+    search_fields = ("tournament__name", "user__username")
+    autocomplete_fields = ("tournament", "user")
+    readonly_fields = ("transaction",)
+
+
 @admin.register(GameImage)
 class GameImageAdmin(ModelAdmin):
     list_display = ("game", "image_type")
@@ -171,12 +208,16 @@ class TournamentAdmin(
                 "fields": (
                     "type",
                     "mode",
+                    "seeding",
                     "max_participants",
                     "team_size",
                     "winner_slots",
                     "is_free",
                     "entry_fee",
                     "prize_pool",
+                    "placement_points",
+                    "kill_points",
+                    "prize_distribution",
                 ),
                 "classes": ("tab",),
             },
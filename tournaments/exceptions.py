@@ -1,2 +1,6 @@
 class ApplicationError(Exception):
     pass
+
+
+class MatchTransitionConflict(ApplicationError):
+    """Raised when a match changed state before a conditional update landed."""
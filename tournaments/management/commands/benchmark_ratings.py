@@ -0,0 +1,40 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from tournaments.ratings import elo_update, replay_elo
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the vectorized rating replay against a one-by-one loop on synthetic matches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--matches', type=int, default=1_000_000, help='Number of synthetic matches.')
+        parser.add_argument('--players', type=int, default=100_000, help='Number of synthetic players.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic history.')
+
+    def handle(self, *args, **options):
+        matches = options['matches']
+        players = options['players']
+        rng = np.random.default_rng(options['seed'])
+        winners = rng.integers(0, players, matches)
+        losers = (winners + rng.integers(1, players, matches)) % players
+
+        start = time.perf_counter()
+        ratings, _ = replay_elo(winners, losers, players)
+        vectorized = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [1500.0] * players
+        for winner, loser in zip(winners.tolist(), losers.tolist()):
+            expected[winner], expected[loser] = elo_update(expected[winner], expected[loser])
+        sequential = time.perf_counter() - start
+
+        self.stdout.write(f'Matches: {matches:,}  Players: {players:,}')
+        self.stdout.write(f'Vectorized replay: {vectorized:.2f}s ({matches / vectorized:,.0f} matches/s)')
+        self.stdout.write(f'One-by-one loop:   {sequential:.2f}s ({matches / sequential:,.0f} matches/s)')
+        if np.allclose(ratings, expected):
+            self.stdout.write(self.style.SUCCESS('Both methods produced identical ratings.'))
+        else:
+            self.stdout.write(self.style.ERROR('Rating mismatch between methods.'))
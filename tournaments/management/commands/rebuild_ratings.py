@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Game
+from tournaments.services import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds player ratings by replaying the confirmed match history of each game.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--game', type=str, help='Slug of a single game to rebuild.')
+
+    def handle(self, *args, **options):
+        games = Game.objects.all()
+        if options['game']:
+            games = games.filter(slug=options['game'])
+            if not games.exists():
+                raise CommandError(f"Game '{options['game']}' does not exist.")
+
+        for game in games:
+            rated = rebuild_ratings(game)
+            self.stdout.write(f'{game.name}: {rated} players rated.')
+
+        self.stdout.write(self.style.SUCCESS('Ratings rebuilt successfully.'))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scoring",
+            name="kills",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scoring",
+            name="placement",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tournament",
+            name="kill_points",
+            field=models.PositiveSmallIntegerField(
+                default=1, help_text="Battle royale points awarded per kill."
+            ),
+        ),
+        migrations.AddField(
+            model_name="tournament",
+            name="placement_points",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Battle royale points per placement, first place first. Leave empty to use the platform default table.",
+            ),
+        ),
+    ]
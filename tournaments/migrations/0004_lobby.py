@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0003_battle_royale_scoring"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Lobby",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stage", models.PositiveSmallIntegerField(default=1)),
+                ("number", models.PositiveIntegerField()),
+                ("room_id", models.CharField(blank=True, max_length=100)),
+                ("password", models.CharField(blank=True, max_length=100)),
+                ("is_finished", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tournament",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lobbies",
+                        to="tournaments.tournament",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Lobbies",
+                "ordering": ["stage", "number"],
+                "unique_together": {("tournament", "stage", "number")},
+            },
+        ),
+        migrations.AddField(
+            model_name="participant",
+            name="lobby",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="participants",
+                to="tournaments.lobby",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scoring",
+            name="lobby",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Lobby the score was earned in, for staged battle royale tournaments.",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="scores",
+                to="tournaments.lobby",
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0004_lobby"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="match",
+            name="ratings_applied",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether this result has been applied to player ratings.",
+            ),
+        ),
+        migrations.CreateModel(
+            name="PlayerRating",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rating", models.FloatField(default=1500.0)),
+                ("matches_played", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "game",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ratings",
+                        to="tournaments.game",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ratings",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["game", "-rating"],
+                        name="tournaments_game_id_3dac70_idx",
+                    )
+                ],
+                "unique_together": {("user", "game")},
+            },
+        ),
+    ]
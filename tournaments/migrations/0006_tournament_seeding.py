@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0005_player_rating"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tournament",
+            name="seeding",
+            field=models.CharField(
+                choices=[
+                    ("random", "Random"),
+                    ("rating", "Rating"),
+                    ("score", "Score"),
+                ],
+                default="random",
+                help_text="How the first round is paired. Seeded brackets place 1 vs N, 2 vs N-1, ... and keep that order through later rounds.",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0006_tournament_seeding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tournament",
+            name="prize_distribution",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Share of the prize pool per placement, first place first, e.g. [50, 30, 20]. Only the first winner_slots entries are used. Leave empty to use the platform default split.",
+            ),
+        ),
+        migrations.CreateModel(
+            name="PrizePayout",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("idempotency_key", models.CharField(max_length=64, unique=True)),
+                ("total", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("winners", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tournament",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="prize_payout",
+                        to="tournaments.tournament",
+                    ),
+                ),
+            ],
+        ),
+    ]
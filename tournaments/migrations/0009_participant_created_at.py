@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:36
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def date_existing_participants(apps, schema_editor):
+    """
+    Existing participations are dated by their tournament's start, which is
+    what the participations rollup counted them by until now.
+    """
+    Participant = apps.get_model("tournaments", "Participant")
+    Tournament = apps.get_model("tournaments", "Tournament")
+    Participant.objects.update(
+        created_at=Subquery(
+            Tournament.objects.filter(id=OuterRef("tournament_id")).values("start_date")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0008_entry_fee_refund"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="participant",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(date_existing_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0009_participant_created_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="entryfeerefund",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("refunded", "Refunded"),
+                    ("failed", "Failed"),
+                    ("forfeited", "Forfeited"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:14
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def date_rated_matches(apps, schema_editor):
+    """
+    Matches rated before now get one shared timestamp, so a rebuild replays
+    them first and in the tournament order it used until now.
+    """
+    Match = apps.get_model("tournaments", "Match")
+    Match.objects.filter(ratings_applied=True).update(rated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0010_entryfeerefund_forfeited"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="match",
+            name="rated_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When this result was applied to player ratings.",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(date_rated_matches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def stage_lobby_scores(apps, schema_editor):
+    """Scores earned in a lobby belong to that lobby's stage."""
+    Scoring = apps.get_model("tournaments", "Scoring")
+    Lobby = apps.get_model("tournaments", "Lobby")
+    Scoring.objects.filter(lobby__isnull=False).update(
+        stage=Subquery(Lobby.objects.filter(id=OuterRef("lobby_id")).values("stage")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0011_match_rated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="scoring",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="scoring",
+            name="stage",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Qualifier stage the score was earned in; 0 outside staged battle royale tournaments.",
+            ),
+        ),
+        migrations.RunPython(stage_lobby_scores, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="scoring",
+            unique_together={("tournament", "user", "stage")},
+        ),
+    ]
@@ -83,9 +83,40 @@ class Scoring(models.Model):
     tournament = models.ForeignKey("Tournament", on_delete=models.CASCADE)
     user = models.ForeignKey("users.User", on_delete=models.CASCADE)
     score = models.IntegerField()
+    placement = models.PositiveIntegerField(null=True, blank=True)
+    kills = models.PositiveIntegerField(default=0)
+    lobby = models.ForeignKey(
+        "Lobby",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="scores",
+        help_text="Lobby the score was earned in, for staged battle royale tournaments.",
+    )
+    stage = models.PositiveIntegerField(
+        default=0,
+        help_text="Qualifier stage the score was earned in; 0 outside staged battle royale tournaments.",
+    )
 
     class Meta:
-        unique_together = ("tournament", "user")
+        unique_together = ("tournament", "user", "stage")
+
+
+class PlayerRating(models.Model):
+    user = models.ForeignKey(
+        "users.User", on_delete=models.CASCADE, related_name="ratings"
+    )
+    game = models.ForeignKey("Game", on_delete=models.CASCADE, related_name="ratings")
+    rating = models.FloatField(default=1500.0)
+    matches_played = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "game")
+        indexes = [models.Index(fields=["game", "-rating"])]
+
+    def __str__(self):
+        return f"{self.user} - {self.game}: {self.rating:.0f}"
 
 
 class GameImage(FileChangeDetectionMixin, models.Model):
@@ -142,6 +173,20 @@ class Tournament(SlugMixin, FileChangeDetectionMixin, models.Model):
         choices=TOURNAMENT_MODE_CHOICES,
         default="team_deathmatch",
     )
+    SEEDING_CHOICES = (
+        ("random", "Random"),
+        ("rating", "Rating"),
+        ("score", "Score"),
+    )
+    seeding = models.CharField(
+        max_length=10,
+        choices=SEEDING_CHOICES,
+        default="random",
+        help_text=(
+            "How the first round is paired. Seeded brackets place 1 vs N,"
+            " 2 vs N-1, ... and keep that order through later rounds."
+        ),
+    )
     max_participants = models.PositiveIntegerField(default=100)
     winner_slots = models.PositiveSmallIntegerField(
         default=5,
@@ -151,6 +196,26 @@ class Tournament(SlugMixin, FileChangeDetectionMixin, models.Model):
         ),
     )
     team_size = models.PositiveIntegerField(default=1)
+    placement_points = models.JSONField(
+        default=list,
+        blank=True,
+        help_text=(
+            "Battle royale points per placement, first place first. Leave empty"
+            " to use the platform default table."
+        ),
+    )
+    kill_points = models.PositiveSmallIntegerField(
+        default=1, help_text="Battle royale points awarded per kill."
+    )
+    prize_distribution = models.JSONField(
+        default=list,
+        blank=True,
+        help_text=(
+            "Share of the prize pool per placement, first place first, e.g."
+            " [50, 30, 20]. Only the first winner_slots entries are used."
+            " Leave empty to use the platform default split."
+        ),
+    )
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     image = models.ForeignKey(
@@ -238,6 +303,11 @@ class Tournament(SlugMixin, FileChangeDetectionMixin, models.Model):
             raise ValidationError("Individual tournaments must have a team size of 1.")
         if self.type == "team" and self.team_size <= 1:
             raise ValidationError("Team tournaments must have a team size greater than 1.")
+        if not isinstance(self.placement_points, list) or not all(
+            isinstance(points, int) and not isinstance(points, bool) and points >= 0
+            for points in self.placement_points
+        ):
+            raise ValidationError("Placement points must be a list of non-negative whole numbers.")
 
     def __str__(self):
         return self.name
@@ -253,9 +323,38 @@ class Tournament(SlugMixin, FileChangeDetectionMixin, models.Model):
             return "Finished"
 
 
+class Lobby(models.Model):
+    """
+    A fixed-size room of a large battle royale tournament. Each qualifier
+    stage splits the remaining entrants into a fresh set of lobbies.
+    """
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name="lobbies")
+    stage = models.PositiveSmallIntegerField(default=1)
+    number = models.PositiveIntegerField()
+    room_id = models.CharField(max_length=100, blank=True)
+    password = models.CharField(max_length=100, blank=True)
+    is_finished = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("tournament", "stage", "number")
+        ordering = ["stage", "number"]
+        verbose_name_plural = "Lobbies"
+
+    def __str__(self):
+        return f"{self.tournament} - Stage {self.stage} Lobby {self.number}"
+
+
 class Participant(models.Model):
     user = models.ForeignKey("users.User", on_delete=models.CASCADE)
     tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE)
+    lobby = models.ForeignKey(
+        Lobby,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="participants",
+    )
     status = models.CharField(
         max_length=20,
         choices=(("registered", "Registered"), ("checked_in", "Checked-in"), ("eliminated", "Eliminated")),
@@ -264,11 +363,57 @@ class Participant(models.Model):
     )
     rank = models.IntegerField(null=True, blank=True)
     prize = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("user", "tournament")
 
 
+class PrizePayout(models.Model):
+    """
+    Records that a tournament's prize pool was paid out. The unique
+    idempotency key makes a second payout run for the same tournament a no-op.
+    """
+    tournament = models.OneToOneField(
+        Tournament, on_delete=models.CASCADE, related_name="prize_payout"
+    )
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    winners = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.tournament} - {self.total}"
+
+
+class EntryFeeRefund(models.Model):
+    """
+    Per-player marker of an entry fee refund. Refunded rows are skipped when
+    a refund run is repeated or resumed; failed rows are retried. Forfeited
+    rows record a player excluded from refunds, e.g. a rejected winner, so
+    later runs keep excluding them.
+    """
+    STATUS_CHOICES = (("refunded", "Refunded"), ("failed", "Failed"), ("forfeited", "Forfeited"))
+
+    tournament = models.ForeignKey(
+        Tournament, on_delete=models.CASCADE, related_name="entry_fee_refunds"
+    )
+    user = models.ForeignKey("users.User", on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    error = models.CharField(max_length=255, blank=True)
+    transaction = models.ForeignKey(
+        "wallet.Transaction", on_delete=models.SET_NULL, null=True, blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("tournament", "user")
+
+    def __str__(self):
+        return f"{self.tournament} - {self.user}: {self.status}"
+
+
 class Match(FileChangeDetectionMixin, models.Model):
     MONITORED_FILE_FIELD = 'result_proof'
     MATCH_TYPE_CHOICES = (("individual", "Individual"), ("team", "Team"))
@@ -293,6 +438,12 @@ class Match(FileChangeDetectionMixin, models.Model):
     result_proof = OptimizedImageField(upload_to=get_sanitized_upload_path, null=True, blank=True)
     is_confirmed = models.BooleanField(default=False)
     is_disputed = models.BooleanField(default=False)
+    ratings_applied = models.BooleanField(
+        default=False, help_text="Whether this result has been applied to player ratings."
+    )
+    rated_at = models.DateTimeField(
+        null=True, blank=True, help_text="When this result was applied to player ratings."
+    )
     dispute_reason = models.TextField(blank=True)
     room_id = models.CharField(max_length=100, blank=True)
     password = models.CharField(max_length=100, blank=True)
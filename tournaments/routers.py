@@ -1,6 +1,6 @@
 from rest_framework.routers import DefaultRouter
 
-from .views import (GameImageViewSet, GameViewSet, MatchViewSet,
+from .views import (GameImageViewSet, GameViewSet, LobbyViewSet, MatchViewSet,
                     ReportViewSet, TournamentColorViewSet,
                     TournamentImageViewSet, TournamentViewSet,
                     WinnerSubmissionViewSet)
@@ -8,6 +8,7 @@ from .views import (GameImageViewSet, GameViewSet, MatchViewSet,
 router = DefaultRouter()
 router.register(r"tournaments", TournamentViewSet, basename="tournament")
 router.register(r"matches", MatchViewSet)
+router.register(r"lobbies", LobbyViewSet, basename="lobby")
 router.register(r"games", GameViewSet, basename="game")
 router.register(r"game-images", GameImageViewSet, basename="game-image")
 router.register(r"reports", ReportViewSet)
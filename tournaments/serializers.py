@@ -1,3 +1,6 @@
+import csv
+import io
+
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema_field
@@ -8,9 +11,9 @@ from users.models import InGameID, User
 from users.serializers import UserReadOnlySerializer
 from common.validators import validate_file
 
-from .models import (Game, GameImage, GameManager, Match, Participant, Rank,
-                     Report, Scoring, Tournament, TournamentColor,
-                     TournamentImage, WinnerSubmission)
+from .models import (Game, GameImage, GameManager, Lobby, Match, Participant,
+                     PrizePayout, Rank, Report, Scoring, Tournament,
+                     TournamentColor, TournamentImage, WinnerSubmission)
 
 
 class GameImageSerializer(serializers.ModelSerializer):
@@ -107,8 +110,28 @@ class TournamentCreateUpdateSerializer(serializers.ModelSerializer):
             "max_participants",
             "team_size",
             "mode",
+            "seeding",
+            "placement_points",
+            "kill_points",
+            "prize_distribution",
         )
 
+    def validate_placement_points(self, value):
+        if not isinstance(value, list) or not all(
+            isinstance(points, int) and not isinstance(points, bool) and points >= 0 for points in value
+        ):
+            raise serializers.ValidationError("Provide a list of non-negative whole points.")
+        return value
+
+    def validate_prize_distribution(self, value):
+        if not isinstance(value, list) or not all(
+            isinstance(share, (int, float)) and share >= 0 for share in value
+        ):
+            raise serializers.ValidationError("Provide a list of non-negative shares.")
+        if value and not sum(value):
+            raise serializers.ValidationError("At least one share must be positive.")
+        return value
+
 
 class TournamentReadOnlySerializer(serializers.ModelSerializer):
     """Serializer for reading tournament data."""
@@ -171,6 +194,7 @@ class TournamentReadOnlySerializer(serializers.ModelSerializer):
             "max_participants",
             "team_size",
             "mode",
+            "seeding",
             "spots_left",
         )
         read_only_fields = fields
@@ -454,7 +478,112 @@ class ScoringSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Scoring
-        fields = ("id", "tournament", "user", "score")
+        fields = ("id", "tournament", "user", "stage", "score", "placement", "kills")
+
+
+class BattleRoyaleResultSerializer(serializers.Serializer):
+    """A single player's placement and kills in a battle royale lobby."""
+
+    user_id = serializers.IntegerField(required=False)
+    player_id = serializers.CharField(required=False, max_length=100)
+    placement = serializers.IntegerField(min_value=1)
+    kills = serializers.IntegerField(min_value=0, default=0)
+
+    def validate(self, attrs):
+        if not attrs.get("user_id") and not attrs.get("player_id"):
+            raise serializers.ValidationError("Either user_id or player_id is required.")
+        return attrs
+
+
+class BattleRoyaleResultsUploadSerializer(serializers.Serializer):
+    """
+    Accepts battle royale results either as a JSON ``results`` list or as a
+    CSV ``file`` with a header row of ``user_id``/``player_id``, ``placement``
+    and ``kills``.
+    """
+
+    results = BattleRoyaleResultSerializer(many=True, required=False)
+    file = serializers.FileField(required=False)
+
+    def validate_file(self, value):
+        try:
+            content = value.read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise serializers.ValidationError("The file must be UTF-8 encoded CSV.")
+        rows = [
+            {key: val for key, val in row.items() if key and val not in (None, "")}
+            for row in csv.DictReader(io.StringIO(content))
+        ]
+        serializer = BattleRoyaleResultSerializer(data=rows, many=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def validate(self, attrs):
+        if "file" in attrs:
+            attrs["results"] = attrs.pop("file")
+        if not attrs.get("results"):
+            raise serializers.ValidationError("Provide either results or a CSV file.")
+        return attrs
+
+
+class LobbySerializer(serializers.ModelSerializer):
+    """Serializer for a lobby with its aggregates annotated by the view."""
+
+    player_count = serializers.IntegerField(read_only=True)
+    average_user_score = serializers.FloatField(read_only=True)
+    top_score = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Lobby
+        fields = (
+            "id",
+            "tournament",
+            "stage",
+            "number",
+            "room_id",
+            "password",
+            "is_finished",
+            "player_count",
+            "average_user_score",
+            "top_score",
+        )
+        read_only_fields = fields
+
+
+class LobbyParticipantSerializer(serializers.ModelSerializer):
+    """A participant seated in a lobby with the score earned there."""
+
+    username = serializers.CharField(source="user.username", read_only=True)
+    lobby_score = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Participant
+        fields = ("user", "username", "status", "lobby_score")
+        read_only_fields = fields
+
+
+class LobbyAllocationSerializer(serializers.Serializer):
+    lobby_size = serializers.IntegerField(min_value=2, default=100)
+
+
+class LobbyAdvanceSerializer(serializers.Serializer):
+    top_k = serializers.IntegerField(min_value=1)
+
+
+class PrizePayoutRequestSerializer(serializers.Serializer):
+    distribution = serializers.ListField(
+        child=serializers.DecimalField(max_digits=7, decimal_places=2, min_value=0),
+        required=False,
+        allow_empty=False,
+        help_text="Overrides the tournament's prize split for this payout.",
+    )
+
+
+class PrizePayoutSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PrizePayout
+        fields = ("tournament", "idempotency_key", "total", "winners", "created_at")
+        read_only_fields = fields
 
 
 class RankSerializer(serializers.ModelSerializer):
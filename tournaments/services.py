@@ -1,9 +1,15 @@
 import logging
+import math
 import random
-from decimal import Decimal
+import secrets
+from decimal import ROUND_DOWN, Decimal
 
-from django.db import transaction
-from django.db.models import Count
+import numpy as np
+
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import (Avg, Count, Exists, ExpressionWrapper, F, FloatField,
+                              Max, OuterRef, Q, Subquery, Sum, Value, Window)
+from django.db.models.functions import Coalesce, NullIf, RowNumber
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import PermissionDenied, ValidationError
@@ -14,14 +20,95 @@ from teams.models import Team
 from users.models import InGameID, User
 from verification.models import Verification
 from wallet.services import WalletService
-from wallet.models import Transaction # For TransactionType enum
+from wallet.models import Transaction, Wallet
 
-from .exceptions import ApplicationError
-from .models import Match, Participant, Report, Tournament, WinnerSubmission
+from .exceptions import ApplicationError, MatchTransitionConflict
+from .models import (EntryFeeRefund, Game, Lobby, Match, Participant, PlayerRating,
+                     PrizePayout, Report, Scoring, Tournament, WinnerSubmission)
+from .ratings import DEFAULT_RATING, elo_update, replay_elo
 
 logger = logging.getLogger(__name__)
 
 
+def bracket_order(size: int):
+    """
+    Returns seeds 1..size (a power of two) in standard bracket order, so that
+    adjacent pairs are 1 vs N, 2 vs N-1, ... and the top two seeds can only
+    meet in the final.
+    """
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for top in order for seed in (top, total - top)]
+    return order
+
+
+def seeded_pairings(entrants: list):
+    """
+    Pairs entrants sorted from strongest to weakest as 1 vs N, 2 vs N-1, ...
+    with the pairs laid out in bracket order. The field must be a power of
+    two: without byes the top seeds could otherwise meet before the final.
+    """
+    field = len(entrants)
+    if field < 2 or field & (field - 1):
+        raise ApplicationError(
+            "Seeded brackets need a power-of-two number of entrants."
+        )
+    return [
+        (entrants[top - 1], entrants[field - top])
+        for top in bracket_order(field // 2)
+    ]
+
+
+def get_seeded_entrants(tournament: Tournament):
+    """
+    Returns the tournament's user or team ids ordered from the strongest seed
+    down, ranked by the database in a single query.
+    """
+    if tournament.seeding == "rating":
+        if tournament.type == "individual":
+            strength = Coalesce(
+                Subquery(
+                    PlayerRating.objects.filter(
+                        user_id=OuterRef("user_id"), game_id=tournament.game_id
+                    ).values("rating")[:1]
+                ),
+                Value(DEFAULT_RATING),
+            )
+        else:
+            # Members without a rating for the game count at the default
+            # rating rather than being left out of the average.
+            rated = Q(members__ratings__game_id=tournament.game_id)
+            members = Count("members", distinct=True)
+            strength = Coalesce(
+                ExpressionWrapper(
+                    (
+                        Coalesce(Sum("members__ratings__rating", filter=rated), Value(0.0))
+                        + (members - Count("members__ratings", filter=rated)) * Value(DEFAULT_RATING)
+                    )
+                    / NullIf(members, 0),
+                    output_field=FloatField(),
+                ),
+                Value(DEFAULT_RATING),
+            )
+    elif tournament.type == "individual":
+        strength = F("user__score")
+    else:
+        strength = Coalesce(Avg("members__score"), Value(0.0))
+
+    if tournament.type == "individual":
+        queryset = Participant.objects.filter(tournament=tournament)
+        entrant_field = "user_id"
+    else:
+        queryset = tournament.teams.all()
+        entrant_field = "id"
+    return list(
+        queryset.annotate(strength=strength)
+        .order_by(F("strength").desc(), entrant_field)
+        .values_list(entrant_field, flat=True)
+    )
+
+
 def generate_matches(tournament: Tournament):
     """
     Generates matches for the first round of a tournament.
@@ -34,6 +121,27 @@ def generate_matches(tournament: Tournament):
             "Matches have already been generated for this tournament."
         )
 
+    if tournament.seeding != "random":
+        entrants = get_seeded_entrants(tournament)
+        if len(entrants) < 2:
+            raise ApplicationError("Not enough participants to generate matches.")
+        if tournament.type == "individual":
+            first, second = "participant1_user_id", "participant2_user_id"
+        else:
+            first, second = "participant1_team_id", "participant2_team_id"
+        Match.objects.bulk_create(
+            [
+                Match(
+                    tournament=tournament,
+                    match_type=tournament.type,
+                    round=1,
+                    **{first: high, second: low},
+                )
+                for high, low in seeded_pairings(entrants)
+            ]
+        )
+        return
+
     if tournament.type == "individual":
         participants = list(tournament.participants.all())
         if len(participants) < 2:
@@ -74,38 +182,167 @@ def confirm_match_result(match: Match, winner_id: int, user: User, proof_image=N
     if match.is_confirmed:
         raise ApplicationError("Match result has already been confirmed.")
 
-    try:
-        if match.match_type == "individual":
-            winner = User.objects.get(id=winner_id)
-            match.winner_user = winner
-        else:
-            winner = Team.objects.get(id=winner_id)
-            match.winner_team = winner
-    except (User.DoesNotExist, Team.DoesNotExist):
+    if match.match_type == "individual":
+        candidates = (match.participant1_user_id, match.participant2_user_id)
+        winner_field = "winner_user_id"
+    else:
+        candidates = (match.participant1_team_id, match.participant2_team_id)
+        winner_field = "winner_team_id"
+    if winner_id not in candidates:
         raise ApplicationError("Invalid winner ID.")
 
+    updated = Match.objects.filter(pk=match.pk, is_confirmed=False).update(
+        is_confirmed=True, **{winner_field: winner_id}
+    )
+    if not updated:
+        raise ApplicationError("Match result has already been confirmed.")
     match.is_confirmed = True
-    match.result_proof = proof_image
-    match.save()
+    setattr(match, winner_field, winner_id)
+
+    if proof_image is not None:
+        match.result_proof = proof_image
+        match.save(update_fields=["result_proof"])
+    _schedule_rating_update(match)
 
     tournament = match.tournament
-    round_matches = tournament.matches.filter(round=match.round)
-    if all(m.is_confirmed for m in round_matches):
+    if not tournament.matches.filter(round=match.round, is_confirmed=False).exists():
         advance_to_next_round(tournament, match.round)
 
 
+# Allowed status transitions for the participant-driven result flow.
+MATCH_TRANSITIONS = {
+    "ongoing": ("pending_confirmation",),
+    "pending_confirmation": ("completed", "disputed"),
+}
+
+
+def _transition_match(match: Match, from_status: str, to_status: str, exclude=None, **changes):
+    """
+    Moves ``match`` from ``from_status`` to ``to_status`` with a single
+    conditional ``UPDATE ... WHERE id=? AND status=?``.
+
+    Two participants acting at the same instant can both pass the Python-side
+    checks, but only one UPDATE matches the row; the other affects zero rows
+    and raises ``MatchTransitionConflict``. No row lock outlives the statement.
+    """
+    if to_status not in MATCH_TRANSITIONS.get(from_status, ()):
+        raise ApplicationError(
+            f"Invalid match transition from '{from_status}' to '{to_status}'."
+        )
+
+    queryset = Match.objects.filter(pk=match.pk, status=from_status)
+    if exclude:
+        queryset = queryset.exclude(**exclude)
+    if not queryset.update(status=to_status, **changes):
+        raise MatchTransitionConflict(
+            _("This match was updated by someone else. Please reload and try again.")
+        )
+
+    match.status = to_status
+    for field, value in changes.items():
+        setattr(match, field, value)
+    return match
+
+
+def submit_match_result(match: Match, user: User, winner_id: int, result_proof):
+    """
+    Records the result reported by one participant and moves the match to
+    'pending_confirmation'.
+    """
+    if match.status != "ongoing":
+        raise ApplicationError(_("This match is not in 'ongoing' status."))
+    if match.result_submitted_by_id is not None:
+        raise ApplicationError(_("The result of this match has already been submitted."))
+
+    if match.match_type == "individual":
+        if winner_id not in (match.participant1_user_id, match.participant2_user_id):
+            raise ApplicationError(_("Invalid winner ID."))
+        winner_field = "winner_user_id"
+    else:
+        if winner_id not in (match.participant1_team_id, match.participant2_team_id):
+            raise ApplicationError(_("Invalid winner team ID."))
+        winner_field = "winner_team_id"
+
+    _transition_match(
+        match,
+        "ongoing",
+        "pending_confirmation",
+        exclude={"result_submitted_by__isnull": False},
+        result_submitted_by_id=user.id,
+        **{winner_field: winner_id},
+    )
+
+    # The proof is stored only after the transition was won, so a losing
+    # request never writes a file. If storing it fails, hand the match back.
+    try:
+        match.result_proof = result_proof
+        match.save(update_fields=["result_proof"])
+    except Exception:
+        Match.objects.filter(
+            pk=match.pk, status="pending_confirmation", result_submitted_by_id=user.id
+        ).update(
+            status="ongoing",
+            result_submitted_by_id=None,
+            **{winner_field: None},
+        )
+        raise
+    return match
+
+
+def confirm_submitted_result(match: Match, user: User):
+    """
+    Confirms the result submitted by the other participant and completes the match.
+    """
+    if match.status != "pending_confirmation":
+        raise ApplicationError(_("This match is not in 'pending confirmation' status."))
+    if match.result_submitted_by_id == user.id:
+        raise ApplicationError(_("You cannot confirm a result you submitted."))
+
+    _transition_match(
+        match,
+        "pending_confirmation",
+        "completed",
+        exclude={"result_submitted_by_id": user.id},
+        is_confirmed=True,
+    )
+    _schedule_rating_update(match)
+    return match
+
+
+def dispute_submitted_result(match: Match, user: User, reason: str):
+    """
+    Disputes the result submitted by the other participant.
+    """
+    if not reason:
+        raise ApplicationError(_("Reason for dispute must be provided."))
+    if match.status != "pending_confirmation":
+        raise ApplicationError(_("This match is not in 'pending confirmation' status."))
+    if match.result_submitted_by_id == user.id:
+        raise ApplicationError(_("You cannot dispute a result you submitted."))
+
+    return _transition_match(
+        match,
+        "pending_confirmation",
+        "disputed",
+        exclude={"result_submitted_by_id": user.id},
+        is_disputed=True,
+        dispute_reason=reason,
+    )
+
+
 def advance_to_next_round(tournament: Tournament, current_round: int):
     """
     Advances the winners of the current round to the next round.
     """
     if tournament.type == "individual":
         winners = [
-            m.winner_user for m in tournament.matches.filter(round=current_round)
+            m.winner_user for m in tournament.matches.filter(round=current_round).order_by("id")
         ]
         if len(winners) < 2:
             return
 
-        random.shuffle(winners)
+        if tournament.seeding == "random":
+            random.shuffle(winners)
         for i in range(0, len(winners) - 1, 2):
             Match.objects.create(
                 tournament=tournament,
@@ -116,12 +353,13 @@ def advance_to_next_round(tournament: Tournament, current_round: int):
             )
     elif tournament.type == "team":
         winners = [
-            m.winner_team for m in tournament.matches.filter(round=current_round)
+            m.winner_team for m in tournament.matches.filter(round=current_round).order_by("id")
         ]
         if len(winners) < 2:
             return
 
-        random.shuffle(winners)
+        if tournament.seeding == "random":
+            random.shuffle(winners)
         for i in range(0, len(winners) - 1, 2):
             Match.objects.create(
                 tournament=tournament,
@@ -172,20 +410,25 @@ def join_tournament(
         if tournament.participants.filter(id=user.id).exists():
             raise ApplicationError("You have already joined this tournament.")
 
+        participant = Participant.objects.create(user=user, tournament=tournament)
         if not tournament.is_free:
             transaction_type = (
                 Transaction.TransactionType.TOKEN_SPENT
                 if tournament.is_token_based
                 else Transaction.TransactionType.ENTRY_FEE
             )
+            # Keyed by the participation, so rejoining after leaving is
+            # charged again.
             WalletService.process_transaction(
                 user=user,
                 amount=tournament.entry_fee,
                 transaction_type=transaction_type,
                 description=f"Entry fee for tournament: {tournament.name}",
+                idempotency_key=f"entry-fee:{tournament.id}:{user.id}:{participant.id}",
+                tournament=tournament,
             )
 
-        return Participant.objects.create(user=user, tournament=tournament)
+        return participant
 
     elif tournament.type == "team":
         team = Team.objects.get(id=team_id)
@@ -208,67 +451,330 @@ def join_tournament(
                     f"User {member.username} must set their in-game ID for this game."
                 )
 
+        tournament.teams.add(team)
+        participants = [
+            Participant.objects.get_or_create(user=member, tournament=tournament)[0]
+            for member in members
+        ]
+
         if not tournament.is_free:
             transaction_type = (
                 Transaction.TransactionType.TOKEN_SPENT
                 if tournament.is_token_based
                 else Transaction.TransactionType.ENTRY_FEE
             )
-            for member in members:
+            for member, participant in zip(members, participants):
                 try:
                     WalletService.process_transaction(
                         user=member,
                         amount=tournament.entry_fee,
                         transaction_type=transaction_type,
                         description=f"Entry fee for team {team.name} in tournament: {tournament.name}",
+                        idempotency_key=f"entry-fee:{tournament.id}:{member.id}:{participant.id}",
+                        tournament=tournament,
                     )
                 except ValidationError as e:
                     raise ApplicationError(
                         f"Failed to process fee for {member.username}: {e.detail[0]}"
                     )
 
-        tournament.teams.add(team)
-        for member in members:
-            Participant.objects.get_or_create(user=member, tournament=tournament)
-
         return team
 
-def pay_prize(tournament: Tournament, winner):
+
+# Share of the prize pool per placement used when a tournament has no split
+# of its own.
+DEFAULT_PRIZE_DISTRIBUTION = [50, 25, 15, 7, 3]
+
+CENT = Decimal("0.01")
+
+
+def split_prize_pool(prize_pool: Decimal, weights) -> list:
     """
-    Pays the prize to the winner using the safe wallet service.
+    Splits ``prize_pool`` in proportion to ``weights``. Shares are rounded
+    down to the cent and the remainder goes to first place, so the shares
+    always add up to the pool exactly.
+    """
+    total_weight = sum(Decimal(str(weight)) for weight in weights)
+    if total_weight <= 0:
+        raise ApplicationError("The prize distribution must have a positive total.")
+    shares = [
+        (prize_pool * Decimal(str(weight)) / total_weight).quantize(CENT, rounding=ROUND_DOWN)
+        for weight in weights
+    ]
+    shares[0] += prize_pool - sum(shares)
+    return shares
+
+
+def get_prize_placements(tournament: Tournament) -> list:
+    """
+    Returns the paid placements as a list of user id lists, first place
+    first. Ranked participants (battle royale standings) take precedence;
+    otherwise the winners are ordered by match wins. A team placement lists
+    every member of the team.
+    """
+    limit = max(1, tournament.winner_slots)
+    ranked = list(
+        Participant.objects.filter(tournament=tournament, rank__isnull=False)
+        .order_by("rank", "id")
+        .values_list("user_id", flat=True)[:limit]
+    )
+    if ranked:
+        return [[user_id] for user_id in ranked]
+
+    winners = get_tournament_winners(tournament)
+    if tournament.type == "individual":
+        return [[user.id] for user in winners]
+
+    placements = []
+    for team in winners.select_related("captain").prefetch_related("members"):
+        member_ids = [team.captain_id]
+        member_ids += [member.id for member in team.members.all() if member.id != team.captain_id]
+        placements.append(member_ids)
+    return placements
+
+
+def _paid_placements(tournament: Tournament, distribution=None):
+    """
+    Returns ``(placements, weights)``: the placements that receive a share of
+    the prize pool and the distribution weight of each.
+    """
+    placements = get_prize_placements(tournament)
+    weights = (distribution or tournament.prize_distribution or DEFAULT_PRIZE_DISTRIBUTION)
+    weights = weights[: min(tournament.winner_slots, len(placements))]
+    return placements[: len(weights)], weights
+
+
+def pay_tournament_prizes(tournament: Tournament, distribution=None):
+    """
+    Splits the prize pool across the top placements and credits every winner
+    in a single transaction, writing each share to ``Participant.prize``.
+
+    The payout is keyed per tournament: running it again, or concurrently,
+    returns the existing PrizePayout without paying anyone twice.
     """
     if tournament.is_free or not tournament.prize_pool or tournament.prize_pool <= 0:
-        return
+        return None
 
-    try:
-        WalletService.process_transaction(
-            user=winner,
-            amount=tournament.prize_pool,
-            transaction_type=Transaction.TransactionType.PRIZE,
-            description=f"Prize for winning tournament: {tournament.name}",
+    idempotency_key = f"tournament-prize:{tournament.id}"
+    existing = PrizePayout.objects.filter(idempotency_key=idempotency_key).first()
+    if existing:
+        return existing
+
+    placements, weights = _paid_placements(tournament, distribution)
+    if not placements:
+        raise ApplicationError("This tournament has no winners to pay.")
+
+    prizes, ranks = {}, {}
+    for rank, (user_ids, share) in enumerate(
+        zip(placements, split_prize_pool(tournament.prize_pool, weights)), start=1
+    ):
+        member_shares = split_prize_pool(share, [1] * len(user_ids))
+        for user_id, amount in zip(user_ids, member_shares):
+            prizes[user_id] = prizes.get(user_id, Decimal("0")) + amount
+            ranks.setdefault(user_id, rank)
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                payout = PrizePayout.objects.create(
+                    tournament=tournament,
+                    idempotency_key=idempotency_key,
+                    total=tournament.prize_pool,
+                    winners=len(prizes),
+                )
+        except IntegrityError:
+            return PrizePayout.objects.get(idempotency_key=idempotency_key)
+
+        try:
+            WalletService.bulk_credit(
+                prizes,
+                Transaction.TransactionType.PRIZE,
+                description=f"Prize for tournament: {tournament.name}",
+                tournament=tournament,
+            )
+        except ValidationError as e:
+            raise ApplicationError(f"Failed to pay prizes for tournament {tournament.id}: {e.detail[0]}")
+
+        participants = list(
+            Participant.objects.filter(tournament=tournament, user_id__in=prizes.keys())
         )
-    except ValidationError as e:
-        logger.error(f"Failed to pay prize to {winner.username} for tournament {tournament.id}: {e.detail[0]}")
+        for participant in participants:
+            participant.prize = prizes[participant.user_id]
+            if participant.rank is None:
+                participant.rank = ranks[participant.user_id]
+        Participant.objects.bulk_update(participants, ["prize", "rank"], batch_size=500)
+
+    logger.info(
+        f"Paid {tournament.prize_pool} in prizes to {len(prizes)} winners of tournament {tournament.id}"
+    )
+    return payout
+
+
+# Players refunded per database transaction.
+REFUND_CHUNK_SIZE = 500
+
+
+def _mark_refunds(tournament: Tournament, amount: Decimal, rows):
+    """Upserts EntryFeeRefund markers from ``(user_id, status, error, tx)`` rows."""
+    EntryFeeRefund.objects.bulk_create(
+        [
+            EntryFeeRefund(
+                tournament=tournament,
+                user_id=user_id,
+                amount=amount,
+                status=status,
+                error=error[:255],
+                transaction=tx,
+            )
+            for user_id, status, error, tx in rows
+        ],
+        update_conflicts=True,
+        unique_fields=["tournament", "user"],
+        update_fields=["amount", "status", "error", "transaction", "updated_at"],
+    )
+
 
+# Markers of players that no refund run may credit (again).
+SETTLED_REFUND_STATUSES = ("refunded", "forfeited")
 
-def refund_entry_fees(tournament: Tournament, cheater):
+
+def _already_refunded(tournament: Tournament, user_ids):
     """
-    Refunds entry fees to all participants except the cheater.
+    Locks the tournament row and returns which of ``user_ids`` are refunded
+    or have forfeited their refund. Must run inside a transaction: the lock
+    serialises concurrent refund runs of the tournament, so a retry or
+    duplicate task that read the same pending players sees the markers the
+    other run committed.
     """
-    if tournament.is_free or not tournament.entry_fee:
-        return
+    Tournament.objects.select_for_update().filter(pk=tournament.pk).exists()
+    return set(
+        EntryFeeRefund.objects.filter(
+            tournament=tournament, user_id__in=user_ids, status__in=SETTLED_REFUND_STATUSES
+        ).values_list("user_id", flat=True)
+    )
+
 
-    for participant in tournament.participants.all():
-        if participant.user != cheater:
-            try:
-                WalletService.process_transaction(
-                    user=participant.user,
-                    amount=tournament.entry_fee,
-                    transaction_type=Transaction.TransactionType.DEPOSIT,
+def _forfeit_entry_fee(tournament: Tournament, user):
+    """
+    Records that ``user`` gets no entry fee refund, so every later refund run
+    of the tournament skips them too. A refund already paid is kept.
+    """
+    with transaction.atomic():
+        if user.id not in _already_refunded(tournament, [user.id]):
+            _mark_refunds(tournament, tournament.entry_fee, [(user.id, "forfeited", "", None)])
+
+
+def _refund_chunk(tournament: Tournament, user_ids, transaction_type):
+    """
+    Refunds one chunk of players in a single transaction and records the
+    outcome. Returns ``(refunded_user_ids, {user_id: error})``.
+    """
+    amount = tournament.entry_fee
+    with_wallet = set(
+        Wallet.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True)
+    )
+    failures = {
+        user_id: "Wallet not found." for user_id in user_ids if user_id not in with_wallet
+    }
+    refunded = [user_id for user_id in user_ids if user_id in with_wallet]
+
+    try:
+        with transaction.atomic():
+            done = _already_refunded(tournament, refunded)
+            refunded = [user_id for user_id in refunded if user_id not in done]
+            if refunded:
+                txs = WalletService.bulk_credit(
+                    {user_id: amount for user_id in refunded},
+                    transaction_type,
                     description=f"Refund for tournament: {tournament.name}",
+                    tournament=tournament,
                 )
-            except ValidationError as e:
-                logger.error(f"Failed to refund {participant.user.username} for t: {tournament.id}: {e.detail[0]}")
+                _mark_refunds(
+                    tournament,
+                    amount,
+                    [(tx.wallet.user_id, "refunded", "", tx) for tx in txs],
+                )
+    except (DatabaseError, ValidationError, ValueError) as e:
+        logger.exception(f"Refund chunk for tournament {tournament.id} failed")
+        failures.update({user_id: str(e) for user_id in refunded})
+        refunded = []
+
+    if failures:
+        with transaction.atomic():
+            # Never overwrite a refund another run has recorded meanwhile.
+            done = _already_refunded(tournament, list(failures))
+            failures = {
+                user_id: error for user_id, error in failures.items() if user_id not in done
+            }
+            _mark_refunds(
+                tournament,
+                amount,
+                [(user_id, "failed", error, None) for user_id, error in failures.items()],
+            )
+    return refunded, failures
+
+
+def refund_entry_fees(tournament: Tournament, cheater=None, chunk_size: int = REFUND_CHUNK_SIZE):
+    """
+    Refunds the entry fee to every participant except ``cheater`` and any
+    player excluded by an earlier run.
+
+    Players are credited in chunks of ``chunk_size``, one transaction per
+    chunk, and each outcome is stored as an EntryFeeRefund marker. A run that
+    stops halfway can simply be repeated: players already refunded or
+    forfeited are skipped and failed ones are retried. Returns a report of
+    the run.
+    """
+    report = {
+        "tournament": tournament.id,
+        "refunded": 0,
+        "already_refunded": 0,
+        "amount": "0",
+        "failed": [],
+    }
+    if tournament.is_free or not tournament.entry_fee:
+        return report
+
+    transaction_type = (
+        Transaction.TransactionType.TOKEN_EARNED
+        if tournament.is_token_based
+        else Transaction.TransactionType.DEPOSIT
+    )
+    if cheater is not None:
+        _forfeit_entry_fee(tournament, cheater)
+    already_refunded = EntryFeeRefund.objects.filter(
+        tournament=tournament, user_id=OuterRef("user_id"), status__in=SETTLED_REFUND_STATUSES
+    )
+    pending = Participant.objects.filter(tournament=tournament).exclude(
+        Exists(already_refunded)
+    )
+    report["already_refunded"] = EntryFeeRefund.objects.filter(
+        tournament=tournament, status="refunded"
+    ).count()
+
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            pending.filter(user_id__gt=last_user_id)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+        refunded, failures = _refund_chunk(tournament, user_ids, transaction_type)
+        report["refunded"] += len(refunded)
+        report["failed"] += [
+            {"user_id": user_id, "error": error} for user_id, error in failures.items()
+        ]
+
+    report["amount"] = str(tournament.entry_fee * report["refunded"])
+    logger.info(
+        f"Refunded {report['refunded']} players of tournament {tournament.id},"
+        f" {len(report['failed'])} failed"
+    )
+    return report
+
 
 # ... (other functions remain the same)
 def dispute_match_result(match: Match, user, reason: str):
@@ -282,7 +788,7 @@ def dispute_match_result(match: Match, user, reason: str):
 
     match.is_disputed = True
     match.dispute_reason = reason
-    match.save()
+    match.save(update_fields=["is_disputed", "dispute_reason"])
 
 
 def get_tournament_winners(tournament: Tournament):
@@ -303,6 +809,7 @@ def get_tournament_winners(tournament: Tournament):
     )
     return winners
 
+
 def create_report_service(
     reporter: User,
     reported_user_id: int,
@@ -440,14 +947,402 @@ def distribute_scores_for_tournament(tournament: Tournament, score_distribution=
         user.update_rank()
 
 
+# Points per placement used when a tournament has no table of its own.
+DEFAULT_PLACEMENT_POINTS = [15, 12, 10, 8, 6, 4, 2, 1, 1, 1, 1, 1]
+
+
+def calculate_battle_royale_points(tournament: Tournament, placement: int, kills: int) -> int:
+    """Returns the points a player earns for one battle royale result."""
+    table = tournament.placement_points or DEFAULT_PLACEMENT_POINTS
+    placement_points = table[placement - 1] if 0 < placement <= len(table) else 0
+    return placement_points + kills * tournament.kill_points
+
+
+def ingest_battle_royale_results(tournament: Tournament, rows):
+    """
+    Upserts battle royale results into ``Scoring`` and refreshes standings.
+
+    Each row is a dict with ``placement``, ``kills`` and either ``user_id``
+    or the in-game ``player_id``. Rows are resolved against the tournament's
+    participants in one query; an upload naming anyone who is not registered
+    is rejected as a whole. Scores are kept per qualifier stage, so results
+    of a later stage never overwrite an earlier one; re-uploading the same
+    lobby replaces the previous rows instead of adding to them.
+    """
+    if tournament.mode != "battle_royale":
+        raise ApplicationError("Results can only be uploaded for battle royale tournaments.")
+    if not rows:
+        raise ApplicationError("No results were provided.")
+
+    user_ids = {row["user_id"] for row in rows if row.get("user_id")}
+    player_ids = {row["player_id"] for row in rows if row.get("player_id")}
+    in_game_id = InGameID.objects.filter(
+        user_id=OuterRef("user_id"), game_id=tournament.game_id
+    ).values("player_id")[:1]
+    registered = (
+        Participant.objects.filter(tournament=tournament)
+        .annotate(player_id=Subquery(in_game_id))
+        .filter(Q(user_id__in=user_ids) | Q(player_id__in=player_ids))
+        .values_list("user_id", "player_id", "lobby_id", "lobby__stage")
+    )
+    lobby_by_user = {}
+    users_by_player_id = {}
+    for user_id, player_id, lobby_id, stage in registered:
+        lobby_by_user[user_id] = (lobby_id, stage or 0)
+        if player_id:
+            users_by_player_id[player_id] = user_id
+
+    scores = {}
+    unknown = []
+    for row in rows:
+        if row.get("user_id"):
+            user_id = row["user_id"] if row["user_id"] in lobby_by_user else None
+        else:
+            user_id = users_by_player_id.get(row.get("player_id"))
+        if user_id is None:
+            unknown.append(row.get("user_id") or row.get("player_id"))
+            continue
+        if user_id in scores:
+            raise ApplicationError(f"Duplicate result for user {user_id}.")
+        lobby_id, stage = lobby_by_user[user_id]
+        scores[user_id] = Scoring(
+            tournament=tournament,
+            user_id=user_id,
+            lobby_id=lobby_id,
+            stage=stage,
+            placement=row["placement"],
+            kills=row["kills"],
+            score=calculate_battle_royale_points(tournament, row["placement"], row["kills"]),
+        )
+
+    if unknown:
+        raise ApplicationError(
+            "These players are not registered in this tournament: "
+            + ", ".join(str(identifier) for identifier in unknown)
+        )
+
+    with transaction.atomic():
+        Scoring.objects.bulk_create(
+            scores.values(),
+            update_conflicts=True,
+            unique_fields=["tournament", "user", "stage"],
+            update_fields=["score", "placement", "kills", "lobby"],
+            batch_size=500,
+        )
+        update_battle_royale_standings(tournament)
+
+    return {"ingested": len(scores)}
+
+
+def update_battle_royale_standings(tournament: Tournament):
+    """
+    Writes ``Participant.rank`` from the tournament's scores in a single pass.
+
+    Players are ranked by the score of the latest stage they played, those
+    who reached a later stage first. Ties on score are broken by the better
+    placement; participants without a score are left unranked.
+    """
+    ordered_user_ids = Scoring.objects.filter(tournament=tournament).order_by(
+        "-stage", "-score", "placement", "user_id"
+    ).values_list("user_id", flat=True)
+    ranks = {}
+    for user_id in ordered_user_ids:
+        ranks.setdefault(user_id, len(ranks) + 1)
+
+    changed = []
+    for participant in Participant.objects.filter(tournament=tournament).only(
+        "id", "user_id", "rank"
+    ):
+        rank = ranks.get(participant.user_id)
+        if participant.rank != rank:
+            participant.rank = rank
+            changed.append(participant)
+    Participant.objects.bulk_update(changed, ["rank"], batch_size=500)
+
+
+def _generate_room_credentials():
+    """Returns a random numeric room id and password for a game lobby."""
+    return f"{secrets.randbelow(10**8):08d}", f"{secrets.randbelow(10**6):06d}"
+
+
+@transaction.atomic
+def allocate_lobbies(tournament: Tournament, lobby_size: int = 100):
+    """
+    Splits the tournament's remaining entrants into lobbies of at most
+    ``lobby_size`` players for the next qualifier stage.
+
+    Entrants are sorted once by ``User.score`` and dealt into lobbies in
+    snake order (1..N, N..1, ...) so every lobby gets a similar spread of
+    strong and weak players. Lobbies and assignments are written in bulk.
+    """
+    if tournament.mode != "battle_royale":
+        raise ApplicationError("Lobbies are only used in battle royale tournaments.")
+    if tournament.type != "individual":
+        raise ApplicationError("Lobby allocation is only available for individual tournaments.")
+    if lobby_size < 2:
+        raise ApplicationError("A lobby must hold at least two players.")
+
+    # Serialises concurrent allocations, which would otherwise both create
+    # the same stage.
+    Tournament.objects.select_for_update().filter(pk=tournament.pk).exists()
+    current_stage = tournament.lobbies.aggregate(stage=Max("stage"))["stage"] or 0
+    if tournament.lobbies.filter(stage=current_stage, is_finished=False).exists():
+        raise ApplicationError("Advance the current stage before allocating the next one.")
+
+    entrant_ids = list(
+        Participant.objects.filter(tournament=tournament)
+        .exclude(status="eliminated")
+        .order_by("-user__score", "id")
+        .values_list("id", flat=True)
+    )
+    if len(entrant_ids) < 2:
+        raise ApplicationError("Not enough participants to allocate lobbies.")
+
+    lobby_count = math.ceil(len(entrant_ids) / lobby_size)
+    stage = current_stage + 1
+    lobbies = []
+    for number in range(1, lobby_count + 1):
+        room_id, password = _generate_room_credentials()
+        lobbies.append(
+            Lobby(
+                tournament=tournament,
+                stage=stage,
+                number=number,
+                room_id=room_id,
+                password=password,
+            )
+        )
+    lobbies = Lobby.objects.bulk_create(lobbies)
+
+    assignments = []
+    for position, participant_id in enumerate(entrant_ids):
+        lap, offset = divmod(position, lobby_count)
+        index = offset if lap % 2 == 0 else lobby_count - 1 - offset
+        assignments.append(Participant(id=participant_id, lobby_id=lobbies[index].id))
+    Participant.objects.bulk_update(assignments, ["lobby"], batch_size=1000)
+
+    return lobbies
+
+
+@transaction.atomic
+def advance_lobby_winners(tournament: Tournament, top_k: int):
+    """
+    Closes the current stage, keeping the top ``top_k`` players of every
+    lobby and eliminating the rest.
+
+    Players are ranked inside their lobby by the score they earned there,
+    with a window function, so the advancing set is computed by the database.
+    Everyone in the stage outside that set is eliminated with one UPDATE.
+    """
+    if top_k < 1:
+        raise ApplicationError("At least one player per lobby must advance.")
+
+    stage = tournament.lobbies.aggregate(stage=Max("stage"))["stage"]
+    lobbies = tournament.lobbies.filter(stage=stage, is_finished=False)
+    if stage is None or not lobbies.exists():
+        raise ApplicationError("There is no open stage to advance.")
+
+    lobby_scores = Scoring.objects.filter(
+        tournament=tournament, user_id=OuterRef("user_id"), lobby_id=OuterRef("lobby_id")
+    )
+    stage_entrants = Participant.objects.filter(
+        tournament=tournament, lobby__stage=stage
+    ).exclude(status="eliminated")
+    ranked = stage_entrants.annotate(
+        lobby_score=Coalesce(Subquery(lobby_scores.values("score")[:1]), Value(0)),
+        lobby_placement=Subquery(lobby_scores.values("placement")[:1]),
+        lobby_position=Window(
+            RowNumber(),
+            partition_by=[F("lobby_id")],
+            order_by=[
+                F("lobby_score").desc(),
+                F("lobby_placement").asc(nulls_last=True),
+                F("id").asc(),
+            ],
+        ),
+    )
+    advancing_ids = set(
+        ranked.filter(lobby_position__lte=top_k).values_list("id", flat=True)
+    )
+    eliminated = stage_entrants.exclude(id__in=advancing_ids).update(status="eliminated")
+    lobbies.update(is_finished=True)
+
+    return {"stage": stage, "advanced": len(advancing_ids), "eliminated": eliminated}
+
+
+def _schedule_entry_fee_refund(tournament: Tournament, cheater):
+    """
+    Excludes ``cheater`` from refunds right away and queues the bulk refund
+    once the calling transaction commits.
+    """
+    if tournament.is_free or not tournament.entry_fee:
+        return
+    from .tasks import refund_entry_fees_task
+
+    if cheater is not None:
+        _forfeit_entry_fee(tournament, cheater)
+
+    transaction.on_commit(
+        lambda: refund_entry_fees_task.delay(tournament.id, cheater.id if cheater else None)
+    )
+
+
+def _schedule_rating_update(match: Match):
+    """Rates an individual match once the confirming transaction commits."""
+    if match.match_type != "individual":
+        return
+    from .tasks import update_match_ratings_task
+
+    transaction.on_commit(lambda: update_match_ratings_task.delay(match.id))
+
+
+def _lock_game_ratings(game_id: int):
+    """
+    Locks the game row, serialising rating updates of the game against a
+    rebuild. Must run inside a transaction.
+    """
+    Game.objects.select_for_update().filter(pk=game_id).exists()
+
+
+@transaction.atomic
+def apply_match_ratings(match_id: int):
+    """
+    Applies a confirmed individual match to both players' Elo ratings for the
+    tournament's game.
+
+    The game's ratings are locked against a concurrent rebuild, and the match
+    is claimed with a conditional UPDATE on ``ratings_applied`` so a retried
+    task, or a rebuild that already replayed it, never rates the same result
+    twice. Both rating rows are locked in id order before they are changed.
+    """
+    game_id = (
+        Match.objects.filter(pk=match_id).values_list("tournament__game_id", flat=True).first()
+    )
+    if game_id is None:
+        return None
+    _lock_game_ratings(game_id)
+    claimed = Match.objects.filter(
+        pk=match_id,
+        match_type="individual",
+        is_confirmed=True,
+        ratings_applied=False,
+        winner_user__isnull=False,
+    ).update(ratings_applied=True, rated_at=timezone.now())
+    if not claimed:
+        return None
+
+    match = Match.objects.get(pk=match_id)
+    winner_id = match.winner_user_id
+    loser_id = (
+        match.participant2_user_id
+        if winner_id == match.participant1_user_id
+        else match.participant1_user_id
+    )
+    for user_id in sorted((winner_id, loser_id)):
+        PlayerRating.objects.get_or_create(user_id=user_id, game_id=game_id)
+    ratings = {
+        rating.user_id: rating
+        for rating in PlayerRating.objects.select_for_update()
+        .filter(game_id=game_id, user_id__in=(winner_id, loser_id))
+        .order_by("id")
+    }
+
+    winner, loser = ratings[winner_id], ratings[loser_id]
+    winner.rating, loser.rating = elo_update(winner.rating, loser.rating)
+    for rating in (winner, loser):
+        rating.matches_played += 1
+        rating.save(update_fields=["rating", "matches_played", "updated_at"])
+    return winner, loser
+
+
+def rebuild_ratings(game):
+    """
+    Recomputes every rating for ``game`` by replaying its confirmed individual
+    matches in the order they were rated, so the result matches the ratings
+    built up as results were confirmed. Matches not rated yet come last.
+
+    The history is loaded as flat id columns and rated in one vectorized pass
+    (see ``tournaments.ratings.replay_elo``); the resulting rows replace the
+    game's ratings in bulk. The game's ratings stay locked from reading the
+    history to writing the result, so a match rated meanwhile is either
+    replayed here or applied on top of the rebuilt ratings.
+    """
+    with transaction.atomic():
+        _lock_game_ratings(game.pk)
+        return _rebuild_locked_ratings(game)
+
+
+def _rebuild_locked_ratings(game):
+    history = (
+        Match.objects.filter(
+            tournament__game=game,
+            match_type="individual",
+            is_confirmed=True,
+            winner_user__isnull=False,
+        )
+        .order_by(F("rated_at").asc(nulls_last=True), "tournament__start_date", "round", "id")
+        .values_list("id", "participant1_user_id", "participant2_user_id", "winner_user_id")
+    )
+    rows = np.array(list(history.iterator(chunk_size=10000)), dtype=np.int64).reshape(-1, 4)
+    match_ids = rows[:, 0]
+    winners = rows[:, 3]
+    losers = np.where(rows[:, 1] == winners, rows[:, 2], rows[:, 1])
+    user_ids, dense = np.unique(np.concatenate([winners, losers]), return_inverse=True)
+    ratings, games = replay_elo(dense[: len(winners)], dense[len(winners):], len(user_ids))
+
+    PlayerRating.objects.filter(game=game).delete()
+    PlayerRating.objects.bulk_create(
+        [
+            PlayerRating(
+                user_id=user_id,
+                game=game,
+                rating=float(rating),
+                matches_played=int(played),
+            )
+            for user_id, rating, played in zip(user_ids.tolist(), ratings, games)
+        ],
+        batch_size=1000,
+    )
+    # Only the replayed matches are marked, so results confirmed while the
+    # history was being rated are still picked up by their own task. Those
+    # rated here for the first time keep their place in the next replay.
+    rated_at = timezone.now()
+    for start in range(0, len(match_ids), 10000):
+        Match.objects.filter(
+            id__in=match_ids[start:start + 10000].tolist(), ratings_applied=False
+        ).update(ratings_applied=True, rated_at=rated_at)
+    return len(user_ids)
+
+
+def _winner_submissions_decided(tournament: Tournament) -> bool:
+    """
+    True once no winner submission of the tournament is pending and every
+    paid placement has an approved submission from one of its players.
+    """
+    submissions = WinnerSubmission.objects.filter(tournament=tournament)
+    if submissions.filter(status="pending").exists():
+        return False
+    approved = set(submissions.filter(status="approved").values_list("winner_id", flat=True))
+    placements, _ = _paid_placements(tournament)
+    return bool(placements) and all(approved.intersection(user_ids) for user_ids in placements)
+
+
 def approve_winner_submission_service(submission: WinnerSubmission):
-    submission.status = "approved"
-    submission.save()
-    pay_prize(submission.tournament, submission.winner)
+    """
+    Approves a winner submission. The prize pool is paid to the whole field
+    once, when the last paid placement's submission is approved; a payout
+    error rolls the approval back and is raised to the caller.
+    """
+    tournament = submission.tournament
+    with transaction.atomic():
+        submission.status = "approved"
+        submission.save()
+        if _winner_submissions_decided(tournament):
+            pay_tournament_prizes(tournament)
     send_notification(
         user=submission.winner,
         message=_("Your submission for %(tournament_name)s has been approved.")
-        % {"tournament_name": submission.tournament.name},
+        % {"tournament_name": tournament.name},
         notification_type="winner_submission_status_change",
     )
     return submission
@@ -456,7 +1351,7 @@ def approve_winner_submission_service(submission: WinnerSubmission):
 def reject_winner_submission_service(submission: WinnerSubmission):
     submission.status = "rejected"
     submission.save()
-    refund_entry_fees(submission.tournament, submission.winner)
+    _schedule_entry_fee_refund(submission.tournament, submission.winner)
     send_notification(
         user=submission.winner,
         message=_("Your submission for %(tournament_name)s has been rejected.")
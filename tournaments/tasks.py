@@ -1,6 +1,7 @@
 from celery import shared_task
 from .services import generate_matches as generate_matches_service
-from .services import approve_winner_submission_service
+from .services import (apply_match_ratings, approve_winner_submission_service,
+                       refund_entry_fees)
 
 
 @shared_task
@@ -16,10 +17,12 @@ def generate_matches_task(tournament_id):
         # Handle the case where the tournament is not found
         pass
 
+
 @shared_task
 def approve_winner_submission_task(submission_id):
     """
-    Celery task to approve a winner submission and pay the prize.
+    Celery task to approve a winner submission, paying the prizes once the
+    last winner is approved.
     """
     from .models import WinnerSubmission
     try:
@@ -28,3 +31,27 @@ def approve_winner_submission_task(submission_id):
     except WinnerSubmission.DoesNotExist:
         # Handle the case where the submission is not found
         pass
+
+
+@shared_task
+def update_match_ratings_task(match_id):
+    """
+    Celery task to apply a confirmed match to the players' ratings.
+    """
+    apply_match_ratings(match_id)
+
+
+@shared_task
+def refund_entry_fees_task(tournament_id, excluded_user_id=None):
+    """
+    Celery task to refund a tournament's entry fees in bulk. Safe to re-run:
+    players refunded by an earlier attempt are skipped. Returns the report.
+    """
+    from users.models import User
+    from .models import Tournament
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+    except Tournament.DoesNotExist:
+        return None
+    cheater = User.objects.filter(id=excluded_user_id).first() if excluded_user_id else None
+    return refund_entry_fees(tournament, cheater)
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from decimal import Decimal
 from unittest.mock import patch
 
 from django.core.exceptions import ValidationError
@@ -8,6 +9,7 @@ from django.utils import timezone
 from rest_framework import status
 from io import BytesIO
 
+import numpy as np
 from PIL import Image
 from rest_framework.test import APIClient, APITestCase
 
@@ -15,11 +17,25 @@ from tournament_project.celery import app as celery_app
 from teams.models import Team, TeamMembership
 from users.models import InGameID, User
 from verification.models import Verification
-
-from .exceptions import ApplicationError
-from .models import (Game, GameManager, Match, Participant, Report, Tournament,
-                     TournamentColor, TournamentImage, WinnerSubmission, Rank)
-from .services import get_tournament_winners, join_tournament
+from wallet.models import Transaction, Wallet
+
+from .exceptions import ApplicationError, MatchTransitionConflict
+from .models import (EntryFeeRefund, Game, GameManager, Lobby, Match, Participant, PlayerRating,
+                     PrizePayout, Report, Scoring,
+                     Tournament, TournamentColor, TournamentImage,
+                     WinnerSubmission, Rank)
+from . import ratings as ratings_module
+from .ratings import elo_update, replay_elo
+from .services import (advance_lobby_winners, advance_to_next_round, allocate_lobbies,
+                       apply_match_ratings, approve_winner_submission_service,
+                       bracket_order,
+                       confirm_submitted_result, dispute_submitted_result,
+                       generate_matches, get_seeded_entrants,
+                       get_tournament_winners, ingest_battle_royale_results,
+                       join_tournament, pay_tournament_prizes, rebuild_ratings,
+                       refund_entry_fees,
+                       reject_winner_submission_service, split_prize_pool)
+from .tasks import refund_entry_fees_task
 
 
 class TournamentModelTests(TestCase):
@@ -125,6 +141,22 @@ class TournamentModelTests(TestCase):
         except ValidationError:
             self.fail("Validation unexpectedly failed for same-day end after start.")
 
+    def test_placement_points_must_be_non_negative_integers(self):
+        """
+        Placement points are a list of whole, non-negative points per place.
+        """
+        for points in ([10, 6, 3], []):
+            Tournament(
+                name="Points Tournament", game=self.game, start_date=self.start_date,
+                end_date=self.end_date, placement_points=points,
+            ).clean()
+        for points in ([10, -1], [10, "6"], [2.5], [True], {"1": 10}):
+            with self.assertRaises(ValidationError):
+                Tournament(
+                    name="Points Tournament", game=self.game, start_date=self.start_date,
+                    end_date=self.end_date, placement_points=points,
+                ).clean()
+
     def test_paid_tournament_requires_entry_fee(self):
         """
         Test that a paid tournament must have an entry fee.
@@ -507,6 +539,34 @@ class TournamentViewSetTests(APITestCase):
             paid_tournament.participants.filter(id=self.user.id).exists()
         )
 
+    def test_rejoining_a_paid_tournament_charges_again(self):
+        """
+        Test that a player who left and joins again pays the entry fee again.
+        """
+        self.user.wallet.total_balance = 200
+        self.user.wallet.withdrawable_balance = 200
+        self.user.wallet.save()
+        paid_tournament = Tournament.objects.create(
+            name="Rejoin Tournament",
+            game=self.game,
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            is_free=False,
+            entry_fee=100,
+            type="individual",
+        )
+        InGameID.objects.create(user=self.user, game=self.game, player_id="rejoin-ingame")
+        join_tournament(paid_tournament, self.user)
+        Participant.objects.filter(tournament=paid_tournament, user=self.user).delete()
+
+        join_tournament(paid_tournament, self.user)
+
+        self.user.wallet.refresh_from_db()
+        self.assertEqual(self.user.wallet.withdrawable_balance, 0)
+        self.assertEqual(
+            Transaction.objects.filter(tournament=paid_tournament, transaction_type="entry_fee").count(), 2
+        )
+
     def test_join_paid_team_tournament(self):
         """
         Test that a user can join a paid team tournament and the entry fee is deducted.
@@ -799,6 +859,684 @@ class MatchViewSetTests(APITestCase):
         self.assertTrue(self.match.is_disputed)
 
 
+class MatchStateMachineTests(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            username="sm_user1", password="p", phone_number="+211"
+        )
+        self.user2 = User.objects.create_user(
+            username="sm_user2", password="p", phone_number="+212"
+        )
+        self.game = Game.objects.create(name="State Machine Game")
+        self.tournament = Tournament.objects.create(
+            name="State Machine Tournament",
+            game=self.game,
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+        )
+        self.match = Match.objects.create(
+            tournament=self.tournament,
+            participant1_user=self.user1,
+            participant2_user=self.user2,
+            round=1,
+            status="pending_confirmation",
+            winner_user=self.user1,
+            result_submitted_by=self.user1,
+        )
+
+    def test_concurrent_confirm_and_dispute_only_one_wins(self):
+        # Both requests loaded the match before either one wrote.
+        first = Match.objects.get(pk=self.match.pk)
+        second = Match.objects.get(pk=self.match.pk)
+
+        confirm_submitted_result(first, self.user2)
+        with self.assertRaises(MatchTransitionConflict):
+            dispute_submitted_result(second, self.user2, "Late dispute")
+
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.status, "completed")
+        self.assertTrue(self.match.is_confirmed)
+        self.assertFalse(self.match.is_disputed)
+
+    def test_submitter_cannot_confirm_even_with_stale_state(self):
+        stale = Match.objects.get(pk=self.match.pk)
+        stale.result_submitted_by = None
+        with self.assertRaises(MatchTransitionConflict):
+            confirm_submitted_result(stale, self.user1)
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.status, "pending_confirmation")
+
+    def test_transition_is_a_single_update(self):
+        match = Match.objects.get(pk=self.match.pk)
+        with self.assertNumQueries(1):
+            confirm_submitted_result(match, self.user2)
+
+
+class PlayerRatingTests(TestCase):
+    def setUp(self):
+        self.players = [
+            User.objects.create_user(
+                username=f"elo_player{i}", password="p", phone_number=f"+25{i}"
+            )
+            for i in range(3)
+        ]
+        self.game = Game.objects.create(name="Rated Game")
+        self.tournament = Tournament.objects.create(
+            name="Rated Tournament",
+            game=self.game,
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+        )
+
+    def _submitted_match(self, winner, loser, round=1):
+        return Match.objects.create(
+            tournament=self.tournament,
+            participant1_user=winner,
+            participant2_user=loser,
+            round=round,
+            status="pending_confirmation",
+            winner_user=winner,
+            result_submitted_by=winner,
+        )
+
+    def test_vectorized_replay_matches_sequential_updates(self):
+        winners = [0, 1, 2, 0, 3, 1, 0, 2]
+        losers = [1, 2, 3, 3, 0, 0, 2, 1]
+        ratings, games = replay_elo(winners, losers, 4)
+
+        expected = [1500.0] * 4
+        for winner, loser in zip(winners, losers):
+            expected[winner], expected[loser] = elo_update(expected[winner], expected[loser])
+        self.assertEqual([round(r, 6) for r in ratings], [round(r, 6) for r in expected])
+        self.assertEqual(games.tolist(), [5, 4, 4, 3])
+
+    def test_wide_history_is_replayed_in_waves(self):
+        rng = np.random.default_rng(0)
+        players = 2000
+        winners = rng.integers(0, players, 5000)
+        losers = (winners + rng.integers(1, players, 5000)) % players
+
+        with patch("tournaments.ratings._replay_waves", wraps=ratings_module._replay_waves) as waves:
+            ratings, _ = replay_elo(winners, losers, players)
+            self.assertTrue(waves.called)
+            replay_elo(winners[:50] % 40, (winners[:50] + 1) % 40, 40)
+            self.assertEqual(waves.call_count, 1)
+
+        expected = [1500.0] * players
+        for winner, loser in zip(winners.tolist(), losers.tolist()):
+            expected[winner], expected[loser] = elo_update(expected[winner], expected[loser])
+        self.assertTrue(np.allclose(ratings, expected))
+
+    def test_confirmation_updates_ratings_once(self):
+        match = self._submitted_match(self.players[0], self.players[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            confirm_submitted_result(match, self.players[1])
+
+        winner = PlayerRating.objects.get(user=self.players[0], game=self.game)
+        loser = PlayerRating.objects.get(user=self.players[1], game=self.game)
+        self.assertAlmostEqual(winner.rating, 1516.0)
+        self.assertAlmostEqual(loser.rating, 1484.0)
+
+        # A retried task must not rate the same result again.
+        self.assertIsNone(apply_match_ratings(match.id))
+        winner.refresh_from_db()
+        self.assertAlmostEqual(winner.rating, 1516.0)
+        self.assertEqual(winner.matches_played, 1)
+
+    def test_rebuild_replays_history_in_order(self):
+        for round, (winner, loser) in enumerate([(0, 1), (1, 2), (0, 2)], start=1):
+            match = self._submitted_match(self.players[winner], self.players[loser], round)
+            confirm_submitted_result(match, self.players[loser])
+
+        self.assertEqual(rebuild_ratings(self.game), 3)
+
+        expected = [1500.0] * 3
+        for winner, loser in [(0, 1), (1, 2), (0, 2)]:
+            expected[winner], expected[loser] = elo_update(expected[winner], expected[loser])
+        ratings = dict(
+            PlayerRating.objects.filter(game=self.game).values_list("user_id", "rating")
+        )
+        for player, rating in zip(self.players, expected):
+            self.assertAlmostEqual(ratings[player.id], rating)
+        self.assertFalse(Match.objects.filter(ratings_applied=False).exists())
+        # The rating task queued by the last confirmation finds it replayed.
+        self.assertIsNone(apply_match_ratings(match.id))
+        self.assertAlmostEqual(
+            PlayerRating.objects.get(user=self.players[0], game=self.game).rating, expected[0]
+        )
+
+
+    def test_rebuild_follows_the_order_results_were_rated(self):
+        # The round 2 result is rated before the round 1 result.
+        late = self._submitted_match(self.players[0], self.players[1], round=2)
+        early = self._submitted_match(self.players[1], self.players[2], round=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            confirm_submitted_result(late, self.players[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            confirm_submitted_result(early, self.players[2])
+        live = dict(PlayerRating.objects.filter(game=self.game).values_list("user_id", "rating"))
+
+        rebuild_ratings(self.game)
+
+        rebuilt = dict(PlayerRating.objects.filter(game=self.game).values_list("user_id", "rating"))
+        for user_id, rating in live.items():
+            self.assertAlmostEqual(rebuilt[user_id], rating)
+
+class SeededBracketTests(TestCase):
+    def setUp(self):
+        self.game = Game.objects.create(name="Seeded Game")
+        self.tournament = Tournament.objects.create(
+            name="Seeded Tournament",
+            game=self.game,
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            seeding="score",
+        )
+        # Registered in reverse so seeding cannot rely on insertion order.
+        self.seeds = [None] * 8
+        for seed in range(8, 0, -1):
+            user = User.objects.create_user(
+                username=f"seed{seed}",
+                password="p",
+                phone_number=f"+26{seed}",
+                score=100 - seed,
+            )
+            Participant.objects.create(user=user, tournament=self.tournament)
+            self.seeds[seed - 1] = user
+
+    def _pairings(self, round=1):
+        return [
+            (self.seeds.index(m.participant1_user) + 1, self.seeds.index(m.participant2_user) + 1)
+            for m in self.tournament.matches.filter(round=round).order_by("id")
+        ]
+
+    def test_bracket_order(self):
+        self.assertEqual(bracket_order(8), [1, 8, 4, 5, 2, 7, 3, 6])
+
+    def test_score_seeding_places_one_against_n(self):
+        generate_matches(self.tournament)
+        self.assertEqual(self._pairings(), [(1, 8), (4, 5), (2, 7), (3, 6)])
+
+    def test_rating_seeding_uses_game_rating(self):
+        self.tournament.seeding = "rating"
+        self.tournament.save()
+        # Reverse the order by rating; players without a rating start at 1500.
+        for seed, user in enumerate(self.seeds[:7], start=1):
+            PlayerRating.objects.create(user=user, game=self.game, rating=1400 + seed)
+
+        generate_matches(self.tournament)
+        # Unrated seed 8 (1500) is now the top seed, then 7, 6, ...
+        self.assertEqual(self._pairings(), [(8, 1), (5, 4), (7, 2), (6, 3)])
+
+    def test_team_rating_counts_unrated_members_at_default(self):
+        tournament = Tournament.objects.create(
+            name="Seeded Teams",
+            game=self.game,
+            type="team",
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            seeding="rating",
+        )
+        # One strong player and one unrated player average 1550, below a
+        # team of two 1560 players.
+        mixed = Team.objects.create(name="Mixed", captain=self.seeds[0])
+        mixed.members.add(self.seeds[0], self.seeds[1])
+        PlayerRating.objects.create(user=self.seeds[0], game=self.game, rating=1600)
+        steady = Team.objects.create(name="Steady", captain=self.seeds[2])
+        steady.members.add(self.seeds[2], self.seeds[3])
+        for user in self.seeds[2:4]:
+            PlayerRating.objects.create(user=user, game=self.game, rating=1560)
+        empty = Team.objects.create(name="Empty", captain=self.seeds[4])
+        tournament.teams.add(mixed, steady, empty)
+
+        self.assertEqual(get_seeded_entrants(tournament), [steady.id, mixed.id, empty.id])
+
+    def test_seeded_winners_keep_bracket_order(self):
+        generate_matches(self.tournament)
+        for match in self.tournament.matches.all():
+            match.winner_user = match.participant1_user
+            match.save()
+        advance_to_next_round(self.tournament, 1)
+        self.assertEqual(self._pairings(round=2), [(1, 4), (2, 3)])
+
+    def test_seeded_bracket_rejects_a_field_that_needs_byes(self):
+        Participant.objects.filter(tournament=self.tournament, user__in=self.seeds[6:]).delete()
+
+        with self.assertRaises(ApplicationError):
+            generate_matches(self.tournament)
+        self.assertFalse(self.tournament.matches.exists())
+
+
+class PrizePayoutTests(APITestCase):
+    def setUp(self):
+        self.game = Game.objects.create(name="Prize Game")
+        self.tournament = Tournament.objects.create(
+            name="Prize Tournament",
+            game=self.game,
+            start_date=timezone.now() - timedelta(days=2),
+            end_date=timezone.now() - timedelta(days=1),
+            is_free=False,
+            entry_fee=Decimal("10"),
+            prize_pool=Decimal("1000"),
+            winner_slots=3,
+            prize_distribution=[60, 30, 10],
+        )
+        self.players = []
+        for rank in range(1, 5):
+            user = User.objects.create_user(
+                username=f"prize{rank}", password="p", phone_number=f"+27{rank}"
+            )
+            Participant.objects.create(user=user, tournament=self.tournament, rank=rank)
+            self.players.append(user)
+
+    def test_split_prize_pool_adds_up_to_the_pool(self):
+        shares = split_prize_pool(Decimal("100"), [1, 1, 1])
+        self.assertEqual(shares, [Decimal("33.34"), Decimal("33.33"), Decimal("33.33")])
+
+    def test_pays_placements_by_distribution(self):
+        payout = pay_tournament_prizes(self.tournament)
+
+        self.assertEqual(payout.winners, 3)
+        prizes = dict(
+            Participant.objects.filter(tournament=self.tournament).values_list("user__username", "prize")
+        )
+        self.assertEqual(
+            prizes,
+            {"prize1": Decimal("600"), "prize2": Decimal("300"), "prize3": Decimal("100"), "prize4": None},
+        )
+        wallet = Wallet.objects.get(user=self.players[0])
+        self.assertEqual(wallet.withdrawable_balance, Decimal("600"))
+        self.assertEqual(
+            Transaction.objects.filter(
+                transaction_type=Transaction.TransactionType.PRIZE,
+                tournament=self.tournament,
+                game=self.game,
+            ).count(),
+            3,
+        )
+
+    def test_rerun_does_not_pay_twice(self):
+        first = pay_tournament_prizes(self.tournament)
+        second = pay_tournament_prizes(self.tournament)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(PrizePayout.objects.count(), 1)
+        self.assertEqual(
+            Transaction.objects.filter(transaction_type=Transaction.TransactionType.PRIZE).count(), 3
+        )
+        self.assertEqual(Wallet.objects.get(user=self.players[0]).total_balance, Decimal("600"))
+
+    def test_approvals_pay_the_field_once_every_submission_is_decided(self):
+        submissions = [
+            WinnerSubmission.objects.create(winner=player, tournament=self.tournament)
+            for player in self.players[:3]
+        ]
+        for submission in submissions[:2]:
+            approve_winner_submission_service(submission)
+        self.assertFalse(PrizePayout.objects.exists())
+
+        approve_winner_submission_service(submissions[2])
+
+        self.assertEqual(PrizePayout.objects.get(tournament=self.tournament).winners, 3)
+        self.assertEqual(
+            Transaction.objects.filter(transaction_type=Transaction.TransactionType.PRIZE).count(), 3
+        )
+        self.assertEqual(Wallet.objects.get(user=self.players[0]).total_balance, Decimal("600"))
+
+    def test_payout_error_is_raised_and_rolls_back_the_approval(self):
+        WinnerSubmission.objects.bulk_create(
+            WinnerSubmission(winner=player, tournament=self.tournament, status="approved")
+            for player in self.players[:2]
+        )
+        submission = WinnerSubmission.objects.create(winner=self.players[2], tournament=self.tournament)
+
+        with patch(
+            "tournaments.services.pay_tournament_prizes",
+            side_effect=ApplicationError("Failed to pay prizes."),
+        ):
+            with self.assertRaises(ApplicationError):
+                approve_winner_submission_service(submission)
+
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, "pending")
+
+    def test_pay_prizes_endpoint_is_admin_only(self):
+        url = f"/api/tournaments/tournaments/{self.tournament.slug}/pay-prizes/"
+        self.client.force_authenticate(user=self.players[0])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_superuser(
+            username="prizeadmin", password="p", phone_number="+2800"
+        )
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(url, {"distribution": [1, 1]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["winners"], 2)
+        self.assertEqual(
+            Participant.objects.get(user=self.players[1], tournament=self.tournament).prize,
+            Decimal("500"),
+        )
+
+
+class RefundEntryFeesTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Refund Tournament",
+            game=Game.objects.create(name="Refund Game"),
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            is_free=False,
+            entry_fee=Decimal("50"),
+        )
+        self.players = []
+        for i in range(5):
+            user = User.objects.create_user(
+                username=f"refund{i}", password="p", phone_number=f"+29{i}"
+            )
+            Participant.objects.create(user=user, tournament=self.tournament)
+            self.players.append(user)
+        self.cheater = self.players[0]
+
+    def test_refunds_everyone_but_the_cheater_in_chunks(self):
+        report = refund_entry_fees(self.tournament, self.cheater, chunk_size=2)
+
+        self.assertEqual(report["refunded"], 4)
+        self.assertEqual(report["amount"], "200")
+        self.assertEqual(report["failed"], [])
+        self.assertEqual(Wallet.objects.get(user=self.cheater).total_balance, 0)
+        self.assertEqual(Wallet.objects.get(user=self.players[1]).withdrawable_balance, Decimal("50"))
+        self.assertEqual(
+            EntryFeeRefund.objects.filter(tournament=self.tournament, status="refunded").count(), 4
+        )
+
+    def test_rerun_skips_players_already_refunded(self):
+        refund_entry_fees(self.tournament, self.cheater)
+        report = refund_entry_fees(self.tournament, self.cheater)
+
+        self.assertEqual(report["refunded"], 0)
+        self.assertEqual(report["already_refunded"], 4)
+        self.assertEqual(Wallet.objects.get(user=self.players[1]).total_balance, Decimal("50"))
+
+    def test_concurrent_runs_pay_each_player_once(self):
+        from . import services
+
+        real_refund_chunk = services._refund_chunk
+        interleaved = {}
+
+        def refund_chunk(tournament, user_ids, transaction_type):
+            # A second run (e.g. a retried task) refunds everyone after this
+            # run has read its pending players but before it credits them.
+            if not interleaved:
+                interleaved["report"] = None
+                interleaved["report"] = refund_entry_fees(self.tournament, self.cheater)
+            return real_refund_chunk(tournament, user_ids, transaction_type)
+
+        with patch("tournaments.services._refund_chunk", side_effect=refund_chunk):
+            report = refund_entry_fees(self.tournament, self.cheater)
+
+        self.assertEqual(interleaved["report"]["refunded"], 4)
+        self.assertEqual(report["refunded"], 0)
+        self.assertEqual(report["failed"], [])
+        for player in self.players[1:]:
+            self.assertEqual(Wallet.objects.get(user=player).total_balance, Decimal("50"))
+        self.assertEqual(
+            Transaction.objects.filter(tournament=self.tournament).count(), 4
+        )
+
+    def test_each_rejected_winner_stays_excluded(self):
+        first, second = (
+            WinnerSubmission.objects.create(winner=player, tournament=self.tournament)
+            for player in self.players[:2]
+        )
+        with patch(
+            "tournaments.tasks.refund_entry_fees_task.delay",
+            side_effect=lambda *args: refund_entry_fees_task.apply(args=args),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                reject_winner_submission_service(first)
+            self.assertEqual(Wallet.objects.get(user=self.players[2]).total_balance, Decimal("50"))
+
+            # The second run excludes only its own cheater; the first stays
+            # excluded through the forfeited marker.
+            with self.captureOnCommitCallbacks(execute=True):
+                reject_winner_submission_service(second)
+
+        self.assertEqual(Wallet.objects.get(user=self.players[0]).total_balance, 0)
+        self.assertEqual(
+            EntryFeeRefund.objects.get(tournament=self.tournament, user=self.players[0]).status,
+            "forfeited",
+        )
+        self.assertEqual(
+            Transaction.objects.filter(tournament=self.tournament).count(), 4
+        )
+
+    def test_failed_players_are_reported_and_retried(self):
+        Wallet.objects.filter(user=self.players[2]).delete()
+
+        report = refund_entry_fees(self.tournament, self.cheater, chunk_size=2)
+        self.assertEqual(report["refunded"], 3)
+        self.assertEqual(report["failed"], [{"user_id": self.players[2].id, "error": "Wallet not found."}])
+
+        Wallet.objects.create(user=self.players[2])
+        report = refund_entry_fees_task.apply(args=(self.tournament.id, self.cheater.id)).get()
+        self.assertEqual(report["refunded"], 1)
+        self.assertEqual(
+            EntryFeeRefund.objects.get(user=self.players[2]).status, "refunded"
+        )
+
+
+class BattleRoyaleResultsUploadTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="br_admin", password="p", phone_number="+221"
+        )
+        self.game = Game.objects.create(name="BR Game")
+        self.tournament = Tournament.objects.create(
+            name="BR Tournament",
+            game=self.game,
+            mode="battle_royale",
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            placement_points=[10, 6, 3],
+            kill_points=2,
+        )
+        self.players = []
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f"br_player{i}", password="p", phone_number=f"+22{i + 2}"
+            )
+            InGameID.objects.create(user=user, game=self.game, player_id=f"ign-{i}")
+            Participant.objects.create(user=user, tournament=self.tournament)
+            self.players.append(user)
+        self.url = f"/api/tournaments/tournaments/{self.tournament.slug}/upload-results/"
+        self.client.force_authenticate(user=self.admin)
+
+    def test_invalid_placement_points_are_rejected(self):
+        url = f"/api/tournaments/tournaments/{self.tournament.slug}/"
+        for points in ([10, -3], ["10"], "10,6,3"):
+            response = self.client.patch(url, {"placement_points": points}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.placement_points, [10, 6, 3])
+
+    def test_json_upload_scores_and_ranks_players(self):
+        results = [
+            {"user_id": self.players[0].id, "placement": 2, "kills": 5},
+            {"user_id": self.players[1].id, "placement": 1, "kills": 0},
+            {"user_id": self.players[2].id, "placement": 3, "kills": 1},
+        ]
+        response = self.client.post(self.url, {"results": results}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["ingested"], 3)
+        scores = dict(
+            Scoring.objects.filter(tournament=self.tournament).values_list("user_id", "score")
+        )
+        self.assertEqual(scores[self.players[0].id], 16)
+        self.assertEqual(scores[self.players[1].id], 10)
+        self.assertEqual(scores[self.players[2].id], 5)
+        ranks = dict(
+            Participant.objects.filter(tournament=self.tournament).values_list("user_id", "rank")
+        )
+        self.assertEqual(ranks[self.players[0].id], 1)
+        self.assertEqual(ranks[self.players[1].id], 2)
+        self.assertEqual(ranks[self.players[2].id], 3)
+
+    def test_csv_upload_by_in_game_id_replaces_previous_scores(self):
+        Scoring.objects.create(tournament=self.tournament, user=self.players[0], score=99)
+        csv_file = SimpleUploadedFile(
+            "results.csv",
+            b"player_id,placement,kills\nign-0,3,0\nign-1,1,4\n",
+            content_type="text/csv",
+        )
+        response = self.client.post(self.url, {"file": csv_file}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            Scoring.objects.get(tournament=self.tournament, user=self.players[0]).score, 3
+        )
+        self.assertEqual(
+            Scoring.objects.get(tournament=self.tournament, user=self.players[1]).score, 18
+        )
+
+    def test_unregistered_player_rejects_whole_upload(self):
+        outsider = User.objects.create_user(
+            username="br_outsider", password="p", phone_number="+229"
+        )
+        results = [
+            {"user_id": self.players[0].id, "placement": 1, "kills": 0},
+            {"user_id": outsider.id, "placement": 2, "kills": 0},
+        ]
+        response = self.client.post(self.url, {"results": results}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Scoring.objects.filter(tournament=self.tournament).exists())
+
+    def test_non_admin_cannot_upload(self):
+        self.client.force_authenticate(user=self.players[0])
+        response = self.client.post(
+            self.url,
+            {"results": [{"user_id": self.players[0].id, "placement": 1}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LobbyShardingTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="lobby_admin", password="p", phone_number="+331"
+        )
+        self.game = Game.objects.create(name="Lobby Game")
+        self.tournament = Tournament.objects.create(
+            name="Lobby Tournament",
+            game=self.game,
+            mode="battle_royale",
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            max_participants=100,
+        )
+        self.players = []
+        for i in range(10):
+            user = User.objects.create_user(
+                username=f"lobby_player{i}",
+                password="p",
+                phone_number=f"+34{i}",
+                score=100 - i,
+            )
+            Participant.objects.create(user=user, tournament=self.tournament)
+            self.players.append(user)
+        self.base_url = f"/api/tournaments/tournaments/{self.tournament.slug}"
+        self.client.force_authenticate(user=self.admin)
+
+    def test_allocation_snake_drafts_players_by_score(self):
+        response = self.client.post(
+            f"{self.base_url}/allocate-lobbies/", {"lobby_size": 4}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"stage": 1, "lobbies": 3})
+        seats = dict(
+            Participant.objects.filter(tournament=self.tournament).values_list(
+                "user_id", "lobby__number"
+            )
+        )
+        expected = [1, 2, 3, 3, 2, 1, 1, 2, 3, 3]
+        self.assertEqual([seats[p.id] for p in self.players], expected)
+
+    def test_advance_keeps_top_k_of_each_lobby(self):
+        lobbies = allocate_lobbies(self.tournament, lobby_size=5)
+        for position, user in enumerate(self.players):
+            lobby_id = Participant.objects.get(user=user, tournament=self.tournament).lobby_id
+            Scoring.objects.create(
+                tournament=self.tournament,
+                user=user,
+                lobby_id=lobby_id,
+                score=position,
+            )
+
+        response = self.client.post(
+            f"{self.base_url}/advance-lobbies/", {"top_k": 2}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"stage": 1, "advanced": 4, "eliminated": 6})
+        survivors = set(
+            Participant.objects.filter(tournament=self.tournament)
+            .exclude(status="eliminated")
+            .values_list("user_id", flat=True)
+        )
+        self.assertEqual(survivors, {p.id for p in self.players[6:]})
+        self.assertFalse(Lobby.objects.filter(id__in=[lobby.id for lobby in lobbies], is_finished=False).exists())
+
+        next_stage = allocate_lobbies(self.tournament, lobby_size=5)
+        self.assertEqual(len(next_stage), 1)
+        self.assertEqual(next_stage[0].stage, 2)
+        self.assertEqual(next_stage[0].participants.count(), 4)
+
+    def test_later_stage_results_keep_earlier_scores(self):
+        allocate_lobbies(self.tournament, lobby_size=5)
+        ingest_battle_royale_results(
+            self.tournament,
+            [{"user_id": user.id, "placement": i + 1, "kills": 0} for i, user in enumerate(self.players)],
+        )
+        advance_lobby_winners(self.tournament, top_k=2)
+        allocate_lobbies(self.tournament, lobby_size=5)
+        finalists = self.players[:4]
+        ingest_battle_royale_results(
+            self.tournament,
+            [{"user_id": user.id, "placement": 4 - i, "kills": 0} for i, user in enumerate(finalists)],
+        )
+
+        self.assertEqual(Scoring.objects.filter(tournament=self.tournament, stage=1).count(), 10)
+        self.assertEqual(Scoring.objects.filter(tournament=self.tournament, stage=2).count(), 4)
+        ranks = dict(
+            Participant.objects.filter(tournament=self.tournament).values_list("user_id", "rank")
+        )
+        # Finalists rank by their stage 2 result, ahead of everyone eliminated.
+        self.assertEqual([ranks[user.id] for user in finalists], [4, 3, 2, 1])
+        self.assertEqual(sorted(ranks[user.id] for user in self.players[4:]), [5, 6, 7, 8, 9, 10])
+
+    def test_cannot_allocate_while_stage_is_open(self):
+        allocate_lobbies(self.tournament, lobby_size=5)
+
+        with self.assertRaises(ApplicationError):
+            allocate_lobbies(self.tournament, lobby_size=5)
+
+    def test_lobby_list_reports_aggregates(self):
+        allocate_lobbies(self.tournament, lobby_size=5)
+
+        response = self.client.get(
+            "/api/tournaments/lobbies/", {"tournament": self.tournament.id}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [row["player_count"] for row in response.data["results"]], [5, 5]
+        )
+
+
 class ReportViewSetTests(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -4,8 +4,10 @@ from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import (
+    Avg,
     Case,
     CharField,
+    Count,
     F,
     OuterRef,
     Prefetch,
@@ -24,7 +26,7 @@ from rest_framework import generics, status, viewsets
 from rest_framework.generics import get_object_or_404
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
@@ -33,26 +35,32 @@ from rest_framework.views import APIView
 from notifications.tasks import send_tournament_credentials
 from teams.models import Team
 from teams.serializers import TeamSerializer
-from users.models import User
 from users.permissions import IsOwnerOrAdmin
 from wallet.models import Transaction
 
-from .exceptions import ApplicationError
+from .exceptions import ApplicationError, MatchTransitionConflict
 from .api_mixins import DynamicFieldsMixin
 from .filters import TournamentFilter
-from .models import (Game, GameImage, Match, Participant, Report, Scoring,
+from .models import (Game, GameImage, Lobby, Match, Participant, Report, Scoring,
                      Tournament, TournamentColor, TournamentImage,
                      WinnerSubmission)
 from .permissions import (IsGameManagerOrAdmin, IsTournamentCreatorOrAdmin,
                           IsMatchParticipant)
 from .serializers import (
+    BattleRoyaleResultsUploadSerializer,
     GameCreateUpdateSerializer,
     GameImageSerializer,
     GameReadOnlySerializer,
+    LobbyAdvanceSerializer,
+    LobbyAllocationSerializer,
+    LobbyParticipantSerializer,
+    LobbySerializer,
     MatchCreateSerializer,
     MatchReadOnlySerializer,
     MatchUpdateSerializer,
     ParticipantSerializer,
+    PrizePayoutRequestSerializer,
+    PrizePayoutSerializer,
     ReportSerializer,
     ScoringSerializer,
     MatchSubmitResultSerializer,
@@ -67,11 +75,15 @@ from .serializers import (
     TotalPrizeMoneySerializer,
     TotalTournamentsSerializer,
 )
-from .services import (approve_winner_submission_service, confirm_match_result,
-                       create_report_service, create_winner_submission_service,
-                       dispute_match_result, generate_matches, join_tournament,
-                       reject_report_service, reject_winner_submission_service,
-                       resolve_report_service)
+from .services import (advance_lobby_winners, allocate_lobbies,
+                       approve_winner_submission_service, confirm_match_result,
+                       confirm_submitted_result, create_report_service,
+                       create_winner_submission_service, dispute_match_result,
+                       dispute_submitted_result, generate_matches,
+                       ingest_battle_royale_results, join_tournament,
+                       pay_tournament_prizes, reject_report_service,
+                       reject_winner_submission_service, resolve_report_service,
+                       submit_match_result)
 from .tasks import generate_matches_task, approve_winner_submission_task
 from common.throttles import (
     VeryStrictThrottle,
@@ -259,8 +271,13 @@ class TournamentViewSet(DynamicFieldsMixin, viewsets.ModelViewSet):
             "destroy",
             "generate_matches",
             "start_countdown",
+            "upload_results",
+            "allocate_lobbies",
+            "advance_lobbies",
         ]:
             return [IsGameManagerOrAdmin()]
+        if self.action == "pay_prizes":
+            return [IsAdminUser()]
         return [IsAuthenticated()]
 
     def perform_create(self, serializer):
@@ -326,6 +343,132 @@ class TournamentViewSet(DynamicFieldsMixin, viewsets.ModelViewSet):
         )
         return Response({"message": _("Countdown started.")})
 
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="upload-results",
+        parser_classes=[JSONParser, MultiPartParser, FormParser],
+    )
+    def upload_results(self, request, slug=None):
+        """
+        Upload placements and kills for a battle royale lobby as JSON or CSV.
+        """
+        tournament = self.get_object()
+        serializer = BattleRoyaleResultsUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = ingest_battle_royale_results(
+                tournament, serializer.validated_data["results"]
+            )
+        except ApplicationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    @action(detail=True, methods=["post"], url_path="allocate-lobbies")
+    def allocate_lobbies(self, request, slug=None):
+        """
+        Split the remaining battle royale entrants into lobbies for the next stage.
+        """
+        tournament = self.get_object()
+        serializer = LobbyAllocationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            lobbies = allocate_lobbies(
+                tournament, serializer.validated_data["lobby_size"]
+            )
+        except ApplicationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {"stage": lobbies[0].stage, "lobbies": len(lobbies)},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=True, methods=["post"], url_path="advance-lobbies")
+    def advance_lobbies(self, request, slug=None):
+        """
+        Advance the top K players of every lobby in the current stage.
+        """
+        tournament = self.get_object()
+        serializer = LobbyAdvanceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = advance_lobby_winners(
+                tournament, serializer.validated_data["top_k"]
+            )
+        except ApplicationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    @action(detail=True, methods=["post"], url_path="pay-prizes")
+    def pay_prizes(self, request, slug=None):
+        """
+        Split the prize pool across the winners and pay them in one batch.
+        Repeated calls return the original payout.
+        """
+        # Prizes are paid once the tournament has finished, which the default
+        # status filter hides, so the lookup skips filter_queryset.
+        filters = Q(slug=slug)
+        if str(slug).isdigit():
+            filters |= Q(pk=slug)
+        tournament = get_object_or_404(Tournament, filters)
+        self.check_object_permissions(request, tournament)
+        serializer = PrizePayoutRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            payout = pay_tournament_prizes(
+                tournament, serializer.validated_data.get("distribution")
+            )
+        except ApplicationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if payout is None:
+            return Response(
+                {"error": "This tournament has no prize pool."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(PrizePayoutSerializer(payout).data)
+
+
+class LobbyViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only admin view over battle royale lobbies and their aggregates.
+    """
+
+    serializer_class = LobbySerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["tournament", "stage", "is_finished"]
+
+    def get_queryset(self):
+        top_score = (
+            Scoring.objects.filter(lobby=OuterRef("pk"))
+            .order_by("-score")
+            .values("score")[:1]
+        )
+        return Lobby.objects.annotate(
+            player_count=Count("participants"),
+            average_user_score=Avg("participants__user__score"),
+            top_score=Subquery(top_score),
+        ).order_by("tournament_id", "stage", "number")
+
+    @action(detail=True, methods=["get"])
+    def participants(self, request, pk=None):
+        """
+        List the lobby's players ordered by the score they earned in it.
+        """
+        lobby = self.get_object()
+        lobby_score = Scoring.objects.filter(
+            lobby=lobby, user_id=OuterRef("user_id")
+        ).values("score")[:1]
+        queryset = (
+            lobby.participants.select_related("user")
+            .annotate(lobby_score=Coalesce(Subquery(lobby_score), Value(0)))
+            .order_by("-lobby_score", "id")
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = LobbyParticipantSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
 
 class MatchViewSet(viewsets.ModelViewSet):
     """
@@ -376,43 +519,23 @@ class MatchViewSet(viewsets.ModelViewSet):
         Submit the result of a match by one of its participants.
         """
         match = self.get_object()
-        user = request.user
-
-        if match.status != "ongoing":
-            return Response({"error": _("This match is not in 'ongoing' status.")}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = MatchSubmitResultSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        if match.result_submitted_by is not None:
-            return Response({"error": _("The result of this match has already been submitted.")}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            submit_match_result(
+                match,
+                request.user,
+                winner_id=serializer.validated_data['winner_id'],
+                result_proof=serializer.validated_data['result_proof'],
+            )
+        except MatchTransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except ApplicationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = MatchSubmitResultSerializer(data=request.data)
-        if serializer.is_valid():
-            winner_id = serializer.validated_data['winner_id']
-            result_proof = serializer.validated_data['result_proof']
-
-            if match.match_type == 'individual':
-                if winner_id not in [match.participant1_user_id, match.participant2_user_id]:
-                     return Response({"error": _("Invalid winner ID.")}, status=status.HTTP_400_BAD_REQUEST)
-                try:
-                    winner_user = User.objects.get(id=winner_id)
-                    match.winner_user = winner_user
-                except User.DoesNotExist:
-                    return Response({"error": _("Winner user not found.")}, status=status.HTTP_404_NOT_FOUND)
-            else:
-                if winner_id not in [match.participant1_team_id, match.participant2_team_id]:
-                     return Response({"error": _("Invalid winner team ID.")}, status=status.HTTP_400_BAD_REQUEST)
-                try:
-                    winner_team = Team.objects.get(id=winner_id)
-                    match.winner_team = winner_team
-                except Team.DoesNotExist:
-                    return Response({"error": _("Winner team not found.")}, status=status.HTTP_404_NOT_FOUND)
-
-            match.result_proof = result_proof
-            match.result_submitted_by = user
-            match.status = "pending_confirmation"
-            match.save()
-
-            return Response(MatchReadOnlySerializer(match, context={'request': request}).data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(MatchReadOnlySerializer(match, context={'request': request}).data)
 
     @action(detail=True, methods=["post"], permission_classes=[IsMatchParticipant])
     def confirm_result(self, request, pk=None):
@@ -420,17 +543,12 @@ class MatchViewSet(viewsets.ModelViewSet):
         Confirm the match result submitted by the other participant.
         """
         match = self.get_object()
-        user = request.user
-
-        if match.status != "pending_confirmation":
-            return Response({"error": _("This match is not in 'pending confirmation' status.")}, status=status.HTTP_400_BAD_REQUEST)
-
-        if match.result_submitted_by == user:
-            return Response({"error": _("You cannot confirm a result you submitted.")}, status=status.HTTP_400_BAD_REQUEST)
-
-        match.is_confirmed = True
-        match.status = "completed"
-        match.save()
+        try:
+            confirm_submitted_result(match, request.user)
+        except MatchTransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except ApplicationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(MatchReadOnlySerializer(match, context={'request': request}).data)
 
@@ -440,22 +558,12 @@ class MatchViewSet(viewsets.ModelViewSet):
         Dispute the match result submitted by the other participant.
         """
         match = self.get_object()
-        user = request.user
-        reason = request.data.get("reason")
-
-        if not reason:
-            return Response({"error": _("Reason for dispute must be provided.")}, status=status.HTTP_400_BAD_REQUEST)
-
-        if match.status != "pending_confirmation":
-            return Response({"error": _("This match is not in 'pending confirmation' status.")}, status=status.HTTP_400_BAD_REQUEST)
-
-        if match.result_submitted_by == user:
-            return Response({"error": _("You cannot dispute a result you submitted.")}, status=status.HTTP_400_BAD_REQUEST)
-
-        match.is_disputed = True
-        match.status = "disputed"
-        match.dispute_reason = reason
-        match.save()
+        try:
+            dispute_submitted_result(match, request.user, request.data.get("reason"))
+        except MatchTransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except ApplicationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(MatchReadOnlySerializer(match, context={'request': request}).data)
 
@@ -4,6 +4,7 @@ from django.dispatch import receiver
 import shortuuid
 
 from users.models import User, Role
+from wallet.ledger import post_opening_balance
 from wallet.models import Transaction, Wallet
 
 
@@ -16,7 +17,8 @@ def user_post_save(sender, instance, created, **kwargs):
     """
     if created:
         # Create a wallet for the new user with an initial token balance
-        Wallet.objects.create(user=instance, token_balance=1000)
+        wallet = Wallet.objects.create(user=instance, token_balance=1000)
+        post_opening_balance(wallet)
 
         # Assign default role
         default_role = Role.get_default_role()
@@ -44,6 +46,17 @@ def user_post_delete(sender, instance, **kwargs):
     cache.delete("top_players:rank")
 
 
+def invalidate_transaction_cache(user_ids, prize=False):
+    """
+    Invalidates the dashboards of ``user_ids`` and, for prize transactions,
+    the prize rankings and totals. Also called after bulk writes of
+    transactions, which send no post_save signals.
+    """
+    cache.delete_many([f"dashboard:user:{user_id}" for user_id in user_ids])
+    if prize:
+        cache.delete_many(["top_players:prize", "stats:total_prize_money"])
+
+
 @receiver(post_save, sender=Transaction)
 @receiver(post_delete, sender=Transaction)
 def invalidate_transaction_related_cache(sender, instance, **kwargs):
@@ -51,10 +64,8 @@ def invalidate_transaction_related_cache(sender, instance, **kwargs):
     Invalidates cache related to transactions, especially prizes.
     """
     # Invalidate dashboard of the user associated with the transaction's wallet
-    if instance.wallet and hasattr(instance.wallet, 'user'):
-        cache.delete(f"dashboard:user:{instance.wallet.user.id}")
-
+    user_ids = [instance.wallet.user_id] if instance.wallet else []
     # If a prize transaction is updated, invalidate top players and total prize money stats
-    if instance.transaction_type == Transaction.TransactionType.PRIZE:
-        cache.delete("top_players:prize")
-        cache.delete("stats:total_prize_money")
+    invalidate_transaction_cache(
+        user_ids, prize=instance.transaction_type == Transaction.TransactionType.PRIZE
+    )
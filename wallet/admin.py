@@ -10,7 +10,7 @@ from import_export import resources
 from django_select2.forms import Select2Widget
 
 # Local Imports
-from .models import Transaction, Wallet, WithdrawalRequest
+from .models import Transaction, Wallet, WithdrawalBatch, WithdrawalRequest
 
 # --- Resources for django-import-export ---
 
@@ -88,3 +88,18 @@ class WithdrawalRequestAdmin(ImportExportModelAdmin, SimpleHistoryAdmin, ModelAd
     @admin.display(description="شماره شبا")
     def sheba_number(self, obj):
         return getattr(obj.user.wallet, "sheba_number", None)
+
+
+@admin.register(WithdrawalBatch)
+class WithdrawalBatchAdmin(ModelAdmin):
+    list_display = ("id", "action", "request_count", "total_amount", "created_by", "created_at")
+    list_filter = ("action",)
+    readonly_fields = (
+        "action",
+        "created_by",
+        "request_count",
+        "total_amount",
+        "file_name",
+        "checksum",
+        "created_at",
+    )
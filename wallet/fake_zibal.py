@@ -0,0 +1,137 @@
+"""
+A local stand-in for the Zibal gateway and API used by tests and benchmarks.
+
+It speaks the subset of the protocol ZibalService uses (``/v1/request``,
+``/v1/verify``, ``/v1/inquiry`` and ``/v1/refund``). Payments start in
+Zibal's "awaiting payment" status (-1); set ``payments[track_id]["status"]``
+to simulate the user paying (2) or cancelling (3).
+
+The server can inject latency and failures so timeouts, retries and the
+circuit breaker can be exercised without network access. Point ``ZIBAL_API_BASE_URL`` and ``ZIBAL_GATEWAY_BASE_URL`` at
+``server.base_url``.
+"""
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeZibalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer headers and body into one write; separate small writes on a
+    # keep-alive socket stall on delayed ACKs.
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        fake = self.server.fake
+        with fake._lock:
+            fake.connections.add(self.client_address)
+        status, response = fake.handle(self.path, body, self.headers)
+        self._reply(status, response)
+
+
+class FakeZibalServer:
+    """
+    Threaded fake Zibal server. Use as a context manager or call ``start`` and
+    ``stop``. ``latency`` delays every response, ``fail_next`` makes the next
+    N requests answer 503 and ``failure_rate`` fails requests at random.
+    ``connections`` collects the client addresses seen, which shows whether
+    callers reuse keep-alive connections.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_next = 0
+        self.requests = []
+        self.connections = set()
+        self.payments = {}
+        self._track_ids = itertools.count(100000)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), FakeZibalHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, path, body, headers):
+        with self._lock:
+            self.requests.append(path)
+            failing = self.fail_next > 0 or random.random() < self.failure_rate
+            if self.fail_next > 0:
+                self.fail_next -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            return 503, {"result": 503, "message": "Service Unavailable"}
+
+        if path.endswith("/request"):
+            track_id = next(self._track_ids)
+            with self._lock:
+                self.payments[track_id] = {"amount": body.get("amount"), "status": -1}
+            return 200, {"result": 100, "trackId": track_id, "message": "success"}
+        if path.endswith("/verify"):
+            # Checking and marking the payment is one step, so concurrent
+            # verifies of a payment see exactly one success.
+            with self._lock:
+                payment = self.payments.get(body.get("trackId"))
+                if payment is None or payment["amount"] != body.get("amount"):
+                    return 200, {"result": 202, "message": "Order not found or not paid"}
+                if payment["status"] == 1:
+                    return 200, {"result": 201, "message": "Already verified"}
+                payment["status"] = 1
+            return 200, {
+                "result": 100,
+                "amount": payment["amount"],
+                "refNumber": body.get("trackId"),
+                "message": "success",
+            }
+        if path.endswith("/inquiry"):
+            with self._lock:
+                payment = dict(self.payments.get(body.get("trackId")) or {})
+            if not payment:
+                return 200, {"result": 203, "message": "Invalid trackId"}
+            return 200, {
+                "result": 100,
+                "status": payment["status"],
+                "amount": payment["amount"],
+                "refNumber": body.get("trackId") if payment["status"] == 1 else None,
+                "message": "success",
+            }
+        if path.endswith("/refund"):
+            return 200, {"result": 1, "message": "success"}
+        return 404, {"message": "Not found"}
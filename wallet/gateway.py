@@ -0,0 +1,149 @@
+"""
+HTTP plumbing for the Zibal gateway: a pooled keep-alive session per process,
+bounded retries with jittered backoff, a circuit breaker and a rate limiter.
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Gateway responses that mean "try again later" rather than "request rejected".
+RETRYABLE_STATUS_CODES = frozenset({502, 503, 504})
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=20):
+    """
+    Returns the process-wide keep-alive session. Forked workers (gunicorn,
+    Celery prefork) get their own session instead of sharing the parent's
+    sockets.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session, _session_pid = session, pid
+    return _session
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the gateway while the circuit is open."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails fast after ``failure_threshold`` consecutive failures. Once
+    ``reset_timeout`` seconds have passed a single trial call is let through;
+    its success closes the circuit and its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._clock() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                raise CircuitOpenError("Zibal circuit is open.")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Zibal circuit opened after %s failures.", self._failures)
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+def backoff_delay(attempt, base=0.2, cap=2.0):
+    """Full-jitter exponential backoff: a random delay up to ``base * 2**attempt``."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def send(method, url, breaker, timeout, retries=0, sleep=time.sleep, **kwargs):
+    """
+    Sends a request through the shared session guarded by ``breaker``.
+
+    Connection errors, timeouts and 502/503/504 responses are retried up to
+    ``retries`` times; pass ``retries=0`` for calls that must not be repeated.
+    Returns the response for any other status and leaves raising to the caller.
+    Only responses below 500 count as a success for the breaker.
+    """
+    breaker.before_call()
+    recorded = False
+    try:
+        for attempt in range(retries + 1):
+            try:
+                response = get_session().request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == retries:
+                    raise
+            else:
+                if response.status_code < 500:
+                    breaker.record_success()
+                    recorded = True
+                    return response
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == retries:
+                    return response
+            sleep(backoff_delay(attempt))
+    finally:
+        # Any other outcome, including errors raised by requests or by the
+        # backoff, counts as a failure so a half-open trial is always settled.
+        if not recorded:
+            breaker.record_failure()
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls at most ``rate`` per second across
+    all threads sharing it.
+    """
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            self._sleep(slot - now)
@@ -0,0 +1,119 @@
+"""
+Idempotency-Key support for wallet and payment endpoints.
+
+A client that may retry a mutating request sends a unique
+``Idempotency-Key`` header. The first request with a key claims a row in
+IdempotencyKey and runs; its response is stored there and in the cache.
+Later requests with the same key get that response back, with an
+``Idempotent-Replayed`` header, without running the view again or locking any
+wallet. Reusing a key with a different payload is rejected.
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(data):
+    """A stable hash of the request payload."""
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache_key(user_id, scope, key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f"wallet:idempotency:{user_id}:{scope}:{digest}"
+
+
+def _replay(stored, fingerprint):
+    if stored["request_hash"] != fingerprint:
+        return Response(
+            {"detail": "این کلید یکتایی قبلا برای درخواست دیگری استفاده شده است."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(stored["body"], status=stored["status_code"])
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotent(scope):
+    """
+    Makes a DRF view method honour the ``Idempotency-Key`` header. Requests
+    without the header run as before. Responses of 5xx and raised errors are
+    not stored, so the client can retry them with the same key.
+    """
+
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > 255:
+                raise ValidationError({IDEMPOTENCY_HEADER: "کلید یکتایی حداکثر ۲۵۵ کاراکتر است."})
+
+            fingerprint = request_fingerprint(request.data)
+            cache_key = _cache_key(request.user.pk, scope, key)
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, scope=scope, key=key, request_hash=fingerprint
+                    )
+            except IntegrityError:
+                record = IdempotencyKey.objects.get(user=request.user, scope=scope, key=key)
+                if (
+                    record.status == IdempotencyKey.Status.IN_PROGRESS
+                    and record.request_hash == fingerprint
+                ):
+                    return Response(
+                        {"detail": "درخواستی با این کلید یکتایی در حال پردازش است."},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return _replay(
+                    {
+                        "request_hash": record.request_hash,
+                        "status_code": record.response_code,
+                        "body": record.response_body,
+                    },
+                    fingerprint,
+                )
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except Exception:
+                record.delete()
+                raise
+            if response.status_code >= 500:
+                record.delete()
+                return response
+
+            stored = {
+                "request_hash": fingerprint,
+                "status_code": response.status_code,
+                "body": json.loads(json.dumps(response.data, default=str)),
+            }
+            record.status = IdempotencyKey.Status.COMPLETED
+            record.response_code = stored["status_code"]
+            record.response_body = stored["body"]
+            record.save(update_fields=["status", "response_code", "response_body"])
+            cache.set(cache_key, stored, timeout=settings.IDEMPOTENCY_KEY_TTL_HOURS * 3600)
+            return response
+
+        return wrapper
+
+    return decorator
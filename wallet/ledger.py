@@ -0,0 +1,254 @@
+"""
+Append-only double-entry ledger for wallet balances.
+
+Every balance change is posted as a LedgerEntry whose lines sum to zero: the
+user's bucket on one side and a system account (gateway, platform or token
+issuer) or another of the user's buckets on the other. The Wallet columns
+map onto the buckets as
+
+    withdrawable_balance = withdrawable
+    total_balance        = withdrawable + non_withdrawable
+    token_balance        = token
+
+Balances are read as the latest LedgerSnapshot plus the lines written after
+it, so a lookup only touches recent lines.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from . import summaries
+from .models import LedgerEntry, LedgerLine, LedgerSnapshot, Transaction
+
+Bucket = LedgerLine.Bucket
+
+# System account on the other side of each transaction type.
+COUNTER_ACCOUNTS = {
+    Transaction.TransactionType.DEPOSIT: Bucket.GATEWAY,
+    Transaction.TransactionType.WITHDRAWAL: Bucket.GATEWAY,
+    Transaction.TransactionType.ENTRY_FEE: Bucket.PLATFORM,
+    Transaction.TransactionType.PRIZE: Bucket.PLATFORM,
+    Transaction.TransactionType.TOKEN_SPENT: Bucket.TOKEN_ISSUER,
+    Transaction.TransactionType.TOKEN_EARNED: Bucket.TOKEN_ISSUER,
+}
+# Entry fee refunds are stored as deposits attributed to a tournament. The
+# platform that took the fee pays them back, so they are posted against it
+# under their own kind and the gateway account keeps matching Zibal.
+REFUND_KIND = "entry_fee_refund"
+
+# Lines younger than this are left out of snapshots so that transactions
+# still in flight when the cut is taken cannot commit below it.
+SNAPSHOT_LAG = timedelta(minutes=5)
+
+
+def post_entry(kind, legs, transaction=None, withdrawal_request=None, description=""):
+    """
+    Writes one balanced entry. ``legs`` is a list of ``(wallet_id, bucket,
+    amount)`` with ``wallet_id`` None for system accounts.
+    """
+    return post_entries([(kind, legs, transaction, withdrawal_request, description)])[0]
+
+
+def post_entries(entries):
+    """
+    Bulk version of ``post_entry`` taking a list of its argument tuples. The
+    entries' transactions are also added to the monthly wallet summaries.
+    """
+    for kind, legs, *_ in entries:
+        if sum(amount for _, _, amount in legs) != 0:
+            raise ValueError(f"Unbalanced ledger entry '{kind}'.")
+
+    created = LedgerEntry.objects.bulk_create(
+        [
+            LedgerEntry(
+                kind=kind,
+                transaction=tx,
+                withdrawal_request=withdrawal_request,
+                description=description[:255],
+            )
+            for kind, _, tx, withdrawal_request, description in entries
+        ]
+    )
+    LedgerLine.objects.bulk_create(
+        [
+            LedgerLine(entry=entry, wallet_id=wallet_id, bucket=bucket, amount=amount)
+            for entry, (_, legs, *_) in zip(created, entries)
+            for wallet_id, bucket, amount in legs
+            if amount
+        ],
+        batch_size=1000,
+    )
+    summaries.record_transactions(tx for _, _, tx, *_ in entries if tx is not None)
+    return created
+
+
+def _is_refund(tx, transaction_type):
+    return transaction_type == Transaction.TransactionType.DEPOSIT and tx.tournament_id is not None
+
+
+def entry_kind(tx, transaction_type=None):
+    """The LedgerEntry kind of a Transaction: its type, or REFUND_KIND."""
+    transaction_type = transaction_type or tx.transaction_type
+    return REFUND_KIND if _is_refund(tx, transaction_type) else transaction_type
+
+
+def transaction_legs(tx, transaction_type=None):
+    """
+    Ledger legs for a successful Transaction, mirroring how
+    ``WalletService.process_transaction`` moves the Wallet columns.
+    ``transaction_type`` overrides the row's type for callers that know it.
+    """
+    transaction_type = transaction_type or tx.transaction_type
+    if _is_refund(tx, transaction_type):
+        counter = Bucket.PLATFORM
+    else:
+        counter = COUNTER_ACCOUNTS[transaction_type]
+    is_token = "token" in transaction_type
+    is_debit = transaction_type in (
+        Transaction.TransactionType.WITHDRAWAL,
+        Transaction.TransactionType.ENTRY_FEE,
+        Transaction.TransactionType.TOKEN_SPENT,
+    )
+    if is_token:
+        bucket = Bucket.TOKEN
+    elif is_debit or transaction_type in (
+        Transaction.TransactionType.DEPOSIT,
+        Transaction.TransactionType.PRIZE,
+    ):
+        bucket = Bucket.WITHDRAWABLE
+    else:
+        bucket = Bucket.NON_WITHDRAWABLE
+    amount = -tx.amount if is_debit else tx.amount
+    return [(tx.wallet_id, bucket, amount), (None, counter, -amount)]
+
+
+def post_transaction(tx, transaction_type=None):
+    transaction_type = transaction_type or tx.transaction_type
+    return post_entry(
+        entry_kind(tx, transaction_type), transaction_legs(tx, transaction_type), transaction=tx
+    )
+
+
+def post_transactions(txs):
+    return post_entries(
+        [(entry_kind(tx), transaction_legs(tx), tx, None, "") for tx in txs]
+    )
+
+
+def post_opening_balance(wallet, description="Opening balance"):
+    """Records a wallet's current columns as funded by the system accounts."""
+    non_withdrawable = wallet.total_balance - wallet.withdrawable_balance
+    legs = [
+        (wallet.id, Bucket.WITHDRAWABLE, wallet.withdrawable_balance),
+        (None, Bucket.GATEWAY, -wallet.withdrawable_balance),
+        (wallet.id, Bucket.NON_WITHDRAWABLE, non_withdrawable),
+        (None, Bucket.PLATFORM, -non_withdrawable),
+        (wallet.id, Bucket.TOKEN, wallet.token_balance),
+        (None, Bucket.TOKEN_ISSUER, -wallet.token_balance),
+    ]
+    if not any(amount for _, _, amount in legs):
+        return None
+    return post_entry("opening", legs, description=description)
+
+
+def ledger_balances(wallet_ids):
+    """
+    Returns ``{wallet_id: {bucket: balance}}`` for the given wallets, reading
+    each account's latest snapshot and summing only the lines after it.
+    """
+    wallet_ids = list(wallet_ids)
+    balances = defaultdict(lambda: defaultdict(Decimal))
+    cuts = {}
+    snapshots = (
+        LedgerSnapshot.objects.filter(wallet_id__in=wallet_ids)
+        .order_by("wallet_id", "bucket", "-last_line_id")
+        .values_list("wallet_id", "bucket", "last_line_id", "balance")
+    )
+    for wallet_id, bucket, last_line_id, balance in snapshots:
+        if (wallet_id, bucket) not in cuts:
+            cuts[(wallet_id, bucket)] = last_line_id
+            balances[wallet_id][bucket] = balance
+
+    # Snapshots are taken for every changed account at one shared cut, so
+    # grouping accounts by (bucket, cut) keeps the filter to a few ranges.
+    groups = defaultdict(list)
+    for wallet_id in wallet_ids:
+        for bucket in Bucket.values:
+            groups[(bucket, cuts.get((wallet_id, bucket), 0))].append(wallet_id)
+    after_cut = Q()
+    for (bucket, cut), ids in groups.items():
+        after_cut |= Q(bucket=bucket, wallet_id__in=ids, id__gt=cut)
+    if not after_cut:
+        return balances
+
+    deltas = (
+        LedgerLine.objects.filter(after_cut)
+        .values("wallet_id", "bucket")
+        .annotate(delta=Sum("amount"))
+        .order_by()
+    )
+    for row in deltas:
+        balances[row["wallet_id"]][row["bucket"]] += row["delta"]
+    return balances
+
+
+def wallet_columns(buckets):
+    """Maps ledger bucket balances onto the Wallet column names."""
+    withdrawable = buckets.get(Bucket.WITHDRAWABLE, Decimal("0"))
+    return {
+        "total_balance": withdrawable + buckets.get(Bucket.NON_WITHDRAWABLE, Decimal("0")),
+        "withdrawable_balance": withdrawable,
+        "token_balance": buckets.get(Bucket.TOKEN, Decimal("0")),
+    }
+
+
+@transaction.atomic
+def take_snapshots():
+    """
+    Rolls every account touched since its last snapshot forward to a new
+    snapshot. Only lines older than ``SNAPSHOT_LAG`` are included.
+    """
+    cut = (
+        LedgerLine.objects.filter(entry__created_at__lte=timezone.now() - SNAPSHOT_LAG)
+        .aggregate(cut=Max("id"))["cut"]
+    )
+    if cut is None:
+        return 0
+    previous_cut = LedgerSnapshot.objects.aggregate(cut=Max("last_line_id"))["cut"] or 0
+    if cut <= previous_cut:
+        return 0
+
+    changed = (
+        LedgerLine.objects.filter(id__gt=previous_cut, id__lte=cut)
+        .values("wallet_id", "bucket")
+        .annotate(delta=Sum("amount"))
+        .order_by()
+    )
+    changed = {(row["wallet_id"], row["bucket"]): row["delta"] for row in changed}
+
+    wallet_ids = {wallet_id for wallet_id, _ in changed if wallet_id is not None}
+    previous = {}
+    for wallet_id, bucket, balance in (
+        LedgerSnapshot.objects.filter(Q(wallet_id__in=wallet_ids) | Q(wallet__isnull=True))
+        .order_by("wallet_id", "bucket", "-last_line_id")
+        .values_list("wallet_id", "bucket", "balance")
+    ):
+        previous.setdefault((wallet_id, bucket), balance)
+
+    LedgerSnapshot.objects.bulk_create(
+        [
+            LedgerSnapshot(
+                wallet_id=wallet_id,
+                bucket=bucket,
+                balance=previous.get((wallet_id, bucket), Decimal("0")) + delta,
+                last_line_id=cut,
+            )
+            for (wallet_id, bucket), delta in changed.items()
+        ],
+        batch_size=1000,
+    )
+    return len(changed)
@@ -0,0 +1,109 @@
+import time
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from tournaments.models import EntryFeeRefund
+from wallet.models import Refund, Transaction
+
+ARCHIVE_TABLE = 'wallet_transactionarchive'
+COLUMNS = [
+    'id', 'wallet_id', 'amount', 'transaction_type', 'timestamp', 'description', 'authority',
+    'order_id', 'ref_number', 'status', 'is_refunded', 'idempotency_key', 'tournament_id', 'game_id',
+]
+
+
+def month_start(day, months_back=0):
+    month = day.year * 12 + day.month - 1 - months_back
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def ensure_partitions(months):
+    """Creates the monthly PostgreSQL partitions that will receive a batch."""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for first in sorted(months):
+            following = month_start(first, months_back=-1)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE}_y{first.year}m{first.month:02d}'
+                f' PARTITION OF {ARCHIVE_TABLE}'
+                f" FOR VALUES FROM ('{first.isoformat()}') TO ('{following.isoformat()}')"
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves settled transactions older than N months from the hot table to the archive table '
+        '(monthly partitions on PostgreSQL). Each batch is its own short transaction and skips '
+        'rows that are locked, so live traffic on recent rows is never blocked.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-months', type=int, default=12, help='Keep this many whole months hot.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows moved per transaction.')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move.')
+
+    def handle(self, *args, **options):
+        if options['older_than_months'] < 1:
+            raise CommandError('--older-than-months must be at least 1.')
+        first_hot_month = month_start(timezone.localdate(), options['older_than_months'])
+        cutoff = timezone.make_aware(datetime.combine(first_hot_month, datetime.min.time()))
+
+        # Pending rows are still being settled; refunded rows are still
+        # referenced by Refund and EntryFeeRefund.
+        candidates = (
+            Transaction.objects.filter(timestamp__lt=cutoff)
+            .exclude(status=Transaction.Status.PENDING)
+            .exclude(Exists(Refund.objects.filter(transaction=OuterRef('pk'))))
+            .exclude(Exists(EntryFeeRefund.objects.filter(transaction=OuterRef('pk'))))
+        )
+        if options['dry_run']:
+            self.stdout.write(f'Would archive {candidates.count()} transactions older than {cutoff.date()}.')
+            return
+
+        columns = ', '.join(connection.ops.quote_name(column) for column in COLUMNS)
+        moved = 0
+        last_id = 0
+        while True:
+            ids = list(
+                candidates.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            with transaction.atomic():
+                # Re-checking the filters under the lock keeps out rows that
+                # were refunded since the ids were read.
+                rows = list(
+                    candidates.select_for_update(skip_locked=True)
+                    .filter(id__in=ids)
+                    .values_list('id', 'timestamp')
+                )
+                if not rows:
+                    continue
+                locked_ids = [row_id for row_id, _ in rows]
+                # Partition bounds are UTC months.
+                ensure_partitions({month_start(ts.astimezone(dt_timezone.utc).date()) for _, ts in rows})
+                placeholders = ', '.join(['%s'] * len(locked_ids))
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'INSERT INTO {ARCHIVE_TABLE} ({columns}, archived_at)'
+                        f' SELECT {columns}, %s FROM {Transaction._meta.db_table} WHERE id IN ({placeholders})',
+                        [timezone.now(), *locked_ids],
+                    )
+                    cursor.execute(
+                        f'DELETE FROM {Transaction._meta.db_table} WHERE id IN ({placeholders})',
+                        locked_ids,
+                    )
+            moved += len(locked_ids)
+            self.stdout.write(f'Archived {moved} transactions...')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} transactions older than {cutoff.date()}.'))
@@ -0,0 +1,95 @@
+import re
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from tournaments.models import Participant, Tournament
+from wallet.models import Transaction
+
+# Descriptions written by the tournament services before transactions carried
+# a tournament reference.
+DESCRIPTION_PATTERNS = [
+    re.compile(r'^Entry fee for tournament: (?P<name>.+)$'),
+    re.compile(r'^Entry fee for team .+? in tournament: (?P<name>.+)$'),
+    re.compile(r'^Prize for winning tournament: (?P<name>.+)$'),
+    re.compile(r'^Prize for tournament: (?P<name>.+)$'),
+    re.compile(r'^Refund for tournament: (?P<name>.+)$'),
+]
+
+
+def parse_tournament_name(description):
+    for pattern in DESCRIPTION_PATTERNS:
+        match = pattern.match(description or '')
+        if match:
+            return match.group('name')
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Sets Transaction.tournament and game on older transactions by parsing their descriptions. '
+        'Names shared by several tournaments are resolved through the payer\'s participation.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Transactions updated per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without saving.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        by_name = defaultdict(list)
+        for tournament_id, name, game_id in Tournament.objects.values_list('id', 'name', 'game_id'):
+            by_name[name].append((tournament_id, game_id))
+
+        candidates = Transaction.objects.filter(tournament__isnull=True).filter(
+            Q(description__startswith='Entry fee for')
+            | Q(description__startswith='Prize for')
+            | Q(description__startswith='Refund for tournament')
+        )
+        matched = ambiguous = unmatched = 0
+        last_id = 0
+        while True:
+            rows = list(
+                candidates.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'description', 'wallet__user_id')[:chunk_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            parsed = [
+                (tx_id, by_name.get(parse_tournament_name(description), []), user_id)
+                for tx_id, description, user_id in rows
+            ]
+            shared = [(user_id, matches) for _, matches, user_id in parsed if len(matches) > 1]
+            joined = set()
+            if shared:
+                joined = set(
+                    Participant.objects.filter(
+                        user_id__in={user_id for user_id, _ in shared},
+                        tournament_id__in={t_id for _, matches in shared for t_id, _ in matches},
+                    ).values_list('user_id', 'tournament_id')
+                )
+
+            updates = []
+            for tx_id, matches, user_id in parsed:
+                if len(matches) > 1:
+                    matches = [match for match in matches if (user_id, match[0]) in joined]
+                    if len(matches) != 1:
+                        ambiguous += 1
+                        continue
+                if not matches:
+                    unmatched += 1
+                    continue
+                tournament_id, game_id = matches[0]
+                updates.append(Transaction(id=tx_id, tournament_id=tournament_id, game_id=game_id))
+
+            matched += len(updates)
+            if updates and not options['dry_run']:
+                Transaction.objects.bulk_update(updates, ['tournament', 'game'], batch_size=chunk_size)
+
+        self.stdout.write(f'Ambiguous: {ambiguous}, unmatched: {unmatched}')
+        verb = 'Would link' if options['dry_run'] else 'Linked'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {matched} transactions to their tournaments.'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from wallet.models import Wallet
+from wallet.summaries import rebuild_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds WalletMonthlySummary rows from the hot and archived transactions. '
+        'Wallets are processed in id chunks, each locked only while its summaries are rebuilt.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Wallets rebuilt per transaction.')
+        parser.add_argument('--wallet', type=int, action='append', dest='wallets', help='Only rebuild this wallet id.')
+
+    def handle(self, *args, **options):
+        wallet_ids = Wallet.objects.order_by('id').values_list('id', flat=True)
+        if options['wallets']:
+            wallet_ids = wallet_ids.filter(id__in=options['wallets'])
+
+        chunk_size = options['chunk_size']
+        wallets = rows = 0
+        last_id = 0
+        while True:
+            chunk = list(wallet_ids.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1]
+            rows += rebuild_monthly_summaries(chunk)
+            wallets += len(chunk)
+            self.stdout.write(f'Rebuilt {wallets} wallets...')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} monthly summaries for {wallets} wallets.'))
@@ -0,0 +1,347 @@
+import json
+import random
+import subprocess
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from itertools import repeat
+from multiprocessing import get_context
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from wallet.fake_zibal import FakeZibalServer
+from wallet.models import Transaction, Wallet, WithdrawalRequest
+from wallet.services import WalletService
+
+User = get_user_model()
+
+OPERATIONS = ('join', 'prize', 'withdraw', 'deposit')
+STARTING_BALANCE = Decimal('1000000000000')
+ENTRY_FEE = Decimal('10000')
+PRIZE = Decimal('25000')
+DEPOSIT = Decimal('50000')
+
+
+def parse_mix(value):
+    """Parses ``join=5,prize=3`` into operation weights."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(f"Unknown operation '{name}'. Choose from {', '.join(OPERATIONS)}.")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight for '{name}': {weight}")
+    if not any(mix.values()):
+        raise CommandError('--mix needs at least one positive weight.')
+    return mix
+
+
+def classify(exc):
+    """Sorts a failed operation into rejected / deadlock / lock_failure / error."""
+    if isinstance(exc, ValidationError):
+        return 'rejected'
+    if isinstance(exc, DatabaseError):
+        cause = exc.__cause__
+        code = getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+        message = str(exc).lower()
+        if code == '40P01' or 'deadlock' in message:
+            return 'deadlock'
+        if code in ('55P03', '57014') or 'lock' in message:
+            return 'lock_failure'
+    return 'error'
+
+
+class LockTimer:
+    """
+    Query wrapper that times the statements that wait for row locks:
+    ``SELECT ... FOR UPDATE`` on PostgreSQL. SQLite locks the whole database
+    on the first write instead, so there the write statements are timed.
+    """
+
+    def __init__(self, vendor):
+        self.vendor = vendor
+        self.waits = []
+
+    def waits_for_lock(self, sql):
+        if self.vendor == 'sqlite':
+            return sql.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+        return 'FOR UPDATE' in sql
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.waits_for_lock(sql):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.waits.append(time.perf_counter() - start)
+
+
+def prepare(operation, users, rng, config):
+    """
+    Does the untimed setup for one operation and returns the call to time.
+    """
+    user = rng.choice(users)
+    if operation == 'join':
+        return lambda: WalletService.process_transaction(
+            user, ENTRY_FEE, Transaction.TransactionType.ENTRY_FEE, description='benchmark join'
+        )
+    if operation == 'prize':
+        winners = rng.sample(users, min(config['winners'], len(users)))
+        return lambda: WalletService.bulk_credit(
+            {winner.id: PRIZE for winner in winners}, Transaction.TransactionType.PRIZE, 'benchmark prize'
+        )
+    if operation == 'withdraw':
+        # Lift the one-request-per-day limit so every call reaches the lock.
+        WithdrawalRequest.objects.filter(user=user).update(created_at=timezone.now() - timedelta(days=2))
+        return lambda: WalletService(user).create_withdrawal_request(
+            settings.MINIMUM_WITHDRAWAL_AMOUNT, '6037990000000000', 'IR000000000000000000000000'
+        )
+
+    track_id = requests.post(
+        f"{config['zibal_url']}/request", json={'amount': int(DEPOSIT)}, timeout=5
+    ).json()['trackId']
+    order_id = uuid.uuid4().hex
+    Transaction.objects.create(
+        wallet=user.wallet,
+        amount=DEPOSIT,
+        transaction_type=Transaction.TransactionType.DEPOSIT,
+        status=Transaction.Status.PENDING,
+        authority=str(track_id),
+        order_id=order_id,
+    )
+
+    def settle():
+        # The service logs and swallows database errors while settling.
+        if WalletService.verify_and_process_deposit(str(track_id), order_id) is None:
+            raise RuntimeError('Deposit was not settled.')
+
+    return settle
+
+
+def run_worker(worker_id, config):
+    rng = random.Random(config['seed'] + worker_id)
+    users = list(User.objects.filter(id__in=config['user_ids']).select_related('wallet').order_by('id'))
+    names = list(config['mix'])
+    weights = [config['mix'][name] for name in names]
+    timer = LockTimer(connection.vendor)
+    latencies = defaultdict(list)
+    outcomes = Counter()
+
+    with connection.execute_wrapper(timer):
+        for _ in range(config['ops']):
+            operation = rng.choices(names, weights)[0]
+            call = prepare(operation, users, rng, config)
+            start = time.perf_counter()
+            try:
+                call()
+                outcome = 'ok'
+            except Exception as exc:
+                outcome = classify(exc)
+            latencies[operation].append(time.perf_counter() - start)
+            outcomes[f'{operation}:{outcome}'] += 1
+    connection.close()
+    return {'latencies': dict(latencies), 'outcomes': dict(outcomes), 'lock_waits': timer.waits}
+
+
+def percentiles_ms(samples):
+    if not samples:
+        return 0.0, 0.0
+    p50, p99 = np.percentile(np.asarray(samples) * 1000, [50, 99])
+    return round(float(p50), 2), round(float(p99), 2)
+
+
+def git_label():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unlabelled'
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives tournament joins, prize credits, withdrawal requests and deposit settlements '
+        'from several threads or processes against a small set of hot wallets, and reports '
+        'throughput, lock waits and deadlocks. Run it against a disposable local PostgreSQL '
+        '(or SQLite, switched to WAL) database; it creates and reuses bench-contention-* users. '
+        'Append results with --output and compare runs across commits with --compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent workers.')
+        parser.add_argument('--processes', action='store_true', help='Use processes instead of threads.')
+        parser.add_argument('--ops', type=int, default=200, help='Operations per worker.')
+        parser.add_argument('--wallets', type=int, default=4, help='Hot wallets shared by all workers.')
+        parser.add_argument('--winners', type=int, default=3, help='Wallets credited by each prize payout.')
+        parser.add_argument(
+            '--mix', default='join=5,prize=2,withdraw=1,deposit=2', help='Operation weights, e.g. join=5,prize=2.'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the operation sequence.')
+        parser.add_argument('--label', help='Name of this run in the results file. Defaults to the git commit.')
+        parser.add_argument('--output', help='Append the result as a JSON line to this file.')
+        parser.add_argument('--compare', metavar='FILE', help='Print the runs stored in FILE and exit.')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(options['compare'])
+        if options['workers'] < 1 or options['ops'] < 1 or options['wallets'] < 1:
+            raise CommandError('--workers, --ops and --wallets must be positive.')
+
+        mix = parse_mix(options['mix'])
+        vendor = connection.vendor
+        if vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+        users = self.prepare_wallets(options['wallets'])
+
+        with FakeZibalServer() as server, override_settings(
+            ZIBAL_API_BASE_URL=server.base_url, ZIBAL_GATEWAY_BASE_URL=server.base_url
+        ):
+            config = {
+                'user_ids': [user.id for user in users],
+                'mix': mix,
+                'ops': options['ops'],
+                'winners': options['winners'],
+                'seed': options['seed'],
+                'zibal_url': server.base_url,
+            }
+            # Forked workers must not share the parent's database connection.
+            connections.close_all()
+            if options['processes']:
+                executor = ProcessPoolExecutor(options['workers'], mp_context=get_context('fork'))
+            else:
+                executor = ThreadPoolExecutor(options['workers'])
+            start = time.perf_counter()
+            with executor:
+                results = list(executor.map(run_worker, range(options['workers']), repeat(config)))
+            elapsed = time.perf_counter() - start
+
+        record = self.summarize(results, elapsed, vendor, options)
+        self.report(record)
+        if options['output']:
+            with open(options['output'], 'a', encoding='utf-8') as output:
+                output.write(json.dumps(record) + '\n')
+            self.stdout.write(f"Result appended to {options['output']}.")
+
+    def prepare_wallets(self, count):
+        users = []
+        for index in range(count):
+            user, _ = User.objects.get_or_create(
+                username=f'bench-contention-{index}',
+                defaults={'phone_number': f'+9890000{index:05d}'},
+            )
+            users.append(user)
+        # Each fake gateway numbers its track ids from the same start, so free
+        # the ones left by earlier runs.
+        Transaction.objects.filter(wallet__user__in=users, authority__isnull=False).update(authority=None)
+        # Top up through the service so the ledger stays in step with the wallets.
+        top_ups = {
+            wallet.user_id: STARTING_BALANCE - wallet.withdrawable_balance
+            for wallet in Wallet.objects.filter(user__in=users)
+            if wallet.withdrawable_balance < STARTING_BALANCE
+        }
+        WalletService.bulk_credit(top_ups, Transaction.TransactionType.DEPOSIT, 'benchmark top-up')
+        return users
+
+    def summarize(self, results, elapsed, vendor, options):
+        latencies = defaultdict(list)
+        outcomes = Counter()
+        lock_waits = []
+        for result in results:
+            for operation, samples in result['latencies'].items():
+                latencies[operation].extend(samples)
+            outcomes.update(result['outcomes'])
+            lock_waits.extend(result['lock_waits'])
+
+        total = sum(len(samples) for samples in latencies.values())
+        by_outcome = Counter()
+        for key, count in outcomes.items():
+            by_outcome[key.split(':', 1)[1]] += count
+        per_operation = {}
+        for operation, samples in sorted(latencies.items()):
+            p50, p99 = percentiles_ms(samples)
+            per_operation[operation] = {
+                'count': len(samples),
+                'ok': outcomes.get(f'{operation}:ok', 0),
+                'p50_ms': p50,
+                'p99_ms': p99,
+            }
+        lock_p50, lock_p99 = percentiles_ms(lock_waits)
+        return {
+            'label': options['label'] or git_label(),
+            'recorded_at': timezone.now().isoformat(),
+            'backend': vendor,
+            'mode': 'processes' if options['processes'] else 'threads',
+            'workers': options['workers'],
+            'wallets': options['wallets'],
+            'mix': options['mix'],
+            'operations': total,
+            'elapsed_s': round(elapsed, 3),
+            'ops_per_s': round(total / elapsed, 1) if elapsed else 0.0,
+            'lock_wait_p50_ms': lock_p50,
+            'lock_wait_p99_ms': lock_p99,
+            'deadlocks': by_outcome['deadlock'],
+            'lock_failures': by_outcome['lock_failure'],
+            'rejected': by_outcome['rejected'],
+            'errors': by_outcome['error'],
+            'per_operation': per_operation,
+        }
+
+    def report(self, record):
+        self.stdout.write(
+            f"{record['label']} on {record['backend']}: {record['workers']} {record['mode']}, "
+            f"{record['wallets']} hot wallets, mix {record['mix']}"
+        )
+        self.stdout.write(
+            f"{record['operations']:,} operations in {record['elapsed_s']:.2f}s "
+            f"({record['ops_per_s']:,.1f} ops/s)"
+        )
+        for operation, stats in record['per_operation'].items():
+            self.stdout.write(
+                f"  {operation:<9} {stats['count']:>7,} ops  {stats['ok']:>7,} ok  "
+                f"p50 {stats['p50_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms"
+            )
+        self.stdout.write(
+            f"Lock wait: p50 {record['lock_wait_p50_ms']:.2f} ms, p99 {record['lock_wait_p99_ms']:.2f} ms"
+        )
+        self.stdout.write(
+            f"Deadlocks: {record['deadlocks']}  Lock failures: {record['lock_failures']}  "
+            f"Rejected: {record['rejected']}  Errors: {record['errors']}"
+        )
+        if record['deadlocks'] or record['errors']:
+            self.stdout.write(self.style.WARNING('Benchmark finished with deadlocks or errors.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark finished.'))
+
+    def compare(self, path):
+        try:
+            with open(path, encoding='utf-8') as results:
+                records = [json.loads(line) for line in results if line.strip()]
+        except FileNotFoundError:
+            raise CommandError(f'No results file at {path}.')
+        self.stdout.write(
+            f"{'label':<14}{'backend':<12}{'mode':<11}{'workers':>8}{'wallets':>8}{'ops/s':>10}"
+            f"{'lock p50':>10}{'lock p99':>10}{'deadlocks':>11}{'lock fail':>11}"
+        )
+        for record in records:
+            self.stdout.write(
+                f"{record['label']:<14}{record['backend']:<12}{record['mode']:<11}{record['workers']:>8}{record['wallets']:>8}"
+                f"{record['ops_per_s']:>10,.1f}{record['lock_wait_p50_ms']:>10.2f}{record['lock_wait_p99_ms']:>10.2f}"
+                f"{record['deadlocks']:>11}{record['lock_failures']:>11}"
+            )
@@ -0,0 +1,44 @@
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from wallet.fake_zibal import FakeZibalServer
+from wallet.services import ZibalService
+
+
+class Command(BaseCommand):
+    help = 'Compares the pooled Zibal client with one-off requests against the local fake server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Number of verify calls per run.')
+        parser.add_argument('--latency', type=float, default=0.0, help='Simulated gateway latency in seconds.')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        with FakeZibalServer(latency=options['latency']) as server:
+            track_id = requests.post(
+                f'{server.base_url}/request', json={'amount': 1000}, timeout=5
+            ).json()['trackId']
+            payload = {'merchant': 'zibal', 'trackId': track_id, 'amount': 1000}
+
+            start = time.perf_counter()
+            for _ in range(count):
+                requests.post(f'{server.base_url}/verify', json=payload, timeout=5).json()
+            unpooled = time.perf_counter() - start
+
+            with override_settings(ZIBAL_GATEWAY_BASE_URL=server.base_url):
+                service = ZibalService()
+                server.connections.clear()
+                start = time.perf_counter()
+                for _ in range(count):
+                    service.verify_payment(track_id, 1000)
+                pooled = time.perf_counter() - start
+
+        self.stdout.write(f'One-off requests: {unpooled:.2f}s ({count / unpooled:,.0f} req/s)')
+        self.stdout.write(
+            f'Pooled session:   {pooled:.2f}s ({count / pooled:,.0f} req/s) '
+            f'over {len(server.connections)} connection(s)'
+        )
+        self.stdout.write(self.style.SUCCESS('Benchmark finished.'))
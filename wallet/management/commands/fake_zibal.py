@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from wallet.fake_zibal import FakeZibalServer
+
+
+class Command(BaseCommand):
+    help = 'Runs a local fake Zibal server for development, load tests and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on.')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to delay every response.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 503.')
+
+    def handle(self, *args, **options):
+        server = FakeZibalServer(
+            port=options['port'],
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Fake Zibal listening on {server.base_url}'))
+        self.stdout.write('Set ZIBAL_API_BASE_URL and ZIBAL_GATEWAY_BASE_URL to this address. Ctrl+C to stop.')
+        server.start()
+        try:
+            server._thread.join()
+        except KeyboardInterrupt:
+            server.stop()
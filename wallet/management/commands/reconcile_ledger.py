@@ -0,0 +1,68 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from wallet.ledger import ledger_balances, post_opening_balance, wallet_columns
+from wallet.models import LedgerLine, Wallet
+
+
+class Command(BaseCommand):
+    help = 'Streams every wallet and reports drift between its columns and the ledger balance.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Wallets compared per query batch.')
+        parser.add_argument(
+            '--open-missing',
+            action='store_true',
+            help='Post an opening entry for wallets that have no ledger lines yet (one-off bootstrap).',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        wallets = (
+            Wallet.objects.order_by('id')
+            .values_list('id', 'total_balance', 'withdrawable_balance', 'token_balance')
+            .iterator(chunk_size=chunk_size)
+        )
+        checked = drifted = opened = 0
+        while True:
+            chunk = list(islice(wallets, chunk_size))
+            if not chunk:
+                break
+            ids = [row[0] for row in chunk]
+            balances = ledger_balances(ids)
+            if options['open_missing']:
+                with_lines = set(
+                    LedgerLine.objects.filter(wallet_id__in=ids)
+                    .values_list('wallet_id', flat=True)
+                    .distinct()
+                )
+                for wallet in Wallet.objects.filter(id__in=set(ids) - with_lines):
+                    post_opening_balance(wallet, description='Ledger bootstrap')
+                    opened += 1
+                balances = ledger_balances(ids)
+
+            for wallet_id, total, withdrawable, tokens in chunk:
+                actual = {
+                    'total_balance': total,
+                    'withdrawable_balance': withdrawable,
+                    'token_balance': tokens,
+                }
+                expected = wallet_columns(balances.get(wallet_id, {}))
+                diffs = [
+                    f'{column}: wallet={actual[column]} ledger={expected[column]}'
+                    for column in actual
+                    if actual[column] != expected[column]
+                ]
+                if diffs:
+                    drifted += 1
+                    self.stdout.write(self.style.WARNING(f'Wallet {wallet_id} drift: ' + '; '.join(diffs)))
+            checked += len(chunk)
+
+        if opened:
+            self.stdout.write(f'Opening entries posted: {opened}')
+        summary = f'Checked {checked} wallets, {drifted} with drift.'
+        if drifted:
+            self.stdout.write(self.style.ERROR(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
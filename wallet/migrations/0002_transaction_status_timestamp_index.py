@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["status", "timestamp"], name="wallet_tran_status_75aa83_idx"
+            ),
+        ),
+    ]
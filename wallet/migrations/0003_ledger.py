@@ -0,0 +1,163 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0002_transaction_status_timestamp_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=30)),
+                ("description", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="ledger_entries",
+                        to="wallet.transaction",
+                    ),
+                ),
+                (
+                    "withdrawal_request",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="ledger_entries",
+                        to="wallet.withdrawalrequest",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Ledger entries",
+            },
+        ),
+        migrations.CreateModel(
+            name="LedgerLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "bucket",
+                    models.CharField(
+                        choices=[
+                            ("withdrawable", "قابل برداشت"),
+                            ("non_withdrawable", "غیرقابل برداشت"),
+                            ("token", "توکن"),
+                            ("pending_withdrawal", "در انتظار برداشت"),
+                            ("gateway", "درگاه پرداخت"),
+                            ("platform", "پلتفرم"),
+                            ("token_issuer", "صادرکننده توکن"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=20)),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="lines",
+                        to="wallet.ledgerentry",
+                    ),
+                ),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="ledger_lines",
+                        to="wallet.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["wallet", "bucket", "id"],
+                        name="wallet_ledg_wallet__2c7026_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="LedgerSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "bucket",
+                    models.CharField(
+                        choices=[
+                            ("withdrawable", "قابل برداشت"),
+                            ("non_withdrawable", "غیرقابل برداشت"),
+                            ("token", "توکن"),
+                            ("pending_withdrawal", "در انتظار برداشت"),
+                            ("gateway", "درگاه پرداخت"),
+                            ("platform", "پلتفرم"),
+                            ("token_issuer", "صادرکننده توکن"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("last_line_id", models.BigIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_snapshots",
+                        to="wallet.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["wallet", "bucket", "-last_line_id"],
+                        name="wallet_ledg_wallet__8ab672_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0008_entry_fee_refund"),
+        ("wallet", "0004_idempotency_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="game",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="transactions",
+                to="tournaments.game",
+            ),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="tournament",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="transactions",
+                to="tournaments.tournament",
+            ),
+        ),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:19
+
+from django.db import migrations, models
+
+ARCHIVE_COLUMNS_SQL = """
+    id bigint NOT NULL,
+    wallet_id bigint NOT NULL,
+    amount numeric(20, 2) NOT NULL,
+    transaction_type varchar(20) NOT NULL,
+    "timestamp" timestamp with time zone NOT NULL,
+    description varchar(255) NOT NULL,
+    authority varchar(255) NULL,
+    order_id varchar(255) NULL,
+    ref_number varchar(255) NULL,
+    status varchar(10) NOT NULL,
+    is_refunded boolean NOT NULL,
+    idempotency_key varchar(255) NULL,
+    tournament_id bigint NULL,
+    game_id bigint NULL,
+    archived_at timestamp with time zone NOT NULL
+"""
+
+
+def create_archive_table(apps, schema_editor):
+    """
+    PostgreSQL gets a table partitioned by month of ``timestamp``; the
+    partitions are created by archive_transactions as it fills them. Other
+    databases get a plain table.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE wallet_transactionarchive ({ARCHIVE_COLUMNS_SQL},"
+            ' PRIMARY KEY (id, "timestamp")) PARTITION BY RANGE ("timestamp")'
+        )
+    else:
+        schema_editor.create_model(apps.get_model("wallet", "TransactionArchive"))
+    schema_editor.execute(
+        "CREATE INDEX wallet_txarch_wallet_ts_idx"
+        ' ON wallet_transactionarchive (wallet_id, "timestamp" DESC)'
+    )
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.execute("DROP TABLE wallet_transactionarchive")
+
+
+class AddIndexOnline(migrations.AddIndex):
+    """Builds the index with CREATE INDEX CONCURRENTLY on PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+
+class Migration(migrations.Migration):
+    # Concurrent index builds cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("tournaments", "0008_entry_fee_refund"),
+        ("wallet", "0005_transaction_tournament"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionArchive",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("wallet_id", models.BigIntegerField()),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=20)),
+                (
+                    "transaction_type",
+                    models.CharField(
+                        choices=[
+                            ("deposit", "Deposit"),
+                            ("withdrawal", "Withdrawal"),
+                            ("entry_fee", "Entry Fee"),
+                            ("prize", "Prize"),
+                            ("token_spent", "Token Spent"),
+                            ("token_earned", "Token Earned"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                ("description", models.CharField(blank=True, max_length=255)),
+                ("authority", models.CharField(blank=True, max_length=255, null=True)),
+                ("order_id", models.CharField(blank=True, max_length=255, null=True)),
+                ("ref_number", models.CharField(blank=True, max_length=255, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("success", "Success"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("is_refunded", models.BooleanField(default=False)),
+                (
+                    "idempotency_key",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("tournament_id", models.BigIntegerField(blank=True, null=True)),
+                ("game_id", models.BigIntegerField(blank=True, null=True)),
+                ("archived_at", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "wallet_transactionarchive",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+        AddIndexOnline(
+            model_name="transaction",
+            index=models.Index(
+                fields=["wallet", "-timestamp"], name="wallet_tx_wallet_ts_idx"
+            ),
+        ),
+        AddIndexOnline(
+            model_name="transaction",
+            index=models.Index(
+                fields=["transaction_type", "timestamp"], name="wallet_tx_type_ts_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0007_withdrawal_batch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WalletMonthlySummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month")),
+                (
+                    "deposits",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "withdrawals",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "spends",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "winnings",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "net",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("transaction_count", models.PositiveIntegerField(default=0)),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_summaries",
+                        to="wallet.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-month"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("wallet", "month"), name="unique_wallet_month_summary"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -26,6 +26,34 @@ class Wallet(models.Model):
         app_label = "wallet"
 
 
+class WithdrawalBatch(models.Model):
+    """
+    One bulk approval or rejection of withdrawal requests. Approved batches
+    carry the settlement file for the bank upload and its SHA-256 checksum.
+    """
+
+    class Action(models.TextChoices):
+        APPROVE = "approve", "تایید"
+        REJECT = "reject", "رد"
+
+    action = models.CharField(max_length=10, choices=Action.choices)
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="withdrawal_batches"
+    )
+    request_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    file_name = models.CharField(max_length=255, blank=True)
+    checksum = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the settlement file")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Withdrawal batch {self.id} ({self.action}, {self.request_count} requests)"
+
+    class Meta:
+        app_label = "wallet"
+        ordering = ["-created_at"]
+
+
 class WithdrawalRequest(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", "در انتظار بررسی"
@@ -37,6 +65,13 @@ class WithdrawalRequest(models.Model):
     status = models.CharField(
         max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True
     )
+    batch = models.ForeignKey(
+        WithdrawalBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="withdrawal_requests",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -91,6 +126,27 @@ class Transaction(models.Model):
         max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True
     )
     is_refunded = models.BooleanField(default=False, help_text="آیا این تراکنش استرداد شده است؟")
+    idempotency_key = models.CharField(
+        max_length=255,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Caller-supplied key; a repeated call returns this transaction.",
+    )
+    tournament = models.ForeignKey(
+        "tournaments.Tournament",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="transactions",
+    )
+    game = models.ForeignKey(
+        "tournaments.Game",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="transactions",
+    )
 
 
     def __str__(self):
@@ -98,6 +154,76 @@ class Transaction(models.Model):
 
     class Meta:
         app_label = "wallet"
+        indexes = [
+            models.Index(fields=["status", "timestamp"]),
+            # A wallet's history, newest first (statement views, latest_transactions).
+            models.Index(fields=["wallet", "-timestamp"], name="wallet_tx_wallet_ts_idx"),
+            # Reporting windows per transaction type.
+            models.Index(fields=["transaction_type", "timestamp"], name="wallet_tx_type_ts_idx"),
+        ]
+
+
+class WalletMonthlySummary(models.Model):
+    """
+    Successful money movements of one wallet in one calendar month (local
+    time). Kept up to date as transactions are posted to the ledger and
+    rebuilt by backfill_wallet_summaries. Token transactions are left out.
+    """
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="monthly_summaries")
+    month = models.DateField(help_text="First day of the month")
+    deposits = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    withdrawals = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    spends = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    winnings = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    net = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.wallet} {self.month:%Y-%m}"
+
+    class Meta:
+        app_label = "wallet"
+        ordering = ["-month"]
+        constraints = [
+            models.UniqueConstraint(fields=["wallet", "month"], name="unique_wallet_month_summary")
+        ]
+
+
+class TransactionArchive(models.Model):
+    """
+    Cold storage for settled transactions moved out of the hot table by the
+    ``archive_transactions`` command. On PostgreSQL the table is partitioned
+    by month of ``timestamp``; elsewhere it is a single archive table. The
+    table is created by its migration, hence ``managed = False``.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    wallet_id = models.BigIntegerField()
+    amount = models.DecimalField(max_digits=20, decimal_places=2)
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TransactionType.choices)
+    timestamp = models.DateTimeField()
+    description = models.CharField(max_length=255, blank=True)
+    authority = models.CharField(max_length=255, null=True, blank=True)
+    order_id = models.CharField(max_length=255, null=True, blank=True)
+    ref_number = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Transaction.Status.choices)
+    is_refunded = models.BooleanField(default=False)
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    tournament_id = models.BigIntegerField(null=True, blank=True)
+    game_id = models.BigIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.wallet_id} - {self.transaction_type} - {self.amount}"
+
+    class Meta:
+        app_label = "wallet"
+        managed = False
+        db_table = "wallet_transactionarchive"
+        indexes = [
+            models.Index(fields=["wallet_id", "-timestamp"], name="wallet_txarch_wallet_ts_idx"),
+        ]
 
 
 class Refund(models.Model):
@@ -120,3 +246,121 @@ class Refund(models.Model):
     class Meta:
         app_label = "wallet"
         ordering = ["-created_at"]
+
+
+class IdempotencyKey(models.Model):
+    """
+    پاسخ ذخیره شده یک درخواست با هدر Idempotency-Key.
+    A repeated request with the same key gets the stored response back
+    instead of running again.
+    """
+
+    class Status(models.TextChoices):
+        IN_PROGRESS = "in_progress", "در حال پردازش"
+        COMPLETED = "completed", "انجام شده"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(
+        max_length=15, choices=Status.choices, default=Status.IN_PROGRESS
+    )
+    response_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
+    class Meta:
+        app_label = "wallet"
+        unique_together = ("user", "scope", "key")
+
+
+class LedgerEntry(models.Model):
+    """
+    یک سند دوطرفه در دفتر کل. مجموع مبالغ سطرهای هر سند همیشه صفر است.
+    Entries and their lines are append-only; corrections are new entries.
+    References to wallets and transactions carry no database constraint so
+    the history survives when those rows are deleted.
+    """
+
+    kind = models.CharField(max_length=30)
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="ledger_entries",
+    )
+    withdrawal_request = models.ForeignKey(
+        WithdrawalRequest,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="ledger_entries",
+    )
+    description = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
+
+    class Meta:
+        app_label = "wallet"
+        verbose_name_plural = "Ledger entries"
+
+
+class LedgerLine(models.Model):
+    """
+    یک طرف (بدهکار یا بستانکار) از سند. Positive amounts credit the account,
+    negative amounts debit it. Wallet buckets mirror the Wallet columns;
+    system accounts (wallet is null) hold the other side of every movement.
+    """
+
+    class Bucket(models.TextChoices):
+        WITHDRAWABLE = "withdrawable", "قابل برداشت"
+        NON_WITHDRAWABLE = "non_withdrawable", "غیرقابل برداشت"
+        TOKEN = "token", "توکن"
+        PENDING_WITHDRAWAL = "pending_withdrawal", "در انتظار برداشت"
+        GATEWAY = "gateway", "درگاه پرداخت"
+        PLATFORM = "platform", "پلتفرم"
+        TOKEN_ISSUER = "token_issuer", "صادرکننده توکن"
+
+    entry = models.ForeignKey(LedgerEntry, on_delete=models.PROTECT, related_name="lines")
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="ledger_lines",
+    )
+    bucket = models.CharField(max_length=20, choices=Bucket.choices)
+    amount = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        app_label = "wallet"
+        indexes = [models.Index(fields=["wallet", "bucket", "id"])]
+
+
+class LedgerSnapshot(models.Model):
+    """
+    Balance of one account as of ``last_line_id``. The current balance is the
+    latest snapshot plus the lines written after it.
+    """
+
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, null=True, blank=True, related_name="ledger_snapshots"
+    )
+    bucket = models.CharField(max_length=20, choices=LedgerLine.Bucket.choices)
+    balance = models.DecimalField(max_digits=20, decimal_places=2)
+    last_line_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = "wallet"
+        indexes = [models.Index(fields=["wallet", "bucket", "-last_line_id"])]
@@ -4,7 +4,7 @@ import re
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from .models import Refund, Transaction, Wallet, WithdrawalRequest
+from .models import Refund, Transaction, Wallet, WalletMonthlySummary, WithdrawalBatch, WithdrawalRequest
 from common.validators import validate_card_number, validate_sheba
 
 
@@ -124,6 +124,52 @@ class AdminWithdrawalRequestUpdateSerializer(serializers.ModelSerializer):
         fields = ('status',)
 
 
+class BulkWithdrawalActionSerializer(serializers.Serializer):
+    """
+    Selects pending withdrawal requests either by ``ids`` or by filters.
+    """
+
+    action = serializers.ChoiceField(choices=WithdrawalBatch.Action.choices)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    created_before = serializers.DateTimeField(required=False)
+    min_amount = serializers.DecimalField(max_digits=20, decimal_places=2, required=False)
+    max_amount = serializers.DecimalField(max_digits=20, decimal_places=2, required=False)
+
+    def validate(self, data):
+        if not any(field in data for field in ("ids", "created_before", "min_amount", "max_amount")):
+            raise serializers.ValidationError("لیست شناسه‌ها یا حداقل یک فیلتر الزامی است.")
+        return data
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        queryset = queryset.filter(status=WithdrawalRequest.Status.PENDING)
+        if "ids" in data:
+            queryset = queryset.filter(pk__in=data["ids"])
+        if "created_before" in data:
+            queryset = queryset.filter(created_at__lt=data["created_before"])
+        if "min_amount" in data:
+            queryset = queryset.filter(amount__gte=data["min_amount"])
+        if "max_amount" in data:
+            queryset = queryset.filter(amount__lte=data["max_amount"])
+        return queryset
+
+
+class WithdrawalBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WithdrawalBatch
+        fields = (
+            "id",
+            "action",
+            "created_by",
+            "request_count",
+            "total_amount",
+            "file_name",
+            "checksum",
+            "created_at",
+        )
+        read_only_fields = fields
+
+
 class CreateWithdrawalRequestSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=20, decimal_places=2)
     card_number = serializers.CharField(max_length=16, validators=[validate_card_number])
@@ -174,6 +220,36 @@ class VerifyDepositSerializer(serializers.Serializer):
     orderId = serializers.CharField()
 
 
+class DepositStatusQuerySerializer(serializers.Serializer):
+    orderId = serializers.CharField()
+
+
+class WalletMonthlySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WalletMonthlySummary
+        fields = ("month", "deposits", "withdrawals", "spends", "winnings", "net", "transaction_count")
+        read_only_fields = fields
+
+
+class WalletStatementQuerySerializer(serializers.Serializer):
+    file_format = serializers.ChoiceField(choices=("csv", "ndjson"), default="csv")
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    user_id = serializers.IntegerField(required=False, help_text="Staff only.")
+
+    def validate(self, data):
+        start_date, end_date = data.get("start_date"), data.get("end_date")
+        if start_date and end_date and start_date > end_date:
+            raise serializers.ValidationError("تاریخ شروع باید قبل از تاریخ پایان باشد.")
+        return data
+
+
+class DepositStatusSerializer(serializers.Serializer):
+    order_id = serializers.CharField()
+    status = serializers.CharField()
+    amount = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+
 class WalletBalanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Wallet
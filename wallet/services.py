@@ -1,19 +1,34 @@
 import logging
 import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from decimal import Decimal
 
 import requests
 from django.conf import settings
-from django.db import transaction
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError, NotFound
 
-from .models import Transaction, Wallet, WithdrawalRequest
+from users.signals import invalidate_transaction_cache
+
+from . import ledger
+from .gateway import CircuitBreaker, CircuitOpenError, RateLimiter, send
+from .models import Refund, Transaction, Wallet, WithdrawalBatch, WithdrawalRequest
+from .settlements import settlement_storage, write_settlement_file
 
 logger = logging.getLogger(__name__)
 
 
+zibal_breaker = CircuitBreaker(
+    failure_threshold=getattr(settings, "ZIBAL_BREAKER_FAILURE_THRESHOLD", 5),
+    reset_timeout=getattr(settings, "ZIBAL_BREAKER_RESET_TIMEOUT", 30),
+)
+
+
 class ZibalService:
     """
     سرویس برای تعامل با APIهای مختلف زیبال.
@@ -23,35 +38,60 @@ class ZibalService:
     def __init__(self):
         self.access_token = getattr(settings, "ZIBAL_ACCESS_TOKEN", None)
         self.merchant_id = getattr(settings, "ZIBAL_MERCHANT_ID", "zibal")
-        self.api_base_url = "https://api.zibal.ir/v1"
-        self.gateway_base_url = "https://gateway.zibal.ir/v1"
+        self.api_base_url = getattr(settings, "ZIBAL_API_BASE_URL", "https://api.zibal.ir/v1")
+        self.gateway_base_url = getattr(
+            settings, "ZIBAL_GATEWAY_BASE_URL", "https://gateway.zibal.ir/v1"
+        )
+        self.timeout = (
+            getattr(settings, "ZIBAL_CONNECT_TIMEOUT", 3.05),
+            getattr(settings, "ZIBAL_READ_TIMEOUT", 10),
+        )
+        self.max_retries = getattr(settings, "ZIBAL_MAX_RETRIES", 2)
 
     def _get_auth_headers(self):
         if not self.access_token:
             raise ValueError("ZIBAL_ACCESS_TOKEN is not configured in settings.")
         return {"Authorization": f"Bearer {self.access_token}"}
 
-    def _post_request(self, url, payload=None, is_gateway=False):
-        base_url = self.gateway_base_url if is_gateway else self.api_base_url
-        full_url = f"{base_url}{url}"
-        headers = {} if is_gateway else self._get_auth_headers()
+    def _send(self, method, full_url, error_message, idempotent, **kwargs):
         try:
-            response = requests.post(full_url, json=payload, headers=headers)
+            response = send(
+                method,
+                full_url,
+                zibal_breaker,
+                timeout=self.timeout,
+                retries=self.max_retries if idempotent else 0,
+                **kwargs,
+            )
             response.raise_for_status()
             return response.json()
+        except CircuitOpenError as e:
+            logger.warning(f"Zibal circuit open, skipping request to {full_url}")
+            raise ValidationError("درگاه پرداخت موقتا در دسترس نیست. لطفا بعدا تلاش کنید.") from e
         except requests.exceptions.RequestException as e:
             logger.error(f"Request Exception for {full_url}: {e}")
-            raise ValidationError("خطا در ارتباط با درگاه پرداخت.") from e
+            raise ValidationError(error_message) from e
+
+    def _post_request(self, url, payload=None, is_gateway=False, idempotent=False):
+        base_url = self.gateway_base_url if is_gateway else self.api_base_url
+        headers = {} if is_gateway else self._get_auth_headers()
+        return self._send(
+            "POST",
+            f"{base_url}{url}",
+            "خطا در ارتباط با درگاه پرداخت.",
+            idempotent,
+            json=payload,
+            headers=headers,
+        )
 
     def _get_request(self, url):
-        full_url = f"{self.api_base_url}{url}"
-        try:
-            response = requests.get(full_url, headers=self._get_auth_headers())
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request Exception for {full_url}: {e}")
-            raise ValidationError("خطا در ارتباط با سرور.") from e
+        return self._send(
+            "GET",
+            f"{self.api_base_url}{url}",
+            "خطا در ارتباط با سرور.",
+            True,
+            headers=self._get_auth_headers(),
+        )
 
     def create_payment(self, amount, description, callback_url, order_id, mobile=None):
         payload = {
@@ -64,9 +104,14 @@ class ZibalService:
         }
         return self._post_request("/request", payload, is_gateway=True)
 
+    def inquire_payment(self, track_id):
+        payload = {"merchant": self.merchant_id, "trackId": track_id}
+        return self._post_request("/inquiry", payload, is_gateway=True, idempotent=True)
+
     def verify_payment(self, track_id, amount):
         payload = {"merchant": self.merchant_id, "trackId": track_id, "amount": amount}
-        return self._post_request("/verify", payload, is_gateway=True)
+        # Zibal answers a repeated verify with "already verified", so it is safe to retry.
+        return self._post_request("/verify", payload, is_gateway=True, idempotent=True)
 
     def generate_payment_url(self, track_id):
         return f"https://gateway.zibal.ir/start/{track_id}"
@@ -130,18 +175,22 @@ class WalletService:
 
     @staticmethod
     def verify_and_process_deposit(track_id: str, order_id: str):
+        """
+        تراکنش واریز را با زیبال تایید و در صورت موفقیت کیف پول را شارژ می‌کند.
+        تراکنش پردازش‌شده (یا None در صورت عدم وجود) برگردانده می‌شود.
+        """
         try:
             tx = Transaction.objects.get(order_id=order_id, authority=track_id)
             if tx.status != Transaction.Status.PENDING:
                 logger.warning(
                     f"تایید پرداخت برای تراکنش {tx.id} که قبلا پردازش شده، نادیده گرفته شد."
                 )
-                return
+                return None
         except Transaction.DoesNotExist:
             logger.error(
                 f"تراکنشی برای order_id={order_id} و track_id={track_id} یافت نشد."
             )
-            return
+            return None
 
         zibal_service = ZibalService()
         verification_response = zibal_service.verify_payment(
@@ -154,7 +203,7 @@ class WalletService:
                 with transaction.atomic():
                     tx_atomic = Transaction.objects.select_for_update().get(id=tx.id)
                     if tx_atomic.status != Transaction.Status.PENDING:
-                        return
+                        return None
 
                     wallet = Wallet.objects.select_for_update().get(id=tx_atomic.wallet.id)
                     wallet.total_balance += tx_atomic.amount
@@ -165,14 +214,19 @@ class WalletService:
                     tx_atomic.ref_number = verification_response.get("refNumber")
                     tx_atomic.description = verification_response.get("description", "پرداخت موفق")
                     tx_atomic.save()
+                    ledger.post_transaction(tx_atomic, Transaction.TransactionType.DEPOSIT)
                 logger.info(f"واریز برای تراکنش {tx.id} با موفقیت تایید و پردازش شد.")
-            except Exception as e:
+                return tx_atomic
+            except (Wallet.DoesNotExist, ValidationError, ValueError) as e:
+                # Database errors propagate so verify_deposit_task retries them.
                 logger.error(f"خطا در پردازش واریز موفق برای تراکنش {tx.id}: {e}")
+                return None
         else:
             tx.status = Transaction.Status.FAILED
             tx.description = verification_response.get("message", "تایید پرداخت ناموفق بود.")
             tx.save()
             logger.error(f"تایید زیبال برای تراکنش {tx.id} ناموفق بود: {tx.description}")
+            return tx
 
     def create_withdrawal_request(self, amount: Decimal, card_number: str, sheba_number: str) -> WithdrawalRequest:
         if amount < settings.MINIMUM_WITHDRAWAL_AMOUNT:
@@ -202,6 +256,14 @@ class WalletService:
             wallet_for_update.save()
 
             withdrawal_request = WithdrawalRequest.objects.create(user=self.user, amount=amount)
+            ledger.post_entry(
+                "withdrawal_hold",
+                [
+                    (wallet_for_update.id, ledger.Bucket.WITHDRAWABLE, -amount),
+                    (wallet_for_update.id, ledger.Bucket.PENDING_WITHDRAWAL, amount),
+                ],
+                withdrawal_request=withdrawal_request,
+            )
             return withdrawal_request
 
     @staticmethod
@@ -213,13 +275,22 @@ class WalletService:
             withdrawal_request.status = WithdrawalRequest.Status.APPROVED
             withdrawal_request.save()
 
-            Transaction.objects.create(
+            payout = Transaction.objects.create(
                 wallet=withdrawal_request.user.wallet,
                 amount=withdrawal_request.amount,
                 transaction_type=Transaction.TransactionType.WITHDRAWAL,
                 status=Transaction.Status.SUCCESS,
                 description=f"درخواست برداشت {withdrawal_request.id} توسط ادمین تایید شد.",
             )
+            ledger.post_entry(
+                "withdrawal_payout",
+                [
+                    (payout.wallet_id, ledger.Bucket.PENDING_WITHDRAWAL, -payout.amount),
+                    (None, ledger.Bucket.GATEWAY, payout.amount),
+                ],
+                transaction=payout,
+                withdrawal_request=withdrawal_request,
+            )
         return withdrawal_request
 
     @staticmethod
@@ -235,10 +306,175 @@ class WalletService:
 
             withdrawal_request.status = WithdrawalRequest.Status.REJECTED
             withdrawal_request.save()
+            ledger.post_entry(
+                "withdrawal_release",
+                [
+                    (wallet.id, ledger.Bucket.PENDING_WITHDRAWAL, -withdrawal_request.amount),
+                    (wallet.id, ledger.Bucket.WITHDRAWABLE, withdrawal_request.amount),
+                ],
+                withdrawal_request=withdrawal_request,
+            )
         return withdrawal_request
 
     @staticmethod
-    def process_transaction(user, amount: Decimal, transaction_type: str, description: str = ""):
+    def _open_withdrawal_batch(withdrawal_requests, action, created_by):
+        """
+        Locks the still-pending requests among ``withdrawal_requests`` in id
+        order, moves them into a new batch and returns ``(batch, requests)``.
+        Must run inside a transaction.
+        """
+        pending = list(
+            WithdrawalRequest.objects.select_for_update(of=("self",))
+            .filter(pk__in=withdrawal_requests.values("pk"), status=WithdrawalRequest.Status.PENDING)
+            .select_related("user__wallet")
+            .order_by("id")
+        )
+        if not pending:
+            raise ValidationError("هیچ درخواست برداشت در انتظاری یافت نشد.")
+
+        batch = WithdrawalBatch.objects.create(
+            action=action,
+            created_by=created_by,
+            request_count=len(pending),
+            total_amount=sum(withdrawal_request.amount for withdrawal_request in pending),
+        )
+        new_status = (
+            WithdrawalRequest.Status.APPROVED
+            if action == WithdrawalBatch.Action.APPROVE
+            else WithdrawalRequest.Status.REJECTED
+        )
+        now = timezone.now()
+        for withdrawal_request in pending:
+            withdrawal_request.status = new_status
+            withdrawal_request.batch = batch
+            withdrawal_request.updated_at = now
+        WithdrawalRequest.objects.bulk_update(pending, ["status", "batch", "updated_at"], batch_size=500)
+        return batch, pending
+
+    @staticmethod
+    def bulk_approve_withdrawal_requests(withdrawal_requests, approved_by=None) -> WithdrawalBatch:
+        """
+        Approves every pending request in the ``withdrawal_requests`` queryset
+        in one database transaction, posting the same payout Transaction and
+        ledger entry as ``approve_withdrawal_request``, and writes the batch's
+        settlement file once it commits. Requests that are no longer pending
+        are skipped.
+        """
+        with transaction.atomic():
+            batch, approved = WalletService._open_withdrawal_batch(
+                withdrawal_requests, WithdrawalBatch.Action.APPROVE, approved_by
+            )
+            payouts = Transaction.objects.bulk_create(
+                [
+                    Transaction(
+                        wallet=withdrawal_request.user.wallet,
+                        amount=withdrawal_request.amount,
+                        transaction_type=Transaction.TransactionType.WITHDRAWAL,
+                        status=Transaction.Status.SUCCESS,
+                        description=f"درخواست برداشت {withdrawal_request.id} توسط ادمین تایید شد.",
+                    )
+                    for withdrawal_request in approved
+                ],
+                batch_size=500,
+            )
+            ledger.post_entries(
+                [
+                    (
+                        "withdrawal_payout",
+                        [
+                            (payout.wallet_id, ledger.Bucket.PENDING_WITHDRAWAL, -payout.amount),
+                            (None, ledger.Bucket.GATEWAY, payout.amount),
+                        ],
+                        payout,
+                        withdrawal_request,
+                        "",
+                    )
+                    for withdrawal_request, payout in zip(approved, payouts)
+                ]
+            )
+            user_ids = [withdrawal_request.user_id for withdrawal_request in approved]
+            transaction.on_commit(lambda: invalidate_transaction_cache(user_ids))
+            transaction.on_commit(lambda: WalletService._attach_settlement_file(batch, approved))
+        return batch
+
+    @staticmethod
+    def _attach_settlement_file(batch, withdrawal_requests):
+        """
+        Writes an approved batch's settlement file once the approval has
+        committed, so a rolled-back approval never leaves a file with bank
+        details behind. The file is deleted again if it cannot be recorded
+        on the batch.
+        """
+        file_name, checksum = write_settlement_file(batch, withdrawal_requests)
+        try:
+            WithdrawalBatch.objects.filter(pk=batch.pk).update(file_name=file_name, checksum=checksum)
+        except DatabaseError:
+            settlement_storage().delete(file_name)
+            raise
+        batch.file_name, batch.checksum = file_name, checksum
+
+    @staticmethod
+    def bulk_reject_withdrawal_requests(withdrawal_requests, rejected_by=None) -> WithdrawalBatch:
+        """
+        Rejects every pending request in the ``withdrawal_requests`` queryset
+        in one database transaction and returns the held amounts to the
+        wallets, as ``reject_withdrawal_request`` does one at a time.
+        """
+        with transaction.atomic():
+            batch, rejected = WalletService._open_withdrawal_batch(
+                withdrawal_requests, WithdrawalBatch.Action.REJECT, rejected_by
+            )
+            released = defaultdict(Decimal)
+            for withdrawal_request in rejected:
+                released[withdrawal_request.user_id] += withdrawal_request.amount
+
+            wallets = list(
+                Wallet.objects.select_for_update().filter(user_id__in=released.keys()).order_by("id")
+            )
+            for wallet in wallets:
+                wallet.total_balance += released[wallet.user_id]
+                wallet.withdrawable_balance += released[wallet.user_id]
+            Wallet.objects.bulk_update(wallets, ["total_balance", "withdrawable_balance"], batch_size=500)
+
+            wallet_ids = {wallet.user_id: wallet.id for wallet in wallets}
+            ledger.post_entries(
+                [
+                    (
+                        "withdrawal_release",
+                        [
+                            (wallet_ids[withdrawal_request.user_id], ledger.Bucket.PENDING_WITHDRAWAL, -withdrawal_request.amount),
+                            (wallet_ids[withdrawal_request.user_id], ledger.Bucket.WITHDRAWABLE, withdrawal_request.amount),
+                        ],
+                        None,
+                        withdrawal_request,
+                        "",
+                    )
+                    for withdrawal_request in rejected
+                ]
+            )
+        return batch
+
+    @staticmethod
+    def process_transaction(
+        user,
+        amount: Decimal,
+        transaction_type: str,
+        description: str = "",
+        idempotency_key: str = None,
+        tournament=None,
+    ):
+        """
+        Applies one transaction to the user's wallet. When an
+        ``idempotency_key`` is given, a repeated call with the same key returns
+        the original Transaction without locking the wallet again; reusing
+        the key for another user, amount or type is rejected.
+        ``tournament`` attributes the transaction to a tournament and its game.
+        """
+        if idempotency_key:
+            existing = WalletService._replayed_transaction(idempotency_key, user, amount, transaction_type)
+            if existing:
+                return existing
+
         wallet = Wallet.objects.get(user=user)
         is_debit = transaction_type in [
             Transaction.TransactionType.WITHDRAWAL,
@@ -246,36 +482,131 @@ class WalletService:
             Transaction.TransactionType.TOKEN_SPENT,
         ]
 
+        try:
+            with transaction.atomic():
+                wallet_for_update = Wallet.objects.select_for_update().get(user=user)
+
+                if is_debit:
+                    if "token" in transaction_type:
+                        if wallet_for_update.token_balance < amount:
+                            raise ValidationError("موجودی توکن کافی نیست.")
+                        wallet_for_update.token_balance -= amount
+                    else:
+                        if wallet_for_update.withdrawable_balance < amount:
+                            raise ValidationError("موجودی قابل برداشت کافی نیست.")
+                        wallet_for_update.total_balance -= amount
+                        wallet_for_update.withdrawable_balance -= amount
+                else: # Credit
+                    if "token" in transaction_type:
+                        wallet_for_update.token_balance += amount
+                    else:
+                        wallet_for_update.total_balance += amount
+                        if transaction_type in [Transaction.TransactionType.DEPOSIT, Transaction.TransactionType.PRIZE]:
+                            wallet_for_update.withdrawable_balance += amount
+
+                wallet_for_update.save()
+
+                tx = Transaction.objects.create(
+                    wallet=wallet,
+                    amount=amount,
+                    transaction_type=transaction_type,
+                    description=description,
+                    status=Transaction.Status.SUCCESS,
+                    idempotency_key=idempotency_key,
+                    tournament=tournament,
+                    game_id=tournament.game_id if tournament else None,
+                )
+                ledger.post_transaction(tx)
+                return tx
+        except IntegrityError:
+            # A concurrent call with the same key committed first; its
+            # transaction stands and this one was rolled back.
+            if idempotency_key:
+                existing = WalletService._replayed_transaction(idempotency_key, user, amount, transaction_type)
+                if existing:
+                    return existing
+            raise
+
+    @staticmethod
+    def _replayed_transaction(idempotency_key: str, user, amount: Decimal, transaction_type: str):
+        """
+        The Transaction already recorded under ``idempotency_key``, if any.
+        Raises ValidationError when it was made for a different payload.
+        """
+        existing = (
+            Transaction.objects.filter(idempotency_key=idempotency_key).select_related("wallet").first()
+        )
+        if existing and (
+            existing.wallet.user_id != user.pk
+            or existing.amount != amount
+            or existing.transaction_type != transaction_type
+        ):
+            raise ValidationError("این کلید یکتایی قبلا برای تراکنش دیگری استفاده شده است.")
+        return existing
+
+    @staticmethod
+    def bulk_credit(credits, transaction_type: str, description: str = "", tournament=None):
+        """
+        Credits ``{user_id: amount}`` in one database transaction. Wallets are
+        locked in id order so concurrent batches cannot deadlock, and the
+        balances, Transactions and ledger entries are each written in bulk.
+        Returns the created Transactions.
+        """
+        if transaction_type in [
+            Transaction.TransactionType.WITHDRAWAL,
+            Transaction.TransactionType.ENTRY_FEE,
+            Transaction.TransactionType.TOKEN_SPENT,
+        ]:
+            raise ValueError(f"'{transaction_type}' is not a credit.")
+        credits = {user_id: amount for user_id, amount in credits.items() if amount > 0}
+        if not credits:
+            return []
+
         with transaction.atomic():
-            wallet_for_update = Wallet.objects.select_for_update().get(user=user)
+            wallets = list(
+                Wallet.objects.select_for_update()
+                .filter(user_id__in=credits.keys())
+                .order_by("id")
+            )
+            if len(wallets) != len(credits):
+                missing = set(credits) - {wallet.user_id for wallet in wallets}
+                raise ValidationError(f"کیف پول برای کاربران {sorted(missing)} یافت نشد.")
 
-            if is_debit:
-                if "token" in transaction_type:
-                    if wallet_for_update.token_balance < amount:
-                        raise ValidationError("موجودی توکن کافی نیست.")
-                    wallet_for_update.token_balance -= amount
-                else:
-                    if wallet_for_update.withdrawable_balance < amount:
-                        raise ValidationError("موجودی قابل برداشت کافی نیست.")
-                    wallet_for_update.total_balance -= amount
-                    wallet_for_update.withdrawable_balance -= amount
-            else: # Credit
+            for wallet in wallets:
+                amount = credits[wallet.user_id]
                 if "token" in transaction_type:
-                    wallet_for_update.token_balance += amount
+                    wallet.token_balance += amount
                 else:
-                    wallet_for_update.total_balance += amount
+                    wallet.total_balance += amount
                     if transaction_type in [Transaction.TransactionType.DEPOSIT, Transaction.TransactionType.PRIZE]:
-                        wallet_for_update.withdrawable_balance += amount
-
-            wallet_for_update.save()
+                        wallet.withdrawable_balance += amount
+            Wallet.objects.bulk_update(
+                wallets, ["total_balance", "withdrawable_balance", "token_balance"], batch_size=500
+            )
 
-            return Transaction.objects.create(
-                wallet=wallet,
-                amount=amount,
-                transaction_type=transaction_type,
-                description=description,
-                status=Transaction.Status.SUCCESS,
+            txs = Transaction.objects.bulk_create(
+                [
+                    Transaction(
+                        wallet=wallet,
+                        amount=credits[wallet.user_id],
+                        transaction_type=transaction_type,
+                        description=description,
+                        status=Transaction.Status.SUCCESS,
+                        tournament=tournament,
+                        game_id=tournament.game_id if tournament else None,
+                    )
+                    for wallet in wallets
+                ],
+                batch_size=500,
+            )
+            ledger.post_transactions(txs)
+            user_ids = [wallet.user_id for wallet in wallets]
+            transaction.on_commit(
+                lambda: invalidate_transaction_cache(
+                    user_ids, prize=transaction_type == Transaction.TransactionType.PRIZE
+                )
             )
+        return txs
 
     def create_refund_request(self, track_id: str, amount: Decimal):
         try:
@@ -312,3 +643,148 @@ class WalletService:
             return new_refund
         else:
             raise ValidationError(zibal_response.get("message", "خطا در استرداد وجه."))
+
+
+class DepositReconciler:
+    """
+    تراکنش‌های واریز معلق قدیمی که بازگشت (callback) آن‌ها هرگز نرسیده را
+    با استعلام از زیبال تسویه یا رد می‌کند.
+
+    Pending deposits are paged with keyset pagination over the
+    (status, timestamp) index. Each page is inquired concurrently through a
+    bounded thread pool and a shared per-second rate limit, and the outcomes
+    are then written back in batches.
+    """
+
+    # Zibal inquiry statuses: 1 paid and verified, 2 paid but not verified,
+    # -1 still waiting for the user. Everything else is a final failure.
+    PAID_VERIFIED = 1
+    PAID_UNVERIFIED = 2
+    AWAITING_PAYMENT = -1
+
+    def __init__(
+        self,
+        older_than=timedelta(minutes=30),
+        expire_after=timedelta(hours=2),
+        batch_size=200,
+        concurrency=4,
+        rate_per_second=10,
+    ):
+        self.older_than = older_than
+        self.expire_after = expire_after
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate_per_second)
+        self.zibal_service = ZibalService()
+
+    def stale_deposits(self, now):
+        return Transaction.objects.filter(
+            status=Transaction.Status.PENDING,
+            timestamp__lt=now - self.older_than,
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            authority__isnull=False,
+        )
+
+    def run(self):
+        now = timezone.now()
+        stale = self.stale_deposits(now)
+        metrics = {
+            "backlog": stale.count(),
+            "settled": 0,
+            "failed": 0,
+            "unresolved": 0,
+            "max_settle_latency": 0.0,
+            "avg_settle_latency": 0.0,
+        }
+        latencies = []
+        last = None
+        while True:
+            page = stale.order_by("timestamp", "id")
+            if last is not None:
+                page = page.filter(
+                    Q(timestamp__gt=last[0]) | Q(timestamp=last[0], id__gt=last[1])
+                )
+            rows = list(page.values("id", "authority", "amount", "timestamp")[: self.batch_size])
+            if not rows:
+                break
+            last = (rows[-1]["timestamp"], rows[-1]["id"])
+
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                outcomes = list(pool.map(self._resolve, rows))
+
+            paid = {row["id"]: ref for row, (state, ref) in zip(rows, outcomes) if state == "paid"}
+            failed = [
+                row["id"] for row, (state, _) in zip(rows, outcomes)
+                if state == "failed" or (state == "waiting" and row["timestamp"] < now - self.expire_after)
+            ]
+            settled_ids = self._settle(paid)
+            failed_count = Transaction.objects.filter(
+                id__in=failed, status=Transaction.Status.PENDING
+            ).update(status=Transaction.Status.FAILED, description="پرداخت توسط زیبال تایید نشد.")
+
+            metrics["settled"] += len(settled_ids)
+            metrics["failed"] += failed_count
+            metrics["unresolved"] += len(rows) - len(settled_ids) - failed_count
+            finished = settled_ids | set(failed)
+            latencies.extend(
+                (now - row["timestamp"]).total_seconds() for row in rows if row["id"] in finished
+            )
+
+        if latencies:
+            metrics["max_settle_latency"] = max(latencies)
+            metrics["avg_settle_latency"] = sum(latencies) / len(latencies)
+        metrics["finished_at"] = timezone.now().isoformat()
+        cache.set("wallet:deposit_reconciler:last_run", metrics, None)
+        logger.info("Deposit reconciliation finished.", extra=metrics)
+        return metrics
+
+    def _resolve(self, row):
+        """Returns ``(state, ref_number)`` for one pending deposit."""
+        try:
+            self.limiter.acquire()
+            inquiry = self.zibal_service.inquire_payment(int(row["authority"]))
+            status = inquiry.get("status")
+            if status == self.PAID_VERIFIED:
+                return "paid", inquiry.get("refNumber")
+            if status == self.PAID_UNVERIFIED:
+                self.limiter.acquire()
+                verification = self.zibal_service.verify_payment(
+                    track_id=int(row["authority"]), amount=int(row["amount"])
+                )
+                if verification.get("result") in [100, 201]:
+                    return "paid", verification.get("refNumber")
+                return "failed", None
+            if status == self.AWAITING_PAYMENT or inquiry.get("result") != 100:
+                return "waiting", None
+            return "failed", None
+        except (ValidationError, ValueError) as e:
+            logger.warning(f"Inquiry for deposit {row['id']} failed: {e}")
+            return "error", None
+
+    @staticmethod
+    def _settle(paid):
+        """Credits every still-pending paid deposit in one transaction."""
+        if not paid:
+            return set()
+        with transaction.atomic():
+            txs = list(
+                Transaction.objects.select_for_update()
+                .filter(id__in=paid.keys(), status=Transaction.Status.PENDING)
+                .order_by("id")
+            )
+            credits = defaultdict(Decimal)
+            for tx in txs:
+                credits[tx.wallet_id] += tx.amount
+                tx.status = Transaction.Status.SUCCESS
+                tx.ref_number = paid[tx.id]
+                tx.description = "پرداخت موفق (تسویه خودکار)"
+            wallets = list(
+                Wallet.objects.select_for_update().filter(id__in=credits.keys()).order_by("id")
+            )
+            for wallet in wallets:
+                wallet.total_balance += credits[wallet.id]
+                wallet.withdrawable_balance += credits[wallet.id]
+            Wallet.objects.bulk_update(wallets, ["total_balance", "withdrawable_balance"])
+            Transaction.objects.bulk_update(txs, ["status", "ref_number", "description"])
+            ledger.post_transactions(txs)
+        return {tx.id for tx in txs}
@@ -0,0 +1,71 @@
+"""
+Settlement files for approved withdrawal batches.
+
+The file lists each approved request with the destination sheba and card
+number, in the CSV layout finance uploads to the bank. It is written to a
+temporary file row by row, hashed on the way, then handed to the private
+storage, so memory does not grow with the batch size.
+"""
+import csv
+import hashlib
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+
+from .statements import Echo
+
+SETTLEMENT_FIELDS = [
+    "request_id",
+    "user_id",
+    "username",
+    "amount",
+    "sheba_number",
+    "card_number",
+    "requested_at",
+]
+
+
+def settlement_storage():
+    """
+    Settlement files hold bank details, so locally they go under
+    PRIVATE_MEDIA_ROOT, which is not served like MEDIA_ROOT.
+    """
+    if settings.STORAGE_BACKEND == "local":
+        return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+    return default_storage
+
+
+def settlement_lines(withdrawal_requests):
+    writer = csv.writer(Echo())
+    yield writer.writerow(SETTLEMENT_FIELDS)
+    for withdrawal_request in withdrawal_requests:
+        wallet = withdrawal_request.user.wallet
+        yield writer.writerow(
+            [
+                withdrawal_request.id,
+                withdrawal_request.user_id,
+                withdrawal_request.user.username,
+                withdrawal_request.amount,
+                wallet.sheba_number or "",
+                wallet.card_number or "",
+                withdrawal_request.created_at.isoformat(),
+            ]
+        )
+
+
+def write_settlement_file(batch, withdrawal_requests):
+    """
+    Saves the batch's settlement CSV and returns ``(file_name, sha256)``.
+    """
+    digest = hashlib.sha256()
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as buffer:
+        for line in settlement_lines(withdrawal_requests):
+            data = line.encode("utf-8")
+            digest.update(data)
+            buffer.write(data)
+        buffer.seek(0)
+        name = f"settlements/withdrawal-batch-{batch.id}-{batch.created_at:%Y%m%d%H%M%S}.csv"
+        file_name = settlement_storage().save(name, File(buffer))
+    return file_name, digest.hexdigest()
@@ -0,0 +1,73 @@
+"""
+Streaming wallet statements.
+
+A statement covers a wallet's whole history, including rows that
+archive_transactions has moved to TransactionArchive, so it is read with
+``.iterator(chunk_size=...)`` and written out one row at a time. Memory use
+stays the same however long the history is.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Transaction, TransactionArchive
+
+STATEMENT_FIELDS = [
+    "id",
+    "timestamp",
+    "transaction_type",
+    "amount",
+    "status",
+    "description",
+    "order_id",
+    "ref_number",
+    "tournament_id",
+]
+STATEMENT_CHUNK_SIZE = 2000
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def statement_rows(wallet, start_date=None, end_date=None, chunk_size=STATEMENT_CHUNK_SIZE):
+    """
+    Yields the wallet's transactions as dicts, oldest first. ``end_date`` is
+    inclusive.
+    """
+    filters = {}
+    if start_date:
+        filters["timestamp__gte"] = _day_start(start_date)
+    if end_date:
+        filters["timestamp__lt"] = _day_start(end_date + timedelta(days=1))
+
+    hot = Transaction.objects.filter(wallet=wallet, **filters).values(*STATEMENT_FIELDS)
+    archived = TransactionArchive.objects.filter(wallet_id=wallet.id, **filters).values(
+        *STATEMENT_FIELDS
+    )
+    queryset = hot.union(archived, all=True).order_by("timestamp", "id")
+    for row in queryset.iterator(chunk_size=chunk_size):
+        row["timestamp"] = timezone.localtime(row["timestamp"]).isoformat()
+        row["amount"] = str(row["amount"])
+        yield row
+
+
+class Echo:
+    """A file-like object whose write() hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_statement(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(STATEMENT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in STATEMENT_FIELDS])
+
+
+def ndjson_statement(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
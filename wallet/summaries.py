@@ -0,0 +1,130 @@
+"""
+Per-wallet monthly summaries of deposits, withdrawals, spends and winnings.
+
+Every successful Transaction is posted to the ledger, and ``post_entries``
+calls ``record_transactions`` in the same database transaction, so the
+WalletMonthlySummary rows stay in step with the history without a trigger
+per call site. Rows are bumped with one ``INSERT ... ON CONFLICT DO UPDATE``
+per batch, in (wallet, month) order so concurrent batches cannot deadlock.
+``rebuild_monthly_summaries`` recomputes them from the hot and archived
+transactions for the backfill.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Transaction, TransactionArchive, Wallet, WalletMonthlySummary
+
+SUMMARY_COLUMNS = {
+    Transaction.TransactionType.DEPOSIT: "deposits",
+    Transaction.TransactionType.WITHDRAWAL: "withdrawals",
+    Transaction.TransactionType.ENTRY_FEE: "spends",
+    Transaction.TransactionType.PRIZE: "winnings",
+}
+OUTGOING = {"withdrawals", "spends"}
+FIELDS = ["deposits", "withdrawals", "spends", "winnings", "net", "transaction_count"]
+UPSERT_BATCH_SIZE = 500
+
+
+def month_of(timestamp):
+    return timezone.localtime(timestamp).date().replace(day=1)
+
+
+def months_back(count, today=None):
+    """First days of the last ``count`` months, newest first."""
+    today = today or timezone.localdate()
+    index = today.year * 12 + today.month - 1
+    return [date((index - i) // 12, (index - i) % 12 + 1, 1) for i in range(count)]
+
+
+def _add(totals, wallet_id, transaction_type, month, amount, count=1):
+    column = SUMMARY_COLUMNS.get(transaction_type)
+    if column is None:
+        return
+    row = totals[(wallet_id, month)]
+    row[column] += amount
+    row["net"] += -amount if column in OUTGOING else amount
+    row["transaction_count"] += count
+
+
+def _new_totals():
+    return defaultdict(lambda: dict.fromkeys(FIELDS, Decimal("0")))
+
+
+def _upsert(totals):
+    table = WalletMonthlySummary._meta.db_table
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(name) for name in ["wallet_id", "month", *FIELDS])
+    updates = ", ".join(
+        f"{quote(name)} = {quote(table)}.{quote(name)} + excluded.{quote(name)}" for name in FIELDS
+    )
+    rows = sorted(totals.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            params = []
+            for (wallet_id, month), values in batch:
+                params += [wallet_id, connection.ops.adapt_datefield_value(month)]
+                params += [
+                    connection.ops.adapt_decimalfield_value(values[name], 20, 2) for name in FIELDS[:-1]
+                ]
+                params.append(int(values["transaction_count"]))
+            placeholders = ", ".join(["(" + ", ".join(["%s"] * (len(FIELDS) + 2)) + ")"] * len(batch))
+            cursor.execute(
+                f"INSERT INTO {quote(table)} ({columns}) VALUES {placeholders}"
+                f" ON CONFLICT (wallet_id, month) DO UPDATE SET {updates}",
+                params,
+            )
+
+
+def record_transactions(txs):
+    """Adds successful transactions to their wallets' monthly summaries."""
+    totals = _new_totals()
+    for tx in txs:
+        if tx.status == Transaction.Status.SUCCESS:
+            _add(totals, tx.wallet_id, tx.transaction_type, month_of(tx.timestamp), tx.amount)
+    if totals:
+        _upsert(totals)
+
+
+def rebuild_monthly_summaries(wallet_ids):
+    """
+    Recomputes the summaries of ``wallet_ids`` from scratch. The wallets are
+    locked meanwhile so transactions posted during the rebuild wait for it.
+    Returns the number of summary rows written.
+    """
+    totals = _new_totals()
+    with transaction.atomic():
+        locked = list(
+            Wallet.objects.select_for_update().filter(id__in=wallet_ids).order_by("id").values_list("id", flat=True)
+        )
+        WalletMonthlySummary.objects.filter(wallet_id__in=locked).delete()
+        for model in (Transaction, TransactionArchive):
+            grouped = (
+                model.objects.filter(
+                    wallet_id__in=locked,
+                    status=Transaction.Status.SUCCESS,
+                    transaction_type__in=list(SUMMARY_COLUMNS),
+                )
+                .annotate(month=TruncMonth("timestamp"))
+                .values("wallet_id", "transaction_type", "month")
+                .annotate(total=Sum("amount"), count=Count("id"))
+                .order_by()
+            )
+            for row in grouped:
+                _add(
+                    totals,
+                    row["wallet_id"],
+                    row["transaction_type"],
+                    month_of(row["month"]),
+                    row["total"],
+                    row["count"],
+                )
+        if totals:
+            _upsert(totals)
+    return len(totals)
@@ -1,9 +1,11 @@
 # This file is intentionally left blank to resolve an ImportError in the tests.
 from celery import shared_task
-from django.db import transaction
-from django.apps import apps
-from .services import ZibalService
-from .models import Transaction, Wallet
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+from .ledger import take_snapshots
+from .services import DepositReconciler, WalletService
+from .models import IdempotencyKey, Transaction
 from logging import getLogger
 
 logger = getLogger(__name__)
@@ -13,59 +15,58 @@ logger = getLogger(__name__)
 def verify_deposit_task(self, track_id, order_id):
     """
     Celery task to verify a deposit transaction with Zibal.
+
+    The Zibal round-trip happens outside any row lock; only the final wallet
+    credit is done under select_for_update. Gateway errors are retried, and
+    the outcome is pushed to the user over the notifications websocket.
     """
+    from notifications.services import send_notification
+
     try:
-        with transaction.atomic():
-            transaction_obj = Transaction.objects.select_for_update().get(
-                order_id=order_id, authority=track_id
-            )
-            if transaction_obj.status == "success":
-                logger.info(
-                    f"Transaction with order_id {order_id} has already been verified and processed."
-                )
-                return f"Transaction {order_id} already processed."
+        transaction_obj = WalletService.verify_and_process_deposit(
+            track_id=track_id, order_id=order_id
+        )
+    except Exception as exc:
+        logger.error(f"An error occurred during deposit verification for order {order_id}: {exc}")
+        raise self.retry(exc=exc, countdown=60)
 
-            zibal_service = ZibalService()
-            response = zibal_service.verify_payment(
-                track_id=track_id, amount=int(transaction_obj.amount)
-            )
+    if transaction_obj is None:
+        return f"Transaction {order_id} not found or already processed."
 
-            if response.get("result") in [100, 201]:
-                transaction_obj.status = "success"
-                transaction_obj.ref_number = response.get("refNumber")
-                transaction_obj.description = response.get(
-                    "description", "Payment successful"
-                )
+    if transaction_obj.status == Transaction.Status.SUCCESS:
+        message = f"کیف پول شما به مبلغ {int(transaction_obj.amount):,} ریال شارژ شد."
+    else:
+        message = "پرداخت شما تایید نشد."
+    send_notification(transaction_obj.wallet.user, message, "deposit_status")
+    return f"Verification for order {order_id} completed with status: {transaction_obj.status}"
 
-                wallet = Wallet.objects.select_for_update().get(
-                    id=transaction_obj.wallet_id
-                )
-                wallet.total_balance += transaction_obj.amount
-                wallet.withdrawable_balance += transaction_obj.amount
-                wallet.save(update_fields=["total_balance", "withdrawable_balance"])
-                transaction_obj.save(update_fields=["status", "ref_number", "description"])
 
-                logger.info(
-                    f"Successfully verified and updated wallet for order {order_id}."
-                )
-                return (
-                    f"Verification for order {order_id} completed with status: success"
-                )
+@shared_task
+def reconcile_stale_deposits_task():
+    """
+    Celery beat task that settles or fails deposits whose callback never arrived.
+    """
+    reconciler = DepositReconciler(
+        older_than=timedelta(minutes=settings.DEPOSIT_RECONCILE_AFTER_MINUTES),
+        concurrency=settings.DEPOSIT_RECONCILE_CONCURRENCY,
+        rate_per_second=settings.DEPOSIT_RECONCILE_RATE_PER_SECOND,
+    )
+    return reconciler.run()
 
-            else:
-                transaction_obj.status = "failed"
-                transaction_obj.description = response.get(
-                    "message", "Payment verification failed"
-                )
-                transaction_obj.save(update_fields=["status", "description"])
-                logger.warning(
-                    f"Payment verification failed for order {order_id}: {transaction_obj.description}"
-                )
-                return f"Verification for order {order_id} completed with status: failed"
 
-    except Transaction.DoesNotExist:
-        logger.error(f"Transaction with order_id {order_id} not found for verification.")
-        return f"Transaction with order_id {order_id} not found."
-    except Exception as exc:
-        logger.error(f"An error occurred during deposit verification for order {order_id}: {exc}")
-        raise self.retry(exc=exc, countdown=60)
+@shared_task
+def take_ledger_snapshots_task():
+    """
+    Celery beat task that rolls ledger balances forward into snapshots.
+    """
+    return take_snapshots()
+
+
+@shared_task
+def purge_idempotency_keys_task():
+    """
+    Celery beat task that deletes stored Idempotency-Key responses past their TTL.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -3,18 +3,22 @@ from decimal import Decimal
 from unittest.mock import Mock, patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import SimpleTestCase, TestCase, override_settings
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.settings import reload_api_settings
 from rest_framework.test import APIClient, APITestCase
 
-from .models import Transaction, Wallet, WithdrawalRequest
+from .models import (IdempotencyKey, Transaction, TransactionArchive, Wallet, WithdrawalBatch,
+                     WithdrawalRequest)
 from .serializers import (
     PaymentSerializer,
     CreateWithdrawalRequestSerializer,
     WithdrawalRequestSerializer,
 )
 from .services import ZibalService
+from .tasks import verify_deposit_task
 from django.conf import settings
 
 User = get_user_model()
@@ -108,6 +112,63 @@ class WalletAPITests(APITestCase):
         self.assertEqual(response.data["payment_url"], "http://payment-url.com")
         mock_create_deposit.assert_called_once()
 
+    @patch("wallet.views.WalletService.create_deposit")
+    def test_deposit_api_replays_idempotent_request(self, mock_create_deposit):
+        cache.clear()
+        mock_create_deposit.return_value = "http://payment-url.com"
+        self.client.force_authenticate(user=self.user)
+        with patch("wallet.views.DepositAPIView.throttle_classes", []):
+            first = self.client.post(
+                "/api/wallet/deposit/", {"amount": "50000"}, HTTP_IDEMPOTENCY_KEY="key-1"
+            )
+            cache.clear()  # The stored row alone must be enough to replay.
+            second = self.client.post(
+                "/api/wallet/deposit/", {"amount": "50000"}, HTTP_IDEMPOTENCY_KEY="key-1"
+            )
+            third = self.client.post(
+                "/api/wallet/deposit/", {"amount": "50000"}, HTTP_IDEMPOTENCY_KEY="key-1"
+            )
+
+        mock_create_deposit.assert_called_once()
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(third["Idempotent-Replayed"], "true")
+        self.assertEqual(IdempotencyKey.objects.get().status, IdempotencyKey.Status.COMPLETED)
+
+    @patch("wallet.views.WalletService.create_deposit")
+    def test_idempotency_key_reused_with_other_payload_is_rejected(self, mock_create_deposit):
+        cache.clear()
+        mock_create_deposit.return_value = "http://payment-url.com"
+        self.client.force_authenticate(user=self.user)
+        with patch("wallet.views.DepositAPIView.throttle_classes", []):
+            self.client.post(
+                "/api/wallet/deposit/", {"amount": "50000"}, HTTP_IDEMPOTENCY_KEY="key-2"
+            )
+            response = self.client.post(
+                "/api/wallet/deposit/", {"amount": "60000"}, HTTP_IDEMPOTENCY_KEY="key-2"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        mock_create_deposit.assert_called_once()
+
+    @patch("wallet.views.WalletService.create_deposit")
+    def test_failed_idempotent_request_can_be_retried(self, mock_create_deposit):
+        cache.clear()
+        mock_create_deposit.side_effect = [ValidationError("gateway down"), "http://payment-url.com"]
+        self.client.force_authenticate(user=self.user)
+        with patch("wallet.views.DepositAPIView.throttle_classes", []):
+            failed = self.client.post(
+                "/api/wallet/deposit/", {"amount": "50000"}, HTTP_IDEMPOTENCY_KEY="key-3"
+            )
+            retried = self.client.post(
+                "/api/wallet/deposit/", {"amount": "50000"}, HTTP_IDEMPOTENCY_KEY="key-3"
+            )
+
+        self.assertEqual(failed.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retried.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_create_deposit.call_count, 2)
+
     @patch("wallet.views.WalletService.create_withdrawal_request")
     def test_create_withdrawal_request_api_success(self, mock_create_withdrawal):
         # Mock the service to return a dummy WithdrawalRequest object
@@ -158,9 +219,9 @@ class WalletAPITests(APITestCase):
         # You can access the first argument of the first call to the mock like this:
         self.assertEqual(mock_reject.call_args[0][0].id, request.id)
 
-    @patch("wallet.views.WalletService.verify_and_process_deposit")
-    def test_verify_deposit_api_processes_immediately(self, mock_verify):
-        tx = Transaction.objects.create(
+    @patch("wallet.views.verify_deposit_task.delay")
+    def test_verify_deposit_api_enqueues_verification(self, mock_delay):
+        Transaction.objects.create(
             wallet=self.wallet,
             amount=Decimal("50000"),
             order_id="order1",
@@ -168,19 +229,63 @@ class WalletAPITests(APITestCase):
             status=Transaction.Status.PENDING,
         )
 
-        def mark_success(**kwargs):
-            Transaction.objects.filter(id=tx.id).update(status=Transaction.Status.SUCCESS)
+        url = "/api/wallet/verify-deposit/?trackId=track1&success=1&orderId=order1"
+        response = self.client.get(url)
 
-        mock_verify.side_effect = mark_success
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertTrue(response.url.startswith(settings.ZIBAL_PAYMENT_PENDING_URL))
+        mock_delay.assert_called_once_with("track1", "order1")
 
-        url = f"/api/wallet/verify-deposit/?trackId=track1&success=1&orderId=order1"
+    @patch("wallet.views.verify_deposit_task.delay")
+    def test_verify_deposit_api_ignores_unknown_transaction(self, mock_delay):
+        url = "/api/wallet/verify-deposit/?trackId=nope&success=1&orderId=nope"
         response = self.client.get(url)
 
-        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
-        mock_verify.assert_called_once_with(track_id="track1", order_id="order1")
+        self.assertEqual(response.url, settings.ZIBAL_PAYMENT_FAILED_URL)
+        mock_delay.assert_not_called()
+
+    @patch("notifications.services.send_notification")
+    @patch("wallet.services.ZibalService")
+    def test_verify_deposit_task_credits_wallet_and_notifies(self, MockZibalService, mock_notify):
+        MockZibalService.return_value.verify_payment.return_value = {"result": 100, "refNumber": "r1"}
+        tx = Transaction.objects.create(
+            wallet=self.wallet,
+            amount=Decimal("50000"),
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            order_id="order2",
+            authority="track2",
+        )
+
+        verify_deposit_task.apply(args=("track2", "order2"))
 
         tx.refresh_from_db()
+        self.wallet.refresh_from_db()
         self.assertEqual(tx.status, Transaction.Status.SUCCESS)
+        self.assertEqual(self.wallet.total_balance, Decimal("50000"))
+        mock_notify.assert_called_once()
+        self.assertEqual(mock_notify.call_args[0][2], "deposit_status")
+
+    def test_deposit_status_is_scoped_to_owner(self):
+        Transaction.objects.create(
+            wallet=self.other_wallet,
+            amount=Decimal("1000"),
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            order_id="theirs",
+        )
+        Transaction.objects.create(
+            wallet=self.wallet,
+            amount=Decimal("1000"),
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            order_id="mine",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get("/api/wallet/deposit-status/?orderId=mine")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], Transaction.Status.PENDING)
+
+        response = self.client.get("/api/wallet/deposit-status/?orderId=theirs")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_wallet_list_scoped_to_request_user(self):
         self.client.force_authenticate(user=self.user)
@@ -214,3 +319,115 @@ class WalletAPITests(APITestCase):
         response = self.client.get(f"/api/wallet/transactions/{transaction.id}/")
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def _statement(self, **params):
+        with patch("wallet.views.WalletStatementAPIView.throttle_classes", []):
+            response = self.client.get("/api/wallet/statement/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_statement_streams_csv_in_date_range(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        old = Transaction.objects.create(
+            wallet=self.wallet, amount=Decimal("10"), transaction_type="deposit", status="success"
+        )
+        Transaction.objects.filter(id=old.id).update(timestamp=timezone.now() - timedelta(days=30))
+        archived = TransactionArchive.objects.create(
+            id=old.id + 1000, wallet_id=self.wallet.id, amount=Decimal("5"), transaction_type="deposit",
+            timestamp=timezone.now() - timedelta(days=400), status="success", archived_at=timezone.now(),
+        )
+        recent = Transaction.objects.create(
+            wallet=self.wallet, amount=Decimal("25.50"), transaction_type="prize",
+            status="success", description="جایزه",
+        )
+        Transaction.objects.create(
+            wallet=self.other_wallet, amount=Decimal("99"), transaction_type="deposit", status="success"
+        )
+        self.client.force_authenticate(user=self.user)
+
+        response, body = self._statement()
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        lines = body.strip().splitlines()
+        self.assertEqual(lines[0].split(",")[:4], ["id", "timestamp", "transaction_type", "amount"])
+        self.assertEqual([line.split(",")[0] for line in lines[1:]], [str(archived.id), str(old.id), str(recent.id)])
+
+        start = (timezone.localdate() - timedelta(days=1)).isoformat()
+        _, body = self._statement(start_date=start)
+        self.assertEqual(len(body.strip().splitlines()), 2)
+        self.assertIn("جایزه", body)
+
+    def test_statement_ndjson_and_staff_access(self):
+        Transaction.objects.create(
+            wallet=self.other_wallet, amount=Decimal("99"), transaction_type="deposit", status="success"
+        )
+        self.client.force_authenticate(user=self.user)
+        with patch("wallet.views.WalletStatementAPIView.throttle_classes", []):
+            denied = self.client.get("/api/wallet/statement/", {"user_id": self.other_user.id})
+        self.assertEqual(denied.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.admin)
+        response, body = self._statement(user_id=self.other_user.id, file_format="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row["amount"], row["transaction_type"]) for row in rows], [("99.00", "deposit")])
+
+    def test_bulk_withdrawal_action_and_settlement_download(self):
+        import tempfile
+
+        from .services import WalletService
+
+        WalletService.process_transaction(self.user, Decimal("10000000"), Transaction.TransactionType.DEPOSIT)
+        withdrawal = WalletService(self.user).create_withdrawal_request(
+            Decimal("6000000"), "6037991234567890", "IR000000000000000000000000"
+        )
+        self.client.force_authenticate(user=self.admin)
+        with tempfile.TemporaryDirectory() as private_root, override_settings(
+            STORAGE_BACKEND="local", PRIVATE_MEDIA_ROOT=private_root
+        ), patch("wallet.views.AdminWithdrawalRequestViewSet.throttle_classes", []), patch(
+            "wallet.views.AdminWithdrawalBatchViewSet.throttle_classes", []
+        ):
+            missing_filter = self.client.post(
+                "/api/wallet/admin/withdrawal-requests/bulk/", {"action": "approve"}, format="json"
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/api/wallet/admin/withdrawal-requests/bulk/",
+                    {"action": "approve", "ids": [withdrawal.id]},
+                    format="json",
+                )
+            download = self.client.get(
+                f"/api/wallet/admin/withdrawal-batches/{response.data['id']}/settlement-file/"
+            )
+            content = b"".join(download.streaming_content)
+
+        self.assertEqual(missing_filter.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["request_count"], 1)
+        # The settlement file is written once the approval commits.
+        batch = WithdrawalBatch.objects.get(id=response.data["id"])
+        self.assertEqual(download["X-Checksum-SHA256"], batch.checksum)
+        self.assertIn(b"6037991234567890", content)
+        withdrawal.refresh_from_db()
+        self.assertEqual(withdrawal.status, WithdrawalRequest.Status.APPROVED)
+
+    def test_monthly_summary_returns_last_twelve_months(self):
+        from django.utils import timezone
+
+        from .services import WalletService
+
+        WalletService.process_transaction(self.user, Decimal("2500"), Transaction.TransactionType.DEPOSIT)
+        WalletService.process_transaction(self.other_user, Decimal("9999"), Transaction.TransactionType.DEPOSIT)
+        self.client.force_authenticate(user=self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/wallet/summary/monthly/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual(response.data[0]["month"], timezone.localdate().replace(day=1).isoformat())
+        self.assertEqual((response.data[0]["deposits"], response.data[0]["net"]), ("2500.00", "2500.00"))
+        self.assertEqual(response.data[1]["transaction_count"], 0)
@@ -1,13 +1,31 @@
+import hashlib
+import tempfile
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch, MagicMock
-
-from django.test import TestCase
+import requests
+from django.db import DatabaseError, transaction
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError, NotFound
 
-from .models import Wallet, WithdrawalRequest, Transaction
-from .services import WalletService
+from tournaments.models import Game, Tournament
+
+from .fake_zibal import FakeZibalServer
+from . import gateway
+from .gateway import CircuitBreaker, CircuitOpenError, RateLimiter
+from . import ledger
+from .models import (LedgerEntry, LedgerLine, LedgerSnapshot, Refund, Transaction,
+                     TransactionArchive, Wallet, WalletMonthlySummary, WithdrawalBatch,
+                     WithdrawalRequest)
+from .settlements import settlement_storage
+from .services import DepositReconciler, WalletService, ZibalService
 
 User = get_user_model()
 
@@ -221,6 +239,27 @@ class WalletServiceTests(TestCase):
             self.wallet.total_balance, Decimal("75000")
         )
 
+    @patch("wallet.services.ZibalService")
+    def test_verify_and_process_deposit_raises_database_errors(self, MockZibalService):
+        MockZibalService.return_value.verify_payment.return_value = {"result": 100}
+        tx = Transaction.objects.create(
+            wallet=self.wallet,
+            amount=Decimal("50000"),
+            order_id="order-locked",
+            authority="track-locked",
+            status=Transaction.Status.PENDING,
+        )
+        initial_balance = self.wallet.total_balance
+
+        with patch("wallet.services.ledger.post_transaction", side_effect=DatabaseError("lock timeout")):
+            with self.assertRaises(DatabaseError):
+                WalletService.verify_and_process_deposit(track_id="track-locked", order_id="order-locked")
+
+        tx.refresh_from_db()
+        self.wallet.refresh_from_db()
+        self.assertEqual(tx.status, Transaction.Status.PENDING)
+        self.assertEqual(self.wallet.total_balance, initial_balance)
+
     @patch("wallet.services.ZibalService")
     def test_verify_and_process_deposit_non_pending_ignored(self, MockZibalService):
         mock_zibal = MockZibalService.return_value
@@ -265,6 +304,34 @@ class WalletServiceTests(TestCase):
         self.wallet.refresh_from_db()
         self.assertEqual(self.wallet.total_balance, initial_balance + Decimal("500"))
 
+    def test_process_transaction_with_idempotency_key_applies_once(self):
+        initial_balance = self.wallet.total_balance
+        first = WalletService.process_transaction(
+            self.user, Decimal("500"), Transaction.TransactionType.PRIZE, "Prize", idempotency_key="prize-1"
+        )
+        with patch("wallet.services.Wallet.objects.select_for_update") as mock_lock:
+            second = WalletService.process_transaction(
+                self.user, Decimal("500"), Transaction.TransactionType.PRIZE, "Prize", idempotency_key="prize-1"
+            )
+        mock_lock.assert_not_called()
+        self.wallet.refresh_from_db()
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(self.wallet.total_balance, initial_balance + Decimal("500"))
+
+    def test_process_transaction_rejects_a_key_reused_for_another_payload(self):
+        WalletService.process_transaction(
+            self.user, Decimal("500"), Transaction.TransactionType.PRIZE, "Prize", idempotency_key="prize-2"
+        )
+        with self.assertRaises(ValidationError):
+            WalletService.process_transaction(
+                self.user, Decimal("700"), Transaction.TransactionType.PRIZE, "Prize", idempotency_key="prize-2"
+            )
+        with self.assertRaises(ValidationError):
+            WalletService.process_transaction(
+                self.user, Decimal("500"), Transaction.TransactionType.DEPOSIT, "Prize", idempotency_key="prize-2"
+            )
+        self.assertEqual(Transaction.objects.filter(idempotency_key="prize-2").count(), 1)
+
     def test_process_transaction_insufficient_funds(self):
         self.wallet.withdrawable_balance = Decimal("100")
         self.wallet.save()
@@ -272,3 +339,488 @@ class WalletServiceTests(TestCase):
             WalletService.process_transaction(
                 self.user, Decimal("200"), Transaction.TransactionType.ENTRY_FEE
             )
+
+
+@patch("wallet.gateway.backoff_delay", return_value=0)
+class ZibalClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeZibalServer().start()
+        self.addCleanup(self.server.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker_patch = patch("wallet.services.zibal_breaker", self.breaker)
+        breaker_patch.start()
+        self.addCleanup(breaker_patch.stop)
+        settings_override = override_settings(
+            ZIBAL_GATEWAY_BASE_URL=self.server.base_url,
+            ZIBAL_API_BASE_URL=self.server.base_url,
+            ZIBAL_ACCESS_TOKEN="test_token",
+            ZIBAL_MAX_RETRIES=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.service = ZibalService()
+
+    def test_verify_retries_and_reuses_connection(self, _):
+        track_id = self.service.create_payment(1000, "test", "http://cb", "order-1")["trackId"]
+        self.server.fail_next = 2
+
+        response = self.service.verify_payment(track_id, 1000)
+
+        self.assertEqual(response["result"], 100)
+        self.assertEqual(self.server.requests.count("/v1/verify"), 3)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_payment_request_is_not_retried(self, _):
+        self.server.fail_next = 1
+        with self.assertRaises(ValidationError):
+            self.service.create_payment(1000, "test", "http://cb", "order-2")
+        self.assertEqual(self.server.requests, ["/v1/request"])
+
+    def test_circuit_opens_and_fails_fast(self, _):
+        self.server.fail_next = 2
+        for _attempt in range(2):
+            with self.assertRaises(ValidationError):
+                self.service.request_refund(1, 1000)
+        self.assertTrue(self.breaker.is_open)
+
+        with self.assertRaises(ValidationError):
+            self.service.request_refund(1, 1000)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_slow_gateway_times_out(self, _):
+        self.server.latency = 0.5
+        with override_settings(ZIBAL_READ_TIMEOUT=0.1, ZIBAL_MAX_RETRIES=0):
+            service = ZibalService()
+            with self.assertRaises(ValidationError):
+                service.create_payment(1000, "test", "http://cb", "order-3")
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_half_open_trial_closes_or_reopens(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        now[0] = 11
+        breaker.before_call()
+        # Only one trial call is allowed while it is in flight.
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        now[0] = 22
+        breaker.before_call()
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+
+    def test_unexpected_request_error_settles_the_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 11
+
+        with patch("wallet.gateway.get_session") as get_session:
+            get_session.return_value.request.side_effect = requests.exceptions.InvalidURL("bad url")
+            with self.assertRaises(requests.exceptions.InvalidURL):
+                gateway.send("GET", "http://zibal", breaker, timeout=1, retries=2)
+
+        # The failed trial reopened the circuit instead of leaving it half-open.
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        now[0] = 22
+        breaker.before_call()
+
+
+    def test_server_errors_count_as_failures(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+
+        with patch("wallet.gateway.get_session") as get_session:
+            get_session.return_value.request.return_value.status_code = 500
+            response = gateway.send("GET", "http://zibal", breaker, timeout=1, retries=2)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(get_session.return_value.request.call_count, 1)
+        self.assertTrue(breaker.is_open)
+
+class DepositReconcilerTests(TestCase):
+    def setUp(self):
+        self.server = FakeZibalServer().start()
+        self.addCleanup(self.server.stop)
+        breaker_patch = patch("wallet.services.zibal_breaker", CircuitBreaker())
+        breaker_patch.start()
+        self.addCleanup(breaker_patch.stop)
+        settings_override = override_settings(ZIBAL_GATEWAY_BASE_URL=self.server.base_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(
+            username="reconcile", password="password", phone_number="+989125550000"
+        )
+        self.wallet = Wallet.objects.get(user=self.user)
+        self.zibal = ZibalService()
+
+    def _deposit(self, amount, zibal_status, age):
+        track_id = self.zibal.create_payment(amount, "test", "http://cb", str(amount))["trackId"]
+        self.server.payments[track_id]["status"] = zibal_status
+        tx = Transaction.objects.create(
+            wallet=self.wallet,
+            amount=Decimal(amount),
+            transaction_type=Transaction.TransactionType.DEPOSIT,
+            order_id=f"order-{track_id}",
+            authority=str(track_id),
+        )
+        Transaction.objects.filter(id=tx.id).update(timestamp=timezone.now() - age)
+        return tx
+
+    def test_settles_paid_and_fails_cancelled_deposits(self):
+        paid = self._deposit(1000, 2, timedelta(hours=1))
+        cancelled = self._deposit(2000, 3, timedelta(hours=1))
+        abandoned = self._deposit(3000, -1, timedelta(hours=3))
+        waiting = self._deposit(4000, -1, timedelta(hours=1))
+        recent = self._deposit(5000, 2, timedelta(minutes=5))
+
+        metrics = DepositReconciler(batch_size=2, rate_per_second=1000).run()
+
+        self.assertEqual(metrics["backlog"], 4)
+        self.assertEqual(metrics["settled"], 1)
+        self.assertEqual(metrics["failed"], 2)
+        self.assertEqual(metrics["unresolved"], 1)
+        statuses = dict(Transaction.objects.values_list("id", "status"))
+        self.assertEqual(statuses[paid.id], Transaction.Status.SUCCESS)
+        self.assertEqual(statuses[cancelled.id], Transaction.Status.FAILED)
+        self.assertEqual(statuses[abandoned.id], Transaction.Status.FAILED)
+        self.assertEqual(statuses[waiting.id], Transaction.Status.PENDING)
+        self.assertEqual(statuses[recent.id], Transaction.Status.PENDING)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.total_balance, Decimal("1000"))
+        self.assertEqual(self.server.payments[int(paid.authority)]["status"], 1)
+
+    def test_gateway_errors_leave_deposits_pending(self):
+        tx = self._deposit(1000, 1, timedelta(hours=1))
+        self.server.failure_rate = 1.0
+
+        with patch("wallet.gateway.backoff_delay", return_value=0):
+            metrics = DepositReconciler(rate_per_second=1000).run()
+
+        self.assertEqual(metrics["unresolved"], 1)
+        tx.refresh_from_db()
+        self.assertEqual(tx.status, Transaction.Status.PENDING)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_spaces_calls_by_rate(self):
+        now = [0.0]
+        slept = []
+        limiter = RateLimiter(4, clock=lambda: now[0], sleep=slept.append)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(slept, [0.25, 0.5])
+
+
+@override_settings(MINIMUM_WITHDRAWAL_AMOUNT=100)
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="ledger", password="password", phone_number="+989126660000"
+        )
+        self.wallet = Wallet.objects.get(user=self.user)
+
+    def _assert_ledger_matches_wallet(self):
+        self.wallet.refresh_from_db()
+        expected = ledger.wallet_columns(ledger.ledger_balances([self.wallet.id])[self.wallet.id])
+        self.assertEqual(expected["total_balance"], self.wallet.total_balance)
+        self.assertEqual(expected["withdrawable_balance"], self.wallet.withdrawable_balance)
+        self.assertEqual(expected["token_balance"], self.wallet.token_balance)
+
+    def test_every_wallet_mutation_is_posted_balanced(self):
+        WalletService.process_transaction(self.user, Decimal("5000"), Transaction.TransactionType.DEPOSIT)
+        WalletService.process_transaction(self.user, Decimal("300"), Transaction.TransactionType.ENTRY_FEE)
+        WalletService.process_transaction(self.user, Decimal("50"), Transaction.TransactionType.TOKEN_SPENT)
+        service = WalletService(self.user)
+        rejected = service.create_withdrawal_request(Decimal("1000"), "6037991234567890", "IR000000000000000000000000")
+        WalletService.reject_withdrawal_request(rejected)
+        WithdrawalRequest.objects.filter(id=rejected.id).update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        approved = service.create_withdrawal_request(Decimal("2000"), "6037991234567890", "IR000000000000000000000000")
+        WalletService.approve_withdrawal_request(approved)
+
+        self._assert_ledger_matches_wallet()
+        self.assertEqual(self.wallet.withdrawable_balance, Decimal("2700"))
+        for entry in LedgerEntry.objects.prefetch_related("lines"):
+            self.assertEqual(sum(line.amount for line in entry.lines.all()), 0)
+        held = ledger.ledger_balances([self.wallet.id])[self.wallet.id][LedgerLine.Bucket.PENDING_WITHDRAWAL]
+        self.assertEqual(held, 0)
+
+    def test_balance_is_snapshot_plus_recent_lines(self):
+        WalletService.process_transaction(self.user, Decimal("5000"), Transaction.TransactionType.DEPOSIT)
+        with patch("wallet.ledger.SNAPSHOT_LAG", timedelta(0)):
+            self.assertGreater(ledger.take_snapshots(), 0)
+        WalletService.process_transaction(self.user, Decimal("700"), Transaction.TransactionType.PRIZE)
+
+        snapshot = LedgerSnapshot.objects.get(wallet=self.wallet, bucket=LedgerLine.Bucket.WITHDRAWABLE)
+        self.assertEqual(snapshot.balance, Decimal("5000"))
+        self._assert_ledger_matches_wallet()
+
+    def test_balances_use_each_accounts_latest_snapshot_in_two_queries(self):
+        other = User.objects.create_user(username="ledger2", password="password", phone_number="+989126660001")
+        WalletService.process_transaction(self.user, Decimal("5000"), Transaction.TransactionType.DEPOSIT)
+        with patch("wallet.ledger.SNAPSHOT_LAG", timedelta(0)):
+            ledger.take_snapshots()
+            WalletService.process_transaction(other, Decimal("900"), Transaction.TransactionType.DEPOSIT)
+            ledger.take_snapshots()
+        WalletService.process_transaction(self.user, Decimal("700"), Transaction.TransactionType.PRIZE)
+        WalletService.process_transaction(other, Decimal("40"), Transaction.TransactionType.TOKEN_EARNED)
+
+        wallets = [self.wallet, Wallet.objects.get(user=other)]
+        with self.assertNumQueries(2):
+            balances = ledger.ledger_balances([wallet.id for wallet in wallets])
+        for wallet in wallets:
+            wallet.refresh_from_db()
+            columns = ledger.wallet_columns(balances[wallet.id])
+            self.assertEqual(columns["withdrawable_balance"], wallet.withdrawable_balance)
+            self.assertEqual(columns["token_balance"], wallet.token_balance)
+
+    def test_entry_fee_refunds_are_paid_by_the_platform(self):
+        tournament = Tournament.objects.create(
+            name="Ledger Cup",
+            game=Game.objects.create(name="Ledger Game"),
+            start_date=timezone.now(),
+            end_date=timezone.now() + timedelta(days=1),
+        )
+        WalletService.process_transaction(self.user, Decimal("5000"), Transaction.TransactionType.DEPOSIT)
+        WalletService.bulk_credit(
+            {self.user.id: Decimal("300")}, Transaction.TransactionType.DEPOSIT, tournament=tournament
+        )
+
+        totals = dict(
+            LedgerLine.objects.filter(wallet_id__isnull=True)
+            .values_list("bucket")
+            .annotate(total=Sum("amount"))
+        )
+        self.assertEqual(totals[LedgerLine.Bucket.GATEWAY], Decimal("-5000"))
+        self.assertEqual(totals[LedgerLine.Bucket.PLATFORM], Decimal("-300"))
+        self.assertTrue(LedgerEntry.objects.filter(kind=ledger.REFUND_KIND).exists())
+        self._assert_ledger_matches_wallet()
+
+    def test_reconcile_command_flags_drift(self):
+        Wallet.objects.filter(id=self.wallet.id).update(withdrawable_balance=Decimal("999"))
+        out = StringIO()
+        call_command("reconcile_ledger", stdout=out)
+        self.assertIn(f"Wallet {self.wallet.id} drift", out.getvalue())
+        self.assertIn("1 with drift", out.getvalue())
+
+
+class BulkWithdrawalTests(TestCase):
+    def setUp(self):
+        self.private_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.private_root.cleanup)
+        overrides = override_settings(STORAGE_BACKEND="local", PRIVATE_MEDIA_ROOT=self.private_root.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.admin = User.objects.create_superuser(username="finance", password="p", phone_number="+989127770000")
+        self.requests = []
+        for i in range(3):
+            user = User.objects.create_user(username=f"payee{i}", password="p", phone_number=f"+98912777000{i + 1}")
+            WalletService.process_transaction(user, Decimal("10000000"), Transaction.TransactionType.DEPOSIT)
+            self.requests.append(
+                WalletService(user).create_withdrawal_request(
+                    Decimal("6000000"), f"603799123456789{i}", f"IR00000000000000000000000{i}"
+                )
+            )
+
+    def _assert_ledger_matches_wallets(self, batch):
+        wallets = list(Wallet.objects.filter(user__withdrawal_requests__batch=batch))
+        balances = ledger.ledger_balances([wallet.id for wallet in wallets])
+        for wallet in wallets:
+            columns = ledger.wallet_columns(balances[wallet.id])
+            self.assertEqual(columns["withdrawable_balance"], wallet.withdrawable_balance)
+            self.assertEqual(balances[wallet.id][LedgerLine.Bucket.PENDING_WITHDRAWAL], 0)
+
+    def test_bulk_approve_posts_payouts_and_writes_settlement_file(self):
+        already_rejected = self.requests[2]
+        WalletService.reject_withdrawal_request(already_rejected)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            batch = WalletService.bulk_approve_withdrawal_requests(
+                WithdrawalRequest.objects.all(), approved_by=self.admin
+            )
+
+        self.assertEqual((batch.request_count, batch.total_amount), (2, Decimal("12000000")))
+        self.assertEqual(
+            set(WithdrawalRequest.objects.filter(batch=batch).values_list("status", flat=True)),
+            {WithdrawalRequest.Status.APPROVED},
+        )
+        self.assertEqual(
+            Transaction.objects.filter(transaction_type=Transaction.TransactionType.WITHDRAWAL).count(), 2
+        )
+        self.assertEqual(LedgerEntry.objects.filter(kind="withdrawal_payout").count(), 2)
+        self._assert_ledger_matches_wallets(batch)
+
+        with settlement_storage().open(batch.file_name, "rb") as settlement:
+            content = settlement.read()
+        self.assertEqual(hashlib.sha256(content).hexdigest(), batch.checksum)
+        lines = content.decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:4], ["request_id", "user_id", "username", "amount"])
+        self.assertEqual(len(lines), 3)
+        self.assertIn("IR000000000000000000000000", lines[1])
+
+    def test_rolled_back_approval_writes_no_settlement_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    batch = WalletService.bulk_approve_withdrawal_requests(
+                        WithdrawalRequest.objects.all(), approved_by=self.admin
+                    )
+                    raise RuntimeError("approval aborted")
+
+        self.assertEqual(batch.file_name, "")
+        self.assertFalse(WithdrawalBatch.objects.exists())
+        self.assertFalse(settlement_storage().exists("settlements"))
+
+    def test_settlement_file_is_removed_if_it_cannot_be_recorded(self):
+        with patch("wallet.services.WithdrawalBatch.objects.filter", side_effect=DatabaseError("gone")):
+            with self.assertRaises(DatabaseError):
+                with self.captureOnCommitCallbacks(execute=True):
+                    WalletService.bulk_approve_withdrawal_requests(
+                        WithdrawalRequest.objects.all(), approved_by=self.admin
+                    )
+
+        self.assertEqual(settlement_storage().listdir("settlements")[1], [])
+
+    def test_bulk_credit_invalidates_cached_dashboards(self):
+        users = [withdrawal_request.user for withdrawal_request in self.requests]
+        dashboards = [f"dashboard:user:{user.id}" for user in users]
+        cache.set_many({key: "stale" for key in [*dashboards, "top_players:prize", "stats:total_prize_money"]})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.bulk_credit({users[0].id: Decimal("500")}, Transaction.TransactionType.PRIZE)
+        self.assertEqual(cache.get_many([*dashboards, "top_players:prize", "stats:total_prize_money"]).keys(),
+                         set(dashboards[1:]))
+
+    def test_bulk_approve_invalidates_cached_dashboards(self):
+        dashboards = [f"dashboard:user:{r.user_id}" for r in self.requests]
+        cache.set_many({key: "stale" for key in dashboards})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.bulk_approve_withdrawal_requests(WithdrawalRequest.objects.all(), approved_by=self.admin)
+        self.assertEqual(cache.get_many(dashboards), {})
+
+    def test_bulk_reject_releases_holds(self):
+        batch = WalletService.bulk_reject_withdrawal_requests(
+            WithdrawalRequest.objects.filter(id__in=[r.id for r in self.requests[:2]]), rejected_by=self.admin
+        )
+
+        self.assertEqual(batch.action, WithdrawalBatch.Action.REJECT)
+        self.assertEqual(batch.file_name, "")
+        for withdrawal_request in self.requests[:2]:
+            withdrawal_request.refresh_from_db()
+            self.assertEqual(withdrawal_request.status, WithdrawalRequest.Status.REJECTED)
+            self.assertEqual(withdrawal_request.user.wallet.withdrawable_balance, Decimal("10000000"))
+        self.assertEqual(LedgerEntry.objects.filter(kind="withdrawal_release").count(), 2)
+        self._assert_ledger_matches_wallets(batch)
+
+        with self.assertRaises(ValidationError):
+            WalletService.bulk_reject_withdrawal_requests(
+                WithdrawalRequest.objects.filter(id=self.requests[0].id)
+            )
+
+
+class WalletMonthlySummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="summary", password="p", phone_number="+989128880000")
+        self.wallet = self.user.wallet
+
+    def _summary_values(self):
+        return list(
+            WalletMonthlySummary.objects.filter(wallet=self.wallet).values_list(
+                "month", "deposits", "withdrawals", "spends", "winnings", "net", "transaction_count"
+            )
+        )
+
+    def test_posted_transactions_roll_into_the_month(self):
+        WalletService.process_transaction(self.user, Decimal("5000000"), Transaction.TransactionType.DEPOSIT)
+        WalletService.process_transaction(self.user, Decimal("300"), Transaction.TransactionType.ENTRY_FEE)
+        WalletService.process_transaction(self.user, Decimal("50"), Transaction.TransactionType.TOKEN_EARNED)
+        WalletService.bulk_credit({self.user.id: Decimal("700")}, Transaction.TransactionType.PRIZE)
+        withdrawal = WalletService(self.user).create_withdrawal_request(
+            settings.MINIMUM_WITHDRAWAL_AMOUNT, "6037991234567890", "IR000000000000000000000000"
+        )
+        WalletService.approve_withdrawal_request(withdrawal)
+
+        month = timezone.localdate().replace(day=1)
+        withdrawn = settings.MINIMUM_WITHDRAWAL_AMOUNT
+        self.assertEqual(
+            self._summary_values(),
+            [(month, Decimal("5000000"), withdrawn, Decimal("300"), Decimal("700"),
+              Decimal("5000400") - withdrawn, 4)],
+        )
+
+    def test_backfill_rebuilds_from_hot_and_archived_rows(self):
+        WalletService.process_transaction(self.user, Decimal("1000"), Transaction.TransactionType.DEPOSIT)
+        old = WalletService.process_transaction(self.user, Decimal("400"), Transaction.TransactionType.PRIZE)
+        Transaction.objects.filter(id=old.id).update(timestamp=timezone.now() - timedelta(days=800))
+        call_command("archive_transactions", stdout=StringIO())
+        WalletMonthlySummary.objects.all().delete()
+
+        out = StringIO()
+        call_command("backfill_wallet_summaries", stdout=out)
+
+        archived_month = timezone.localtime(TransactionArchive.objects.get().timestamp).date().replace(day=1)
+        self.assertEqual(
+            [(month, deposits, winnings, count) for month, deposits, _, _, winnings, _, count in self._summary_values()],
+            [
+                (timezone.localdate().replace(day=1), Decimal("1000"), Decimal("0"), 1),
+                (archived_month, Decimal("0"), Decimal("400"), 1),
+            ],
+        )
+        self.assertIn("Rebuilt 2 monthly summaries", out.getvalue())
+
+
+class ArchiveTransactionsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="archiver", password="p", phone_number="+989121110000")
+        self.wallet = self.user.wallet
+
+    def _tx(self, days_ago, status=Transaction.Status.SUCCESS, **extra):
+        tx = Transaction.objects.create(
+            wallet=self.wallet,
+            amount=Decimal("100"),
+            transaction_type=Transaction.TransactionType.PRIZE,
+            status=status,
+            **extra,
+        )
+        Transaction.objects.filter(id=tx.id).update(timestamp=timezone.now() - timedelta(days=days_ago))
+        return tx
+
+    def test_moves_only_old_settled_transactions(self):
+        old = self._tx(800, description="old prize")
+        pending = self._tx(800, status=Transaction.Status.PENDING)
+        refunded = self._tx(800, authority="track-old")
+        Refund.objects.create(transaction=refunded, amount=Decimal("100"), refund_id="r-1")
+        recent = self._tx(10)
+
+        out = StringIO()
+        call_command("archive_transactions", "--older-than-months", "12", "--batch-size", "1", stdout=out)
+
+        self.assertEqual(
+            set(Transaction.objects.values_list("id", flat=True)), {pending.id, refunded.id, recent.id}
+        )
+        archived = TransactionArchive.objects.get()
+        self.assertEqual(
+            (archived.id, archived.wallet_id, archived.amount, archived.description),
+            (old.id, self.wallet.id, Decimal("100"), "old prize"),
+        )
+        self.assertIn("Archived 1 transactions", out.getvalue())
+
+    def test_dry_run_moves_nothing(self):
+        self._tx(800)
+        out = StringIO()
+        call_command("archive_transactions", "--dry-run", stdout=out)
+        self.assertIn("Would archive 1 transactions", out.getvalue())
+        self.assertEqual(Transaction.objects.count(), 1)
@@ -2,12 +2,16 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
+    AdminWithdrawalBatchViewSet,
     AdminWithdrawalRequestViewSet,
     DepositAPIView,
+    DepositStatusAPIView,
     RefundAPIView,  # Added
     TransactionViewSet,
     VerifyDepositAPIView,
     WalletBalanceAPIView,
+    WalletMonthlySummaryAPIView,
+    WalletStatementAPIView,
     WalletViewSet,
     WithdrawalRequestAPIView,
     ZibalWalletListView,  # Added
@@ -21,12 +25,18 @@ router.register(
     AdminWithdrawalRequestViewSet,
     basename="admin-withdrawal-request",
 )
+router.register(
+    r"admin/withdrawal-batches",
+    AdminWithdrawalBatchViewSet,
+    basename="admin-withdrawal-batch",
+)
 
 
 urlpatterns = [
     path("", include(router.urls)),
     path("deposit/", DepositAPIView.as_view(), name="deposit"),
     path("verify-deposit/", VerifyDepositAPIView.as_view(), name="verify_deposit"),
+    path("deposit-status/", DepositStatusAPIView.as_view(), name="deposit-status"),
     path(
         "withdrawal-requests/",
         WithdrawalRequestAPIView.as_view(),
@@ -36,4 +46,6 @@ urlpatterns = [
     path("refund/", RefundAPIView.as_view(), name="refund"),
     path("admin/zibal-wallets/", ZibalWalletListView.as_view(), name="zibal-wallets"),
     path("balance/", WalletBalanceAPIView.as_view(), name="wallet-balance"),
+    path("statement/", WalletStatementAPIView.as_view(), name="wallet-statement"),
+    path("summary/monthly/", WalletMonthlySummaryAPIView.as_view(), name="wallet-monthly-summary"),
 ]
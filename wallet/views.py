@@ -1,9 +1,12 @@
 import logging
 
 from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import redirect
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema
 from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
@@ -14,21 +17,33 @@ from common.throttles import (
     VeryStrictThrottle,
     StrictThrottle,
     MediumThrottle,
+    RelaxedThrottle,
 )
-from .models import Refund, Transaction, Wallet, WithdrawalRequest
+from .models import Refund, Transaction, Wallet, WalletMonthlySummary, WithdrawalBatch, WithdrawalRequest
 from .serializers import (
     AdminWithdrawalRequestUpdateSerializer,
+    BulkWithdrawalActionSerializer,
     CreateWithdrawalRequestSerializer,
+    DepositStatusQuerySerializer,
+    DepositStatusSerializer,
     RefundRequestSerializer,
     PaymentSerializer,
     TransactionSerializer,
     WalletBalanceSerializer,
+    WalletMonthlySummarySerializer,
     WalletSerializer,
+    WalletStatementQuerySerializer,
+    WithdrawalBatchSerializer,
     WithdrawalRequestSerializer,
     ZibalWalletSerializer,
     VerifyDepositSerializer,
 )
+from .idempotency import idempotent
 from .services import WalletService, ZibalService
+from .settlements import settlement_storage
+from .statements import csv_statement, ndjson_statement, statement_rows
+from .summaries import months_back
+from .tasks import verify_deposit_task
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +53,7 @@ class DepositAPIView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     throttle_classes = [VeryStrictThrottle]
 
+    @idempotent("deposit")
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -63,42 +79,62 @@ class VerifyDepositAPIView(APIView):
         success = validated_data["success"]
 
         redirect_url = settings.ZIBAL_PAYMENT_FAILED_URL
+        pending = Transaction.objects.filter(
+            order_id=order_id, authority=track_id, status=Transaction.Status.PENDING
+        )
         if success == "1":
-            WalletService.verify_and_process_deposit(track_id=track_id, order_id=order_id)
-            try:
-                tx = Transaction.objects.get(
-                    order_id=order_id,
-                    authority=track_id,
-                )
-                if tx.status == Transaction.Status.SUCCESS:
-                    redirect_url = f"{settings.ZIBAL_PAYMENT_SUCCESS_URL}?orderId={order_id}&trackId={track_id}"
-                else:
-                    logger.error(
-                        "Payment verification failed after callback.",
-                        extra={"order_id": order_id, "track_id": track_id, "status": tx.status},
-                    )
-            except Transaction.DoesNotExist:
+            # Verification talks to Zibal, so it runs in the background and the
+            # user waits on the pending page, which polls DepositStatusAPIView.
+            if pending.exists():
+                verify_deposit_task.delay(track_id, order_id)
+                redirect_url = f"{settings.ZIBAL_PAYMENT_PENDING_URL}?orderId={order_id}&trackId={track_id}"
+            else:
                 logger.error(
-                    "Transaction not found during payment verification callback.",
+                    "No pending transaction found for payment verification callback.",
                     extra={"order_id": order_id, "track_id": track_id},
                 )
         else:
-            try:
-                tx = Transaction.objects.get(order_id=order_id, authority=track_id, status=Transaction.Status.PENDING)
-                tx.status = Transaction.Status.FAILED
-                tx.description = "تراکنش ناموفق بود"
-                tx.save()
-            except Transaction.DoesNotExist:
+            updated = pending.update(
+                status=Transaction.Status.FAILED, description="تراکنش ناموفق بود"
+            )
+            if not updated:
                 logger.error(f"تراکنش در بازگشت ناموفق یافت نشد. order_id={order_id}")
 
         return redirect(redirect_url)
 
 
+@extend_schema(parameters=[DepositStatusQuerySerializer], responses=DepositStatusSerializer)
+class DepositStatusAPIView(APIView):
+    """
+    وضعیت یک تراکنش واریز کاربر را برای صفحه انتظار پرداخت برمی‌گرداند.
+    """
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [RelaxedThrottle]
+
+    def get(self, request, *args, **kwargs):
+        query = DepositStatusQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        deposit = (
+            Transaction.objects.filter(
+                wallet__user=request.user,
+                order_id=query.validated_data["orderId"],
+                transaction_type=Transaction.TransactionType.DEPOSIT,
+            )
+            .values("order_id", "status", "amount")
+            .first()
+        )
+        if deposit is None:
+            raise NotFound("تراکنش یافت نشد.")
+        return Response(DepositStatusSerializer(deposit).data)
+
+
 class WithdrawalRequestAPIView(generics.CreateAPIView):
     serializer_class = CreateWithdrawalRequestSerializer
     permission_classes = [IsAuthenticated]
     throttle_classes = [VeryStrictThrottle]
 
+    @idempotent("withdrawal_request")
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -125,6 +161,8 @@ class AdminWithdrawalRequestViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ["update", "partial_update"]:
             return AdminWithdrawalRequestUpdateSerializer
+        if self.action == "bulk":
+            return BulkWithdrawalActionSerializer
         return WithdrawalRequestSerializer
 
     def update(self, request, *args, **kwargs):
@@ -142,6 +180,45 @@ class AdminWithdrawalRequestViewSet(viewsets.ModelViewSet):
 
         return Response(self.get_serializer(updated_instance).data)
 
+    @extend_schema(responses={201: WithdrawalBatchSerializer})
+    @action(detail=False, methods=["post"])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Approves or rejects the selected pending requests as one batch. An
+        approved batch comes with a settlement file for the bank upload.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        selected = serializer.filter_queryset(WithdrawalRequest.objects.all())
+
+        if serializer.validated_data["action"] == WithdrawalBatch.Action.APPROVE:
+            batch = WalletService.bulk_approve_withdrawal_requests(selected, approved_by=request.user)
+        else:
+            batch = WalletService.bulk_reject_withdrawal_requests(selected, rejected_by=request.user)
+        return Response(WithdrawalBatchSerializer(batch).data, status=status.HTTP_201_CREATED)
+
+
+class AdminWithdrawalBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = WithdrawalBatch.objects.all()
+    serializer_class = WithdrawalBatchSerializer
+    permission_classes = [IsAdminUser]
+    throttle_classes = [StrictThrottle]
+
+    @extend_schema(responses={200: None})
+    @action(detail=True, methods=["get"], url_path="settlement-file")
+    def settlement_file(self, request, *args, **kwargs):
+        batch = self.get_object()
+        if not batch.file_name:
+            raise NotFound("این دسته فایل تسویه ندارد.")
+        response = FileResponse(
+            settlement_storage().open(batch.file_name, "rb"),
+            as_attachment=True,
+            filename=batch.file_name.rsplit("/", 1)[-1],
+            content_type="text/csv",
+        )
+        response["X-Checksum-SHA256"] = batch.checksum
+        return response
+
 
 class WalletViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Wallet.objects.all()
@@ -151,7 +228,9 @@ class WalletViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        return qs.filter(user=self.request.user).prefetch_related("transactions")
+        # latest_transactions slices its own query, so prefetching the whole
+        # history here would only load every transaction into memory.
+        return qs.filter(user=self.request.user)
 
     def get_object(self):
         wallet = super().get_object()
@@ -184,6 +263,7 @@ class RefundAPIView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     throttle_classes = [VeryStrictThrottle]
 
+    @idempotent("refund")
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -213,6 +293,61 @@ class ZibalWalletListView(APIView):
             return Response({"error": wallets_response.get("message", "Failed to fetch wallets.")}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@extend_schema(parameters=[WalletStatementQuerySerializer], responses={200: None})
+class WalletStatementAPIView(APIView):
+    """
+    Streams a wallet's full transaction statement as CSV or NDJSON. Staff can
+    export another user's statement with ``user_id``.
+    """
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [StrictThrottle]
+
+    def get(self, request, *args, **kwargs):
+        query = WalletStatementQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        user_id = params.get("user_id")
+        if user_id is not None and user_id != request.user.pk and not request.user.is_staff:
+            raise NotFound("کیف پول برای این کاربر یافت نشد.")
+        wallet = Wallet.objects.filter(user_id=user_id or request.user.pk).first()
+        if wallet is None:
+            raise NotFound("کیف پول برای این کاربر یافت نشد.")
+
+        rows = statement_rows(wallet, params.get("start_date"), params.get("end_date"))
+        if params["file_format"] == "ndjson":
+            response = StreamingHttpResponse(ndjson_statement(rows), content_type="application/x-ndjson")
+        else:
+            response = StreamingHttpResponse(csv_statement(rows), content_type="text/csv; charset=utf-8")
+        filename = f"statement-{wallet.user_id}-{timezone.localdate():%Y%m%d}.{params['file_format']}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+@extend_schema(responses=WalletMonthlySummarySerializer(many=True))
+class WalletMonthlySummaryAPIView(APIView):
+    """
+    Deposits, withdrawals, spends, winnings and net of the user's wallet for
+    each of the last 12 months, newest first. Months without activity are
+    returned as zeros.
+    """
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [MediumThrottle]
+
+    def get(self, request, *args, **kwargs):
+        months = months_back(12)
+        stored = {
+            summary.month: summary
+            for summary in WalletMonthlySummary.objects.filter(
+                wallet__user=request.user, month__gte=months[-1]
+            )
+        }
+        summaries = [stored.get(month) or WalletMonthlySummary(month=month) for month in months]
+        return Response(WalletMonthlySummarySerializer(summaries, many=True).data)
+
+
 class WalletBalanceAPIView(generics.RetrieveAPIView):
     serializer_class = WalletBalanceSerializer
     permission_classes = [IsAuthenticated]